@@ -0,0 +1,105 @@
+"""
+Перенос test_submission_answers.selected_answer_ids из JSON-строки (колонка selected_answer_ids_legacy
+после database/init-scripts/08-test-submission-answers-selected-ids-array.sql) в INTEGER[].
+Строки обрабатываются пачками по id, каждая пачка — отдельная транзакция; повторный запуск продолжает с необработанных.
+После переноса счётчики анализа вопросов пересчитываются: при старте между миграцией и переносом они
+заполнились из ещё пустых массивов.
+Запуск из backend/focus-kids-service: python -m app.commands.backfill_selected_answer_ids [--batch-size 5000] [--drop-legacy]
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import Integer, Text, cast, column, inspect, select, table, text, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.config.database import SessionLocal, engine
+from app.services import item_analysis
+
+LEGACY_COLUMN = "selected_answer_ids_legacy"
+
+answers = table(
+  "test_submission_answers",
+  column("id", Integer),
+  column(LEGACY_COLUMN, Text),
+  column("selected_answer_ids", ARRAY(Integer)),
+)
+
+
+def parse_legacy(raw: str) -> list[int]:
+  """JSON-массив id (числа или строки); некорректное значение — пустой выбор."""
+  try:
+    parsed = json.loads(raw)
+  except ValueError:
+    return []
+  if not isinstance(parsed, list):
+    parsed = [parsed]
+  ids = []
+  for value in parsed:
+    try:
+      ids.append(int(value))
+    except (TypeError, ValueError):
+      continue
+  return ids
+
+
+def backfill_batch(db, after_id: int, batch_size: int) -> int | None:
+  """Конвертирует следующую пачку; возвращает последний id или None, если строк не осталось."""
+  legacy = answers.c[LEGACY_COLUMN]
+  rows = db.execute(
+    select(answers.c.id, legacy)
+    .where(answers.c.id > after_id, legacy.isnot(None), answers.c.selected_answer_ids.is_(None))
+    .order_by(answers.c.id)
+    .limit(batch_size)
+  ).all()
+  if not rows:
+    return None
+  converted = values(column("id", Integer), column("ids", Text), name="converted").data(
+    [(row.id, "{" + ",".join(str(i) for i in parse_legacy(row[1])) + "}") for row in rows]
+  )
+  db.execute(
+    update(answers)
+    .where(answers.c.id == converted.c.id)
+    .values(selected_answer_ids=cast(converted.c.ids, ARRAY(Integer)))
+  )
+  return rows[-1].id
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--batch-size", type=int, default=5000)
+  parser.add_argument("--drop-legacy", action="store_true", help="удалить selected_answer_ids_legacy после переноса")
+  args = parser.parse_args()
+
+  columns = {c["name"] for c in inspect(engine).get_columns("test_submission_answers")}
+  if LEGACY_COLUMN not in columns:
+    print("Колонки selected_answer_ids_legacy нет — переносить нечего (миграция 08 не применялась или уже завершена)")
+    return
+
+  started = time.perf_counter()
+  batches = 0
+  after_id = 0
+  while True:
+    with SessionLocal() as db:
+      last_id = backfill_batch(db, after_id, args.batch_size)
+      db.commit()
+    if last_id is None:
+      break
+    batches += 1
+    after_id = last_id
+    print(f"пачка {batches}: до id {last_id}")
+
+  with SessionLocal() as db:
+    item_analysis.rebuild(db)
+    db.commit()
+  print("Анализ вопросов тестов пересчитан")
+
+  if args.drop_legacy:
+    with engine.begin() as conn:
+      conn.execute(text(f"ALTER TABLE test_submission_answers DROP COLUMN {LEGACY_COLUMN}"))
+    print("Колонка selected_answer_ids_legacy удалена")
+  print(f"Перенос завершён за {time.perf_counter() - started:.2f} с ({batches} пачек)")
+
+
+if __name__ == "__main__":
+  main()
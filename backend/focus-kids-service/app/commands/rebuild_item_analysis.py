@@ -0,0 +1,39 @@
+"""
+Полный пересчёт анализа вопросов тестов (test_question_stats, test_answer_stats) из истории попыток.
+Запуск из backend/focus-kids-service: python -m app.commands.rebuild_item_analysis [--test-id 42]
+"""
+import argparse
+import time
+
+from app.config.database import Base, SessionLocal, engine
+# Импортируем все модели для регистрации в SQLAlchemy
+from app.models import (  # noqa: F401
+  student,
+  teacher,
+  group,
+  attendance,
+  grade,
+  program,
+  lecture,
+  homework,
+  test,
+  stats_rollup as stats_rollup_models,
+)
+from app.services import item_analysis
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--test-id", type=int, default=None, help="пересчитать только один тест")
+  args = parser.parse_args()
+
+  Base.metadata.create_all(bind=engine)
+  started = time.perf_counter()
+  with SessionLocal() as db:
+    item_analysis.rebuild(db, args.test_id)
+    db.commit()
+  print(f"Анализ вопросов пересчитан за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+  main()
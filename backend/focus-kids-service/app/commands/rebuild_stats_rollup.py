@@ -0,0 +1,34 @@
+"""
+Полный пересчёт агрегатов статистики (student_stats_rollup, group_stats_rollup) из исходных таблиц.
+Запуск из backend/focus-kids-service: python -m app.commands.rebuild_stats_rollup
+"""
+import time
+
+from app.config.database import Base, SessionLocal, engine
+# Импортируем все модели для регистрации в SQLAlchemy
+from app.models import (  # noqa: F401
+  student,
+  teacher,
+  group,
+  attendance,
+  grade,
+  program,
+  lecture,
+  homework,
+  test,
+  stats_rollup as stats_rollup_models,
+)
+from app.services import stats_rollup
+
+
+def main() -> None:
+  Base.metadata.create_all(bind=engine)
+  started = time.perf_counter()
+  with SessionLocal() as db:
+    stats_rollup.rebuild(db)
+    db.commit()
+  print(f"Агрегаты статистики пересчитаны за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+  main()
@@ -13,6 +13,27 @@ class Settings(BaseSettings):
   INTERNAL_API_SECRET: str = ""
   # Доп. CORS-истоки (через запятую), например URL туннеля для Mini App
   CORS_ORIGINS_EXTRA: str = ""
+  # Размер кэша ответов статистики (записей LRU); 0 — кэш выключен
+  STATS_CACHE_SIZE: int = 2048
+  # Число скомпилированных ключей ответов тестов в памяти; 0 — ключ читается из БД при каждой сдаче
+  ANSWER_KEY_CACHE_SIZE: int = 1024
+  # Число сериализованных тестов для учеников (GET /tests/{id}/student) в памяти; 0 — кэш выключен
+  TEST_VIEW_CACHE_SIZE: int = 1024
+  # Приём попыток тестов через очередь в БД (ответ 202, проверка в фоне) — включать на время массовых тестов
+  TEST_SUBMISSION_QUEUE: bool = False
+  # Потоков-обработчиков очереди попыток и строк очереди на одну транзакцию
+  TEST_SUBMISSION_GRADERS: int = 2
+  TEST_SUBMISSION_QUEUE_BATCH: int = 50
+  # Уведомления в бот: размер очереди (при переполнении события отбрасываются) и число потоков отправки
+  NOTIFY_QUEUE_SIZE: int = 1000
+  NOTIFY_WORKERS: int = 4
+  # Хранилище файлов ДЗ (app.services.file_storage): local — каталог STORAGE_DIR
+  STORAGE_BACKEND: str = "local"
+  STORAGE_DIR: str = "uploads"
+  # Максимальный размер загружаемого файла, байт
+  MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+  # Срок действия подписанных ссылок на файлы: от одного до двух таких интервалов, секунд
+  FILE_URL_TTL_SECONDS: int = 3600
 
   class Config:
     env_file = ".env"
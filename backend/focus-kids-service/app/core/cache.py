@@ -0,0 +1,108 @@
+"""
+Кэши в памяти процесса и их сброс после commit.
+LRU — словарь с ограничением размера; GenerationLRUCache — LRU по ключу со счётчиком поколений:
+discard() во время загрузки значения не даёт сохранить результат, прочитанный до изменения данных.
+invalidate_on_commit() откладывает discard() до commit сессии; rollback отменяет отложенный сброс.
+Освобождение и откат SAVEPOINT не считаются ни тем, ни другим — решает внешняя транзакция.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterable, Protocol, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_PENDING_KEY = "cache_pending_invalidations"
+
+
+class LRU(Generic[K, V]):
+  """Без блокировок: вызывающий держит свою."""
+
+  def __init__(self, max_entries: int):
+    self.max_entries = max_entries
+    self._entries: OrderedDict[K, V] = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def get(self, key: K) -> V | None:
+    value = self._entries.get(key)
+    if value is not None:
+      self._entries.move_to_end(key)
+    return value
+
+  def put(self, key: K, value: V) -> None:
+    self._entries[key] = value
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  def pop(self, key: K) -> V | None:
+    return self._entries.pop(key, None)
+
+
+class GenerationLRUCache(Generic[K, V]):
+  def __init__(self, max_entries: int):
+    self._entries: LRU[K, V] = LRU(max_entries)
+    self._generations: dict[K, int] = {}
+    self._lock = threading.Lock()
+
+  def peek(self, key: K) -> V | None:
+    with self._lock:
+      return self._entries.get(key)
+
+  def get(self, key: K, load: Callable[[], V | None]) -> V | None:
+    """Значение из кэша или load(); None не кэшируется."""
+    if self._entries.max_entries <= 0:
+      return load()
+    with self._lock:
+      value = self._entries.get(key)
+      if value is not None:
+        return value
+      generation = self._generations.get(key, 0)
+
+    value = load()
+
+    if value is not None:
+      with self._lock:
+        # Данные изменили, пока значение загружалось, — не кэшируем устаревшее
+        if self._generations.get(key, 0) == generation:
+          self._entries.put(key, value)
+    return value
+
+  def discard(self, keys: Iterable[K]) -> None:
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+
+class Invalidatable(Protocol):
+  def discard(self, keys: Iterable) -> None: ...
+
+
+def invalidate_on_commit(session: Session, cache: Invalidatable, *keys: Hashable) -> None:
+  """cache.discard(keys) после commit сессии (не сразу: до commit другие запросы видят старые данные)."""
+  pending = session.info.setdefault(_PENDING_KEY, {})
+  pending.setdefault(cache, set()).update(keys)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _discard_after_commit(session: Session) -> None:
+  if session.in_nested_transaction():
+    return
+  pending = session.info.pop(_PENDING_KEY, None)
+  for cache, keys in (pending or {}).items():
+    cache.discard(keys)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+  if session.in_nested_transaction():
+    return
+  session.info.pop(_PENDING_KEY, None)
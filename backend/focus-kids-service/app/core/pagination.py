@@ -0,0 +1,27 @@
+"""
+Keyset-пагинация: курсор — непрозрачная строка с ключом сортировки последней строки страницы.
+Клиент передаёт next_cursor из ответа в ?cursor= следующего запроса.
+"""
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*key) -> str:
+  raw = json.dumps(list(key), separators=(",", ":")).encode()
+  return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+  """Ключ из курсора, приведённый к types (по одному типу на значение); некорректный курсор — 400."""
+  try:
+    key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    if not isinstance(key, list) or len(key) != len(types):
+      raise ValueError(cursor)
+    return tuple(cast(value) for cast, value in zip(types, key))
+  except (TypeError, ValueError):
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
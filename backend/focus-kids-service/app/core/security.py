@@ -1,3 +1,7 @@
+import hashlib
+import hmac
+import time
+
 import jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -30,3 +34,25 @@ async def get_current_user(
   token = credentials.credentials
   payload = decode_jwt_token(token)
   return payload
+
+
+# Ссылки на загруженные файлы (/files/<sha256>) открываются из <a>/<img> без заголовка Authorization,
+# поэтому API отдаёт их подписанными: HMAC от sha256 и срока действия. Срок округляется вверх до
+# окна FILE_URL_TTL_SECONDS, чтобы ссылка не менялась при каждом запросе и браузер кэшировал файл.
+def _file_signature(sha256: str, expires: int) -> str:
+  key = f"files:{settings.APP_JWT_SECRET}".encode()
+  return hmac.new(key, f"{sha256}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_file_url(file_url: str) -> str:
+  """Подписанная ссылка для файла из хранилища; внешние URL возвращаются как есть."""
+  if not file_url.startswith("/files/"):
+    return file_url
+  ttl = settings.FILE_URL_TTL_SECONDS
+  expires = (int(time.time()) // ttl + 2) * ttl
+  sha256 = file_url[len("/files/"):]
+  return f"{file_url}?expires={expires}&sig={_file_signature(sha256, expires)}"
+
+
+def verify_file_signature(sha256: str, expires: int, sig: str) -> bool:
+  return expires > time.time() and hmac.compare_digest(sig, _file_signature(sha256, expires))
@@ -1,13 +1,16 @@
 import time
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import OperationalError
 
 from .config.settings import settings
 from .routes import api_router
-from .config.database import Base, engine
+from .config.database import Base, SessionLocal, engine
+from .services import attempt_ledger, item_analysis, stats_rollup, submission_queue, telegram_notify
 
 # Импортируем все модели для регистрации в SQLAlchemy
 from .models import (  # noqa: F401
@@ -20,6 +23,8 @@ from .models import (  # noqa: F401
   lecture,
   homework,
   test,
+  stored_file,
+  stats_rollup as stats_rollup_models,
 )
 
 
@@ -39,10 +44,23 @@ def wait_for_db_and_create_tables(max_attempts: int = 30, delay_seconds: float =
         raise
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  """Фоновые службы процесса: диспетчер уведомлений и обработчики очереди попыток; при остановке — дообработка."""
+  telegram_notify.dispatcher.start()
+  if app.state.start_graders:
+    submission_queue.start_graders()
+  yield
+  if app.state.start_graders:
+    await run_in_threadpool(submission_queue.stop_graders)
+  await run_in_threadpool(telegram_notify.dispatcher.stop)
+
+
 def create_app() -> FastAPI:
   app = FastAPI(
     title="Focus Kids Service",
     version="0.1.0",
+    lifespan=lifespan,
     redirect_slashes=False,  # иначе 307/308 отдают Location на внутренний хост — браузер за ним не достучится через прокси
   )
 
@@ -66,6 +84,16 @@ def create_app() -> FastAPI:
 
   # Ждём готовности БД и создаём таблицы (для dev; в бою лучше Alembic)
   wait_for_db_and_create_tables()
+  # Первичное заполнение агрегатов статистики, журнала попыток и анализа вопросов тестов (таблицы только что созданы)
+  with SessionLocal() as db:
+    stats_rollup.rebuild_if_empty(db)
+    attempt_ledger.rebuild_if_empty(db)
+    item_analysis.rebuild_if_empty(db)
+    queue_pending = submission_queue.has_pending(db)
+
+  # Обработчики очереди попыток тестов (запускаются в lifespan); без режима очереди — только чтобы обработать
+  # строки, оставшиеся с прошлого запуска
+  app.state.start_graders = settings.TEST_SUBMISSION_QUEUE or queue_pending
 
   @app.get("/health", tags=["health"])
   async def health_check():
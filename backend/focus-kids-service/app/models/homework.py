@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey, Text, Boolean
+from sqlalchemy import String, ForeignKey, Text, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -6,6 +6,8 @@ from .base import Base
 
 class Homework(Base):
   __tablename__ = "homeworks"
+  # Keyset-пагинация ДЗ программы по (order, id)
+  __table_args__ = (Index("ix_homeworks_program_order_id", "program_id", "order", "id"),)
 
   id: Mapped[int] = mapped_column(primary_key=True, index=True)
   program_id: Mapped[int] = mapped_column(ForeignKey("programs.id"))
@@ -31,6 +33,18 @@ class HomeworkFile(Base):
 
 class HomeworkSubmission(Base):
   __tablename__ = "homework_submissions"
+  # Keyset-пагинация ответов по id в пределах ДЗ и ученика
+  __table_args__ = (
+    Index("ix_homework_submissions_homework_id_id", "homework_id", "id"),
+    Index("ix_homework_submissions_student_id_id", "student_id", "id"),
+    # Очередь проверки: только непроверенные ответы, индекс не растёт вместе с проверенной историей
+    Index(
+      "ix_homework_submissions_pending",
+      "homework_id",
+      "id",
+      postgresql_where=text("grade IS NULL"),
+    ),
+  )
 
   id: Mapped[int] = mapped_column(primary_key=True, index=True)
   homework_id: Mapped[int] = mapped_column(ForeignKey("homeworks.id"))
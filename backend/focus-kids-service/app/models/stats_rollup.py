@@ -0,0 +1,46 @@
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class StudentStatsRollup(Base):
+  """Счётчики статистики ученика; поддерживаются маршрутами записи (app.services.stats_rollup)."""
+  __tablename__ = "student_stats_rollup"
+
+  student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+  total_lessons: Mapped[int] = mapped_column(Integer, server_default="0")
+  attended_lessons: Mapped[int] = mapped_column(Integer, server_default="0")
+  # Оценки за занятия по типам: сумма и количество
+  oral_hw_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+  oral_hw_count: Mapped[int] = mapped_column(Integer, server_default="0")
+  written_hw_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+  written_hw_count: Mapped[int] = mapped_column(Integer, server_default="0")
+  dictation_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+  dictation_count: Mapped[int] = mapped_column(Integer, server_default="0")
+  classwork_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+  classwork_count: Mapped[int] = mapped_column(Integer, server_default="0")
+  # ДЗ с уроков (homework_next) и выполненные из них
+  lesson_hw_total: Mapped[int] = mapped_column(Integer, server_default="0")
+  lesson_hw_completed: Mapped[int] = mapped_column(Integer, server_default="0")
+  # Сданные ДЗ из программ группы ученика
+  completed_homeworks: Mapped[int] = mapped_column(Integer, server_default="0")
+  # Лучшие попытки по тестам программ группы
+  completed_tests: Mapped[int] = mapped_column(Integer, server_default="0")
+  best_score_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+  best_max_score_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+
+
+class GroupStatsRollup(Base):
+  """Счётчики статистики группы; поддерживаются маршрутами записи (app.services.stats_rollup)."""
+  __tablename__ = "group_stats_rollup"
+
+  group_id: Mapped[int] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+  total_lessons: Mapped[int] = mapped_column(Integer, server_default="0")
+  attended_lessons: Mapped[int] = mapped_column(Integer, server_default="0")
+  # Оценки за занятия (oral_hw, written_hw, dictation, classwork)
+  grade_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+  grade_count: Mapped[int] = mapped_column(Integer, server_default="0")
+  # ДЗ и тесты в программах группы
+  total_homeworks: Mapped[int] = mapped_column(Integer, server_default="0")
+  total_tests: Mapped[int] = mapped_column(Integer, server_default="0")
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class StoredFile(Base):
+  """Загруженный файл в хранилище (app.services.file_storage); ключ — SHA-256 содержимого."""
+  __tablename__ = "stored_files"
+
+  sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+  size: Mapped[int] = mapped_column(BigInteger)
+  # Тип из первой загрузки этого содержимого
+  content_type: Mapped[str] = mapped_column(String(100))
+  created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,7 @@
-from sqlalchemy import String, ForeignKey, Text, Boolean, Integer
+from datetime import datetime
+
+from sqlalchemy import String, ForeignKey, Text, Boolean, Integer, Index, DateTime, func, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -46,6 +49,8 @@ class TestAnswer(Base):
 
 class TestSubmission(Base):
   __tablename__ = "test_submissions"
+  # Лучшие попытки ученика: DISTINCT ON (test_id) по попыткам одного student_id
+  __table_args__ = (Index("ix_test_submissions_student_test_score", "student_id", "test_id", "score"),)
 
   id: Mapped[int] = mapped_column(primary_key=True, index=True)
   test_id: Mapped[int] = mapped_column(ForeignKey("tests.id"))
@@ -61,12 +66,69 @@ class TestSubmission(Base):
 
 class TestSubmissionAnswer(Base):
   __tablename__ = "test_submission_answers"
+  # «Сколько учеников выбрали вариант X»: selected_answer_ids @> ARRAY[X] по GIN-индексу
+  __table_args__ = (
+    Index("ix_test_submission_answers_selected_ids", "selected_answer_ids", postgresql_using="gin"),
+  )
 
   id: Mapped[int] = mapped_column(primary_key=True, index=True)
   submission_id: Mapped[int] = mapped_column(ForeignKey("test_submissions.id"))
   question_id: Mapped[int] = mapped_column(ForeignKey("test_questions.id"))
   answer_text: Mapped[str | None] = mapped_column(Text, nullable=True)
-  selected_answer_ids: Mapped[str | None] = mapped_column(String(500), nullable=True)  # JSON array of answer IDs
+  selected_answer_ids: Mapped[list[int] | None] = mapped_column(ARRAY(Integer), nullable=True)  # id выбранных вариантов
 
   submission: Mapped["TestSubmission"] = relationship(back_populates="answers")
   question: Mapped["TestQuestion"] = relationship()
+
+
+class TestAttemptLedger(Base):
+  """Попытки ученика по тесту: счётчики для проверки лимита и лучшая попытка (app.services.attempt_ledger)."""
+  __tablename__ = "test_attempt_ledger"
+
+  test_id: Mapped[int] = mapped_column(ForeignKey("tests.id", ondelete="CASCADE"), primary_key=True)
+  student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+  used: Mapped[int] = mapped_column(Integer, server_default="0")
+  approved_retakes: Mapped[int] = mapped_column(Integer, server_default="0")
+  best_score: Mapped[int | None] = mapped_column(Integer, nullable=True)
+  best_submission_id: Mapped[int | None] = mapped_column(
+    ForeignKey("test_submissions.id", ondelete="SET NULL"), nullable=True
+  )
+
+
+class TestQuestionStats(Base):
+  """Анализ вопроса: сколько раз на него ответили и сколько раз верно (app.services.item_analysis)."""
+  __tablename__ = "test_question_stats"
+
+  question_id: Mapped[int] = mapped_column(ForeignKey("test_questions.id", ondelete="CASCADE"), primary_key=True)
+  test_id: Mapped[int] = mapped_column(ForeignKey("tests.id", ondelete="CASCADE"), index=True)
+  responses: Mapped[int] = mapped_column(Integer, server_default="0")
+  correct: Mapped[int] = mapped_column(Integer, server_default="0")
+
+
+class TestAnswerStats(Base):
+  """Сколько раз выбирали вариант ответа (app.services.item_analysis)."""
+  __tablename__ = "test_answer_stats"
+
+  answer_id: Mapped[int] = mapped_column(ForeignKey("test_answers.id", ondelete="CASCADE"), primary_key=True)
+  test_id: Mapped[int] = mapped_column(ForeignKey("tests.id", ondelete="CASCADE"), index=True)
+  picks: Mapped[int] = mapped_column(Integer, server_default="0")
+
+
+class TestSubmissionQueueItem(Base):
+  """
+  Попытка, принятая в режиме очереди (TEST_SUBMISSION_QUEUE): ответы ждут обработчика (app.services.submission_queue).
+  submission_id выдан из последовательности test_submissions заранее — под этим id попытка будет записана.
+  """
+  __tablename__ = "test_submission_queue"
+  __table_args__ = (
+    Index("ix_test_submission_queue_queued", "submission_id", postgresql_where=text("status = 'queued'")),
+  )
+
+  submission_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+  test_id: Mapped[int] = mapped_column(ForeignKey("tests.id", ondelete="CASCADE"))
+  student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"))
+  answers: Mapped[list] = mapped_column(JSONB)
+  status: Mapped[str] = mapped_column(String(20), server_default="queued")  # queued, done, rejected, failed
+  error: Mapped[str | None] = mapped_column(Text, nullable=True)
+  created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+  processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -11,6 +11,7 @@ from .homeworks import router as homeworks_router
 from .tests import router as tests_router
 from .statistics import router as statistics_router
 from .internal import router as internal_router
+from .files import router as files_router
 
 
 api_router = APIRouter()
@@ -25,4 +26,5 @@ api_router.include_router(lectures_router)
 api_router.include_router(homeworks_router)
 api_router.include_router(tests_router)
 api_router.include_router(statistics_router)
+api_router.include_router(files_router)
 
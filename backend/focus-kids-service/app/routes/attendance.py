@@ -5,6 +5,7 @@ from app.config.database import get_db
 from app.models.attendance import Attendance
 from app.schemas.attendance import AttendanceCreate, AttendanceRead, AttendanceUpdate
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_rollup
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
@@ -24,6 +25,7 @@ def create_attendance(
     program_id=payload.program_id,
   )
   db.add(record)
+  stats_rollup.record_attendance(db, record)
   db.commit()
   db.refresh(record)
   return record
@@ -58,10 +60,12 @@ def update_attendance(
   if not record:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Запись посещаемости не найдена")
 
+  was_present = record.present
   if payload.present is not None:
     record.present = payload.present
   if payload.program_id is not None:
     record.program_id = payload.program_id
+  stats_rollup.record_attendance_change(db, record, was_present)
 
   db.commit()
   db.refresh(record)
@@ -78,6 +82,7 @@ def delete_attendance(
   if not record:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Запись посещаемости не найдена")
   db.delete(record)
+  stats_rollup.record_attendance(db, record, -1)
   db.commit()
   return None
 
@@ -0,0 +1,155 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config.database import get_db
+from app.config.settings import settings
+from app.core.security import sign_file_url, verify_file_signature
+from app.dependencies.roles import get_current_kids_role
+from app.models.stored_file import StoredFile
+from app.schemas.stored_file import StoredFileRead
+from app.services.file_storage import FileTooLarge, StoredBlob, get_storage
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+SHA256_PATTERN = "^[0-9a-f]{64}$"
+# Типы, которые браузер может показать сам; остальное отдаётся вложением как application/octet-stream
+INLINE_CONTENT_TYPES = frozenset({
+  "image/jpeg",
+  "image/png",
+  "image/gif",
+  "image/webp",
+  "image/heic",
+  "application/pdf",
+  "audio/mpeg",
+  "audio/mp4",
+  "video/mp4",
+})
+
+
+def _too_large() -> HTTPException:
+  return HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail=f"Размер файла не должен превышать {settings.MAX_UPLOAD_BYTES // (1024 * 1024)} МБ",
+  )
+
+
+def _record_file(db: Session, blob: StoredBlob, content_type: str) -> str:
+  """Строка stored_files для содержимого (первая загрузка задаёт тип); возвращает сохранённый тип."""
+  db.execute(
+    pg_insert(StoredFile)
+    .values(sha256=blob.sha256, size=blob.size, content_type=content_type)
+    .on_conflict_do_nothing(index_elements=["sha256"])
+  )
+  db.commit()
+  return db.execute(select(StoredFile.content_type).where(StoredFile.sha256 == blob.sha256)).scalar_one()
+
+
+def _parse_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+  """
+  Один диапазон bytes=a-b, bytes=a- или bytes=-n -> (start, end) включительно.
+  None — заголовка нет, он некорректен или диапазонов несколько: отдаётся весь файл.
+  """
+  if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+    return None
+  first, sep, last = range_header[len("bytes="):].strip().partition("-")
+  if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+    return None
+  if first:
+    start = int(first)
+    if last and int(last) < start:
+      return None
+    end = min(int(last), size - 1) if last else size - 1
+  else:
+    # bytes=-n — последние n байт
+    start, end = size - min(int(last), size), size - 1
+  if start >= size:
+    raise HTTPException(
+      status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+      detail="Диапазон вне файла",
+      headers={"Content-Range": f"bytes */{size}"},
+    )
+  return start, end
+
+
+@router.post("", response_model=StoredFileRead, status_code=status.HTTP_201_CREATED)
+async def upload_file(
+  request: Request,
+  db: Session = Depends(get_db),
+  _current=Depends(get_current_kids_role),
+):
+  """
+  Тело запроса — байты файла (не multipart), тип — заголовок Content-Type.
+  Запись идёт потоком с проверкой размера; то же содержимое повторно не сохраняется.
+  """
+  declared = request.headers.get("content-length", "")
+  if declared.isdigit() and int(declared) > settings.MAX_UPLOAD_BYTES:
+    raise _too_large()
+  content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+  try:
+    blob = await get_storage().put(request.stream(), settings.MAX_UPLOAD_BYTES)
+  except FileTooLarge:
+    raise _too_large()
+  stored_type = await run_in_threadpool(_record_file, db, blob, content_type[:100] or "application/octet-stream")
+  file_url = f"/files/{blob.sha256}"
+  return StoredFileRead(
+    sha256=blob.sha256,
+    size=blob.size,
+    content_type=stored_type,
+    file_url=file_url,
+    download_url=sign_file_url(file_url),
+  )
+
+
+@router.get("/{sha256}")
+def download_file(
+  sha256: str = Path(pattern=SHA256_PATTERN),
+  expires: int = Query(...),
+  sig: str = Query(...),
+  range_header: str | None = Header(None, alias="Range"),
+  if_none_match: str | None = Header(None),
+  db: Session = Depends(get_db),
+):
+  """
+  Файл по подписанной ссылке (download_url из ответов API ДЗ и загрузки) — без заголовка Authorization,
+  чтобы открывалась из <a>/<img>. Поддерживает Range (206) и If-None-Match (ETag — сам sha256).
+  """
+  if not verify_file_signature(sha256, expires, sig):
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Ссылка недействительна или устарела")
+  storage = get_storage()
+  stored = db.query(StoredFile).get(sha256)
+  if stored is None or not storage.exists(sha256):
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
+
+  etag = f'"{sha256}"'
+  headers = {
+    "ETag": etag,
+    "Accept-Ranges": "bytes",
+    "Cache-Control": "private, max-age=31536000, immutable",
+    "X-Content-Type-Options": "nosniff",
+  }
+  if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+  media_type = stored.content_type
+  if media_type not in INLINE_CONTENT_TYPES:
+    media_type = "application/octet-stream"
+    headers["Content-Disposition"] = "attachment"
+
+  byte_range = _parse_range(range_header, stored.size)
+  status_code = status.HTTP_200_OK
+  start, end = 0, stored.size - 1
+  if byte_range is not None:
+    start, end = byte_range
+    status_code = status.HTTP_206_PARTIAL_CONTENT
+    headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+  headers["Content-Length"] = str(end - start + 1)
+  return StreamingResponse(
+    storage.iter_range(sha256, start, end),
+    status_code=status_code,
+    media_type=media_type,
+    headers=headers,
+  )
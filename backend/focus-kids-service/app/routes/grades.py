@@ -6,6 +6,7 @@ from app.models.grade import Grade
 from app.models.student import Student
 from app.schemas.grade import GradeCreate, GradeRead, GradeUpdate
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_rollup
 from app.services.telegram_notify import notify_students
 
 router = APIRouter(prefix="/grades", tags=["grades"])
@@ -45,6 +46,7 @@ def create_grade(
     program_id=payload.program_id,
   )
   db.add(grade)
+  stats_rollup.record_grade(db, grade)
   db.commit()
   db.refresh(grade)
   return grade
@@ -94,6 +96,7 @@ def update_grade(
   if not grade:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Оценка не найдена")
 
+  old_type, old_value = grade.type, grade.value
   if payload.lesson_date is not None:
     grade.lesson_date = payload.lesson_date
   if payload.value is not None:
@@ -104,6 +107,7 @@ def update_grade(
     grade.comment = payload.comment
   if payload.program_id is not None:
     grade.program_id = payload.program_id
+  stats_rollup.record_grade_change(db, grade, old_type, old_value)
 
   db.commit()
   db.refresh(grade)
@@ -120,6 +124,7 @@ def delete_grade(
   if not grade:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Оценка не найдена")
   db.delete(grade)
+  stats_rollup.record_grade(db, grade, -1)
   db.commit()
   return None
 
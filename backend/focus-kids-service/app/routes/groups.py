@@ -6,6 +6,7 @@ from app.models.group import Group
 from app.models.student import Student
 from app.schemas.group import GroupCreate, GroupRead, GroupUpdate
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_cache, stats_rollup
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
@@ -32,6 +33,7 @@ def create_group(
 ):
   group = Group(name=payload.name, level=payload.level, teacher_id=payload.teacher_id)
   db.add(group)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   db.refresh(group)
   return group
@@ -70,6 +72,7 @@ def update_group(
     group.level = payload.level
   if payload.teacher_id is not None:
     group.teacher_id = payload.teacher_id
+  stats_cache.mark_structure_changed(db)
 
   db.commit()
   db.refresh(group)
@@ -92,6 +95,7 @@ def assign_student_to_group(
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ученик не найден")
 
   student.group_id = group_id
+  stats_rollup.record_student_group_change(db, student.id)
   db.commit()
 
   db.refresh(group)
@@ -117,6 +121,7 @@ def unassign_student_from_group(
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ученик не в этой группе")
 
   student.group_id = None
+  stats_rollup.record_student_group_change(db, student.id)
   db.commit()
   group = (
     db.query(Group)
@@ -136,6 +141,7 @@ def delete_group(
   if not group:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Группа не найдена")
   db.delete(group)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   return None
 
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import Integer, Text, cast, column, func, select, tuple_, update, values
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
 
 from app.config.database import get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
 from app.models.homework import Homework, HomeworkFile, HomeworkSubmission, HomeworkSubmissionFile, HomeworkComment
+from app.models.group import Group
 from app.models.program import Program
 from app.models.student import Student
+from app.services import stats_rollup
 from app.services.telegram_notify import notify_students
+from app.schemas.pagination import Page
 from app.schemas.homework import (
+  HomeworkBriefRead,
   HomeworkCreate,
   HomeworkRead,
+  HomeworkReviewItemRead,
   HomeworkUpdate,
+  HomeworkSubmissionBriefRead,
+  HomeworkSubmissionBulkItem,
+  HomeworkSubmissionBulkResult,
   HomeworkSubmissionCreate,
   HomeworkSubmissionRead,
   HomeworkSubmissionUpdate,
@@ -20,31 +30,164 @@ from app.dependencies.roles import get_current_kids_role, require_teacher, requi
 
 router = APIRouter(prefix="/homeworks", tags=["homeworks"])
 
+MAX_BULK_ITEMS = 500
 
-@router.get("/", response_model=list[HomeworkRead])
-@router.get("", response_model=list[HomeworkRead])
+
+# brief — только поля для списков (название, порядок / оценка), без файлов и комментариев
+FIELDS_PATTERN = "^(brief|full)$"
+WITH_PATTERN = "^((files|comments)(,(files|comments))*)?$"
+
+HOMEWORK_BRIEF_COLUMNS = (Homework.id, Homework.program_id, Homework.title, Homework.order)
+SUBMISSION_BRIEF_COLUMNS = (
+  HomeworkSubmission.id,
+  HomeworkSubmission.homework_id,
+  HomeworkSubmission.student_id,
+  HomeworkSubmission.grade,
+)
+
+
+def _homeworks_page(db: Session, query, fields: str, limit: int, cursor_key) -> Page:
+  """Выполняет keyset-запрос (уже с limit + 1) и собирает страницу; cursor_key — ключ сортировки строки."""
+  if fields == "brief":
+    rows = db.execute(query.with_only_columns(*HOMEWORK_BRIEF_COLUMNS)).all()
+    items = [HomeworkBriefRead.model_validate(row) for row in rows[:limit]]
+    page_cls = Page[HomeworkBriefRead]
+  else:
+    rows = db.execute(query.options(selectinload(Homework.files))).scalars().all()
+    items = [HomeworkRead.model_validate(homework) for homework in rows[:limit]]
+    page_cls = Page[HomeworkRead]
+  next_cursor = encode_cursor(*cursor_key(items[-1])) if len(rows) > limit else None
+  return page_cls(items=items, next_cursor=next_cursor)
+
+
+def _submission_loaders(with_: str) -> list:
+  """
+  ?with=files,comments — какие связи ответа загружать. Каждая включённая связь — один SELECT ... IN по id страницы
+  (selectinload), а не JOIN: files и comments в одном JOIN дают files × comments строк на ответ.
+  Невключённые связи в ответе пустые.
+  """
+  requested = set(filter(None, with_.split(",")))
+  return [
+    selectinload(relation) if name in requested else noload(relation)
+    for name, relation in (("files", HomeworkSubmission.files), ("comments", HomeworkSubmission.comments))
+  ]
+
+
+def _submissions_page(db: Session, query, fields: str, with_: str, limit: int) -> Page:
+  if fields == "brief":
+    rows = db.execute(query.with_only_columns(*SUBMISSION_BRIEF_COLUMNS)).all()
+    items = [HomeworkSubmissionBriefRead.model_validate(row) for row in rows[:limit]]
+    page_cls = Page[HomeworkSubmissionBriefRead]
+  else:
+    rows = db.execute(query.options(*_submission_loaders(with_))).scalars().all()
+    items = [HomeworkSubmissionRead.model_validate(submission) for submission in rows[:limit]]
+    page_cls = Page[HomeworkSubmissionRead]
+  next_cursor = encode_cursor(items[-1].id) if len(rows) > limit else None
+  return page_cls(items=items, next_cursor=next_cursor)
+
+
+def _notify_graded(db: Session, rows) -> None:
+  """Одно уведомление всем ученикам, чьи ответы оценены; название ДЗ — если оно у всех одно."""
+  if not rows:
+    return
+  focus_ids = db.execute(
+    select(Student.focus_user_id)
+    .where(Student.id.in_({row.student_id for row in rows}), Student.focus_user_id.isnot(None))
+  ).scalars().all()
+  homework_ids = {row.homework_id for row in rows}
+  homework_title = None
+  if len(homework_ids) == 1:
+    homework_title = db.execute(select(Homework.title).where(Homework.id.in_(homework_ids))).scalar_one_or_none()
+  notify_students(list(focus_ids), "homework_graded", {"homework_title": homework_title})
+
+
+@router.get("/", response_model=Page[HomeworkBriefRead] | Page[HomeworkRead])
+@router.get("", response_model=Page[HomeworkBriefRead] | Page[HomeworkRead])
 def list_homeworks(
+  program_id: int | None = None,
+  fields: str = Query("full", pattern=FIELDS_PATTERN),
+  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  cursor: str | None = None,
   db: Session = Depends(get_db),
   _user=Depends(get_current_kids_role),
 ):
-  homeworks = db.query(Homework).options(joinedload(Homework.files)).all()
-  return homeworks
+  """ДЗ постранично по id (keyset: ?cursor= из next_cursor прошлой страницы)."""
+  query = select(Homework).order_by(Homework.id).limit(limit + 1)
+  if program_id is not None:
+    query = query.where(Homework.program_id == program_id)
+  if cursor is not None:
+    (after_id,) = decode_cursor(cursor, int)
+    query = query.where(Homework.id > after_id)
+  return _homeworks_page(db, query, fields, limit, lambda homework: (homework.id,))
 
 
-@router.get("/by-program/{program_id}", response_model=list[HomeworkRead])
+@router.get("/by-program/{program_id}", response_model=Page[HomeworkBriefRead] | Page[HomeworkRead])
 def list_homeworks_by_program(
   program_id: int,
+  fields: str = Query("full", pattern=FIELDS_PATTERN),
+  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  cursor: str | None = None,
   db: Session = Depends(get_db),
   _user=Depends(get_current_kids_role),
 ):
-  homeworks = (
-    db.query(Homework)
-    .filter(Homework.program_id == program_id)
-    .options(joinedload(Homework.files))
-    .order_by(Homework.order)
-    .all()
+  """ДЗ программы в порядке урока: keyset по (order, id)."""
+  query = (
+    select(Homework)
+    .where(Homework.program_id == program_id)
+    .order_by(Homework.order, Homework.id)
+    .limit(limit + 1)
   )
-  return homeworks
+  if cursor is not None:
+    after_order, after_id = decode_cursor(cursor, int, int)
+    query = query.where(tuple_(Homework.order, Homework.id) > tuple_(after_order, after_id))
+  return _homeworks_page(db, query, fields, limit, lambda homework: (homework.order, homework.id))
+
+
+@router.get("/review-queue", response_model=Page[HomeworkReviewItemRead])
+def list_review_queue(
+  group_id: int | None = None,
+  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  cursor: str | None = None,
+  db: Session = Depends(get_db),
+  current=Depends(require_teacher),
+):
+  """
+  Непроверенные ответы (grade IS NULL) по группам учителя, старые первыми; keyset по id.
+  Администратор и модератор видят все группы. Читается по частичному индексу ix_homework_submissions_pending.
+  """
+  homework_ids = select(Homework.id).join(Program, Program.id == Homework.program_id)
+  if current["teacher_id"] is not None:
+    homework_ids = homework_ids.where(
+      Program.group_id.in_(select(Group.id).where(Group.teacher_id == current["teacher_id"]))
+    )
+  if group_id is not None:
+    homework_ids = homework_ids.where(Program.group_id == group_id)
+
+  query = (
+    select(
+      HomeworkSubmission.id,
+      HomeworkSubmission.homework_id,
+      Homework.title.label("homework_title"),
+      Homework.program_id,
+      Program.group_id,
+      HomeworkSubmission.student_id,
+      Student.full_name.label("student_name"),
+      HomeworkSubmission.answer_text,
+    )
+    .join(Homework, Homework.id == HomeworkSubmission.homework_id)
+    .join(Program, Program.id == Homework.program_id)
+    .join(Student, Student.id == HomeworkSubmission.student_id)
+    .where(HomeworkSubmission.grade.is_(None), HomeworkSubmission.homework_id.in_(homework_ids))
+    .order_by(HomeworkSubmission.id)
+    .limit(limit + 1)
+  )
+  if cursor is not None:
+    (after_id,) = decode_cursor(cursor, int)
+    query = query.where(HomeworkSubmission.id > after_id)
+  rows = db.execute(query).all()
+  items = [HomeworkReviewItemRead.model_validate(row) for row in rows[:limit]]
+  next_cursor = encode_cursor(items[-1].id) if len(rows) > limit else None
+  return Page[HomeworkReviewItemRead](items=items, next_cursor=next_cursor)
 
 
 @router.post("/", response_model=HomeworkRead, status_code=status.HTTP_201_CREATED)
@@ -69,6 +212,7 @@ def create_homework(
       file_name=file_data.file_name,
     )
     db.add(file_obj)
+  stats_rollup.record_homework(db, homework)
 
   db.commit()
   db.refresh(homework)
@@ -137,6 +281,7 @@ def delete_homework(
   if not homework:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Домашнее задание не найдено")
   db.delete(homework)
+  stats_rollup.record_homework(db, homework, -1)
   db.commit()
   return None
 
@@ -163,46 +308,129 @@ def create_submission(
       file_name=file_data.file_name,
     )
     db.add(file_obj)
+  stats_rollup.record_homework_submission(db, submission)
 
   db.commit()
   db.refresh(submission)
   return submission
 
 
-@router.get("/submissions/by-homework/{homework_id}", response_model=list[HomeworkSubmissionRead])
+@router.get(
+  "/submissions/by-homework/{homework_id}",
+  response_model=Page[HomeworkSubmissionBriefRead] | Page[HomeworkSubmissionRead],
+)
 def list_submissions_by_homework(
   homework_id: int,
+  fields: str = Query("full", pattern=FIELDS_PATTERN),
+  with_: str = Query("files,comments", alias="with", pattern=WITH_PATTERN),
+  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  cursor: str | None = None,
   db: Session = Depends(get_db),
   _user=Depends(require_teacher),
 ):
-  submissions = (
-    db.query(HomeworkSubmission)
-    .filter(HomeworkSubmission.homework_id == homework_id)
-    .options(
-      joinedload(HomeworkSubmission.files),
-      joinedload(HomeworkSubmission.comments),
-    )
-    .all()
+  query = (
+    select(HomeworkSubmission)
+    .where(HomeworkSubmission.homework_id == homework_id)
+    .order_by(HomeworkSubmission.id)
+    .limit(limit + 1)
   )
-  return submissions
+  if cursor is not None:
+    (after_id,) = decode_cursor(cursor, int)
+    query = query.where(HomeworkSubmission.id > after_id)
+  return _submissions_page(db, query, fields, with_, limit)
 
 
-@router.get("/submissions/by-student/{student_id}", response_model=list[HomeworkSubmissionRead])
+@router.get(
+  "/submissions/by-student/{student_id}",
+  response_model=Page[HomeworkSubmissionBriefRead] | Page[HomeworkSubmissionRead],
+)
 def list_submissions_by_student(
   student_id: int,
+  homework_id: int | None = None,
+  fields: str = Query("full", pattern=FIELDS_PATTERN),
+  with_: str = Query("files,comments", alias="with", pattern=WITH_PATTERN),
+  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  cursor: str | None = None,
   db: Session = Depends(get_db),
   _user=Depends(get_current_kids_role),
 ):
-  submissions = (
-    db.query(HomeworkSubmission)
-    .filter(HomeworkSubmission.student_id == student_id)
-    .options(
-      joinedload(HomeworkSubmission.files),
-      joinedload(HomeworkSubmission.comments),
-    )
-    .all()
+  """История ответов ученика постранично по id; homework_id — только ответы на одно ДЗ."""
+  query = (
+    select(HomeworkSubmission)
+    .where(HomeworkSubmission.student_id == student_id)
+    .order_by(HomeworkSubmission.id)
+    .limit(limit + 1)
   )
-  return submissions
+  if homework_id is not None:
+    query = query.where(HomeworkSubmission.homework_id == homework_id)
+  if cursor is not None:
+    (after_id,) = decode_cursor(cursor, int)
+    query = query.where(HomeworkSubmission.id > after_id)
+  return _submissions_page(db, query, fields, with_, limit)
+
+
+@router.patch("/submissions/bulk", response_model=list[HomeworkSubmissionBulkResult])
+def update_submissions_bulk(
+  payload: list[HomeworkSubmissionBulkItem],
+  db: Session = Depends(get_db),
+  _user=Depends(require_teacher),
+):
+  """
+  Оценки и комментарии к нескольким ответам: один UPDATE ... FROM (VALUES ...) в одной транзакции.
+  Результат — по строке на каждый id запроса в том же порядке; ученикам с новой оценкой — одно уведомление.
+  """
+  if len(payload) > MAX_BULK_ITEMS:
+    raise HTTPException(
+      status_code=status.HTTP_400_BAD_REQUEST,
+      detail=f"Не больше {MAX_BULK_ITEMS} ответов за запрос",
+    )
+  if len({item.id for item in payload}) != len(payload):
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Повторяющиеся id ответов")
+  if not payload:
+    return []
+
+  # Прежние оценки (строки блокируются до commit): уведомляем только тех, чья оценка изменилась
+  previous_grades = dict(db.execute(
+    select(HomeworkSubmission.id, HomeworkSubmission.grade)
+    .where(HomeworkSubmission.id.in_([item.id for item in payload]))
+    .with_for_update()
+  ).all())
+  graded = values(
+    column("id", Integer), column("grade", Integer), column("teacher_comment", Text), name="graded",
+  ).data([(item.id, item.grade, item.teacher_comment) for item in payload])
+  # CAST: тип столбца VALUES, где во всех строках NULL, Postgres выводит как text
+  rows = db.execute(
+    update(HomeworkSubmission)
+    .where(HomeworkSubmission.id == graded.c.id)
+    .values(
+      grade=func.coalesce(cast(graded.c.grade, Integer), HomeworkSubmission.grade),
+      teacher_comment=func.coalesce(cast(graded.c.teacher_comment, Text), HomeworkSubmission.teacher_comment),
+    )
+    .returning(
+      HomeworkSubmission.id,
+      HomeworkSubmission.grade,
+      HomeworkSubmission.teacher_comment,
+      HomeworkSubmission.homework_id,
+      HomeworkSubmission.student_id,
+    )
+    .execution_options(synchronize_session=False)
+  ).all()
+  db.commit()
+
+  by_id = {row.id: row for row in rows}
+  _notify_graded(db, [
+    by_id[item.id] for item in payload
+    if item.grade is not None and item.id in by_id and item.grade != previous_grades.get(item.id)
+  ])
+  return [
+    HomeworkSubmissionBulkResult(
+      id=item.id,
+      updated=item.id in by_id,
+      grade=by_id[item.id].grade if item.id in by_id else None,
+      teacher_comment=by_id[item.id].teacher_comment if item.id in by_id else None,
+    )
+    for item in payload
+  ]
 
 
 @router.patch("/submissions/{submission_id}", response_model=HomeworkSubmissionRead)
@@ -216,6 +444,7 @@ def update_submission(
   if not submission:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ответ не найден")
 
+  regraded = payload.grade is not None and payload.grade != submission.grade
   if payload.answer_text is not None:
     submission.answer_text = payload.answer_text
   if payload.grade is not None:
@@ -225,6 +454,8 @@ def update_submission(
 
   db.commit()
   db.refresh(submission)
+  if regraded:
+    _notify_graded(db, [submission])
   return submission
 
 
@@ -11,6 +11,7 @@ from app.models.student import Student
 from app.models.homework import Homework, HomeworkSubmission
 from app.models.test import Test, TestSubmission
 from app.models.program import Program
+from app.services import telegram_notify
 
 router = APIRouter(prefix="/internal", tags=["internal"])
 
@@ -80,3 +81,10 @@ def get_student_status(
         "new_homework_count": homeworks_without_submission,
         "unpassed_tests_count": tests_without_submission,
     }
+
+
+@router.get("/notify-metrics")
+def get_notify_metrics(request: Request):
+    """Очередь уведомлений в бот: глубина, отброшенные события, задержка отправки."""
+    _require_internal_secret(request)
+    return telegram_notify.dispatcher.metrics()
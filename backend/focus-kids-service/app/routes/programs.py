@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func, distinct
 
 from app.config.database import get_db
@@ -8,8 +8,16 @@ from app.models.lecture import Lecture
 from app.models.homework import Homework
 from app.models.test import Test, TestQuestion
 from app.models.attendance import Attendance
-from app.schemas.program import ProgramCreate, ProgramListRead, ProgramListWithCountsRead, ProgramRead, ProgramUpdate
+from app.schemas.program import (
+  ProgramCreate,
+  ProgramListRead,
+  ProgramListWithCountsRead,
+  ProgramRead,
+  ProgramStudentRead,
+  ProgramUpdate,
+)
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_rollup, test_views
 
 router = APIRouter(prefix="/programs", tags=["programs"])
 
@@ -102,21 +110,27 @@ def create_program(
 def get_program(
   program_id: int,
   db: Session = Depends(get_db),
-  _user=Depends(get_current_kids_role),
+  current=Depends(get_current_kids_role),
 ):
   # filter().first() с options гарантирует подгрузку связей; .get() может их не применить и вызвать 500 при сериализации
   program = (
     db.query(Program)
     .options(
-      joinedload(Program.lectures),
-      joinedload(Program.homeworks).joinedload(Homework.files),
-      joinedload(Program.tests).joinedload(Test.questions).joinedload(TestQuestion.answers),
+      selectinload(Program.lectures),
+      selectinload(Program.homeworks).selectinload(Homework.files),
+      selectinload(Program.tests).selectinload(Test.questions).selectinload(TestQuestion.answers),
     )
     .filter(Program.id == program_id)
     .first()
   )
   if not program:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Программа не найдена")
+  if current["role"] == "student":
+    # Мимо response_model (ProgramRead с is_correct в тестах)
+    return Response(
+      content=ProgramStudentRead.model_validate(program).model_dump_json(),
+      media_type="application/json",
+    )
   return program
 
 
@@ -150,6 +164,9 @@ def delete_program(
   program = db.query(Program).get(program_id)
   if not program:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Программа не найдена")
+  for (test_id,) in db.query(Test.id).filter(Test.program_id == program_id):
+    test_views.invalidate(db, test_id)
   db.delete(program)
+  stats_rollup.record_program_deleted(db, program)
   db.commit()
   return None
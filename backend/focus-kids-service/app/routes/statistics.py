@@ -1,24 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+import operator
+from datetime import date
+from functools import reduce
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import Date, cast, distinct, func, select
 
-from app.config.database import get_db
+from app.config.database import SessionLocal, get_db
 from app.models.student import Student
 from app.models.attendance import Attendance
 from app.models.grade import Grade
 from app.models.group import Group
-from app.models.homework import Homework, HomeworkSubmission
-from app.models.test import Test, TestSubmission
+from app.models.stats_rollup import GroupStatsRollup, StudentStatsRollup
+from app.models.teacher import Teacher
 from app.schemas.statistics import (
+  StatisticsTrendsRead,
   StudentStatisticsRead,
   TeacherStatisticsRead,
   TeacherGroupStatisticsRead,
 )
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_cache, stats_rollup
+from app.services.stats_rollup import LESSON_GRADE_TYPES
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
 
 
+def _teacher_group_rows(db: Session, teacher_id: int | None = None):
+  """
+  Статистика групп одним запросом: groups LEFT JOIN group_stats_rollup и число учеников по group_id.
+  teacher_id=None — группы всех преподавателей.
+  """
+  scope = (Group.teacher_id == teacher_id) if teacher_id is not None else Group.teacher_id.isnot(None)
+  students = (
+    select(Student.group_id, func.count().label("total_students"))
+    .where(Student.group_id.in_(select(Group.id).where(scope)))
+    .group_by(Student.group_id)
+    .subquery()
+  )
+  query = (
+    select(
+      Group.id.label("group_id"),
+      Group.name.label("group_name"),
+      Group.teacher_id,
+      func.coalesce(students.c.total_students, 0).label("total_students"),
+      func.coalesce(GroupStatsRollup.total_lessons, 0).label("total_lessons"),
+      func.coalesce(GroupStatsRollup.attended_lessons, 0).label("attended_lessons"),
+      func.coalesce(GroupStatsRollup.grade_sum, 0).label("grade_sum"),
+      func.coalesce(GroupStatsRollup.grade_count, 0).label("grade_count"),
+    )
+    .outerjoin(GroupStatsRollup, GroupStatsRollup.group_id == Group.id)
+    .outerjoin(students, students.c.group_id == Group.id)
+    .where(scope)
+    .order_by(Group.teacher_id, Group.id)
+  )
+  return db.execute(query).all()
+
+
+def _group_statistics_read(row) -> TeacherGroupStatisticsRead:
+  avg_attendance = (row.attended_lessons / row.total_lessons * 100) if row.total_lessons > 0 else 0.0
+  avg_grade = (row.grade_sum / row.grade_count) if row.grade_count > 0 else None
+  return TeacherGroupStatisticsRead(
+    group_id=row.group_id,
+    group_name=row.group_name or "",
+    total_students=row.total_students,
+    average_attendance_rate=round(avg_attendance, 2),
+    average_grade=round(avg_grade, 2) if avg_grade is not None else None,
+    total_lessons=row.total_lessons,
+  )
+
+
+def _group_scopes(rows) -> tuple:
+  return tuple(stats_cache.group_scope(row.group_id) for row in rows)
+
+
+def _teacher_statistics_read(teacher_id: int, group_stats: list[TeacherGroupStatisticsRead]) -> TeacherStatisticsRead:
+  return TeacherStatisticsRead(
+    teacher_id=teacher_id,
+    total_groups=len(group_stats),
+    total_students=sum(g.total_students for g in group_stats),
+    groups=group_stats,
+  )
+
+
 @router.get("/students/{student_id}", response_model=StudentStatisticsRead)
 def get_student_statistics(
   student_id: int,
@@ -28,114 +96,32 @@ def get_student_statistics(
   # Ученик — только свои данные; администратор и модератор (роль teacher с student_id=None) — полный доступ
   if current["role"] == "student" and current["student_id"] != student_id:
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ только к своей статистике")
+  return stats_cache.cache.get_or_compute(("student", student_id), lambda: _student_statistics(db, student_id))
+
+
+def _student_statistics(db: Session, student_id: int):
   student = db.query(Student).get(student_id)
   if not student:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ученик не найден")
 
-  # Посещаемость
-  attendance_records = db.query(Attendance).filter(Attendance.student_id == student_id).all()
-  total_lessons = len(attendance_records)
-  attended_lessons = sum(1 for a in attendance_records if a.present)
+  rollup = stats_rollup.get_student_rollup(db, student_id)
+  group_rollup = stats_rollup.get_group_rollup(db, student.group_id)
+
+  total_lessons = rollup.total_lessons
+  attended_lessons = rollup.attended_lessons
   attendance_rate = (attended_lessons / total_lessons * 100) if total_lessons > 0 else 0.0
+  total_grades = sum(getattr(rollup, f"{t}_count") for t in LESSON_GRADE_TYPES)
+  grade_sum = sum(getattr(rollup, f"{t}_sum") for t in LESSON_GRADE_TYPES)
+  average_grade = grade_sum / total_grades if total_grades > 0 else None
 
-  # Оценки за занятия: только типы, которые являются оценками 1–5 (без homework_next, teacher_comment и тестов)
-  grades = db.query(Grade).filter(Grade.student_id == student_id).all()
-  lesson_grade_types = ("oral_hw", "written_hw", "dictation", "classwork")
-  grades_for_avg = [g for g in grades if g.type in lesson_grade_types]
-  total_grades = len(grades_for_avg)
-  average_grade = sum(g.value for g in grades_for_avg) / total_grades if total_grades > 0 else None
-
-  # Домашние задания: из программ (Homework + HomeworkSubmission) и с уроков (оценки homework_next)
-  from app.models.program import Program
-
-  program_total_hw = 0
-  program_completed_hw = 0
-  if student.group_id:
-    group_programs = db.query(Program).filter(Program.group_id == student.group_id).all()
-    program_ids = [p.id for p in group_programs]
-    if program_ids:
-      group_homeworks = db.query(Homework).filter(Homework.program_id.in_(program_ids)).all()
-      program_total_hw = len(group_homeworks)
-      homework_ids = [h.id for h in group_homeworks]
-      if homework_ids:
-        program_completed_hw = db.query(HomeworkSubmission).filter(
-          and_(
-            HomeworkSubmission.student_id == student_id,
-            HomeworkSubmission.homework_id.in_(homework_ids)
-          )
-        ).count()
-      else:
-        program_completed_hw = 0
-    else:
-      program_total_hw = 0
-      program_completed_hw = 0
-  else:
-    program_total_hw = 0
-    program_completed_hw = 0
-
-  # ДЗ с уроков: оценки типа homework_next; «выполнено» — если на более позднем уроке есть oral_hw или written_hw
-  lesson_hw_grades = [
-    g for g in grades
-    if g.type == "homework_next" and g.lesson_date is not None
-  ]
-  lesson_hw_total = len(lesson_hw_grades)
-  lesson_hw_completed = 0
-  for g in lesson_hw_grades:
-    assigned_date = g.lesson_date
-    has_later_grade = any(
-      og.type in ("oral_hw", "written_hw") and og.lesson_date is not None and og.lesson_date > assigned_date
-      for og in grades
-    )
-    if has_later_grade:
-      lesson_hw_completed += 1
-
-  total_homeworks = program_total_hw + lesson_hw_total
-  completed_homeworks = program_completed_hw + lesson_hw_completed
-
-  # Тесты: считаем количество решённых тестов (уникальных), средний балл — по лучшей попытке по каждому тесту
-  if student.group_id:
-    group_programs = db.query(Program).filter(Program.group_id == student.group_id).all()
-    program_ids = [p.id for p in group_programs]
-    if program_ids:
-      group_tests = db.query(Test).filter(Test.program_id.in_(program_ids)).all()
-      total_tests = len(group_tests)
-      test_ids = [t.id for t in group_tests]
-      if test_ids:
-        test_submissions = db.query(TestSubmission).filter(
-          and_(
-            TestSubmission.student_id == student_id,
-            TestSubmission.test_id.in_(test_ids),
-            TestSubmission.score.isnot(None),
-          )
-        ).all()
-        # Уникальные тесты (сколько тестов решено), лучшая попытка по каждому тесту
-        best_by_test: dict[int, TestSubmission] = {}
-        for s in test_submissions:
-          prev = best_by_test.get(s.test_id)
-          s_score = s.score or -1
-          prev_score = prev.score if prev else -1
-          if prev is None or s_score > prev_score:
-            best_by_test[s.test_id] = s
-        completed_tests = len(best_by_test)
-        if best_by_test:
-          total_score = sum(s.score for s in best_by_test.values())
-          total_max = sum(s.max_score or 0 for s in best_by_test.values())
-          average_test_score = (total_score / total_max * 100) if total_max > 0 else None
-        else:
-          average_test_score = None
-      else:
-        completed_tests = 0
-        average_test_score = None
-    else:
-      total_tests = 0
-      completed_tests = 0
-      average_test_score = None
-  else:
-    total_tests = 0
-    completed_tests = 0
-    average_test_score = None
+  total_homeworks = group_rollup.total_homeworks + rollup.lesson_hw_total
+  completed_homeworks = rollup.completed_homeworks + rollup.lesson_hw_completed
 
-  return StudentStatisticsRead(
+  completed_tests = rollup.completed_tests
+  total_best_max = rollup.best_max_score_sum
+  average_test_score = (rollup.best_score_sum / total_best_max * 100) if completed_tests and total_best_max > 0 else None
+
+  result = StudentStatisticsRead(
     student_id=student_id,
     total_lessons=total_lessons,
     attended_lessons=attended_lessons,
@@ -145,9 +131,13 @@ def get_student_statistics(
     completed_homeworks=completed_homeworks,
     total_homeworks=total_homeworks,
     completed_tests=completed_tests,
-    total_tests=total_tests,
+    total_tests=group_rollup.total_tests,
     average_test_score=round(average_test_score, 2) if average_test_score else None,
   )
+  scopes = [stats_cache.student_scope(student_id)]
+  if student.group_id is not None:
+    scopes.append(stats_cache.group_scope(student.group_id))
+  return result, tuple(scopes)
 
 
 @router.get("/teachers/{teacher_id}", response_model=TeacherStatisticsRead)
@@ -162,84 +152,436 @@ def get_teacher_statistics(
   if current["teacher_id"] is not None and current["teacher_id"] != teacher_id:
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ только к своей статистике преподавателя")
 
-  groups = db.query(Group).filter(Group.teacher_id == teacher_id).all()
-  total_groups = len(groups)
-  group_stats = []
-  total_students = 0
-
-  for gr in groups:
-    students = db.query(Student).filter(Student.group_id == gr.id).all()
-    group_students_count = len(students)
-    total_students += group_students_count
-
-    attendance_records = db.query(Attendance).filter(Attendance.group_id == gr.id).all()
-    total_lessons = len(attendance_records)
-    attended_lessons = sum(1 for a in attendance_records if a.present)
-    avg_attendance = (attended_lessons / total_lessons * 100) if total_lessons > 0 else 0.0
-
-    grades = db.query(Grade).filter(Grade.group_id == gr.id).all()
-    lesson_grade_types = ("oral_hw", "written_hw", "dictation", "classwork")
-    grades_for_avg = [g for g in grades if g.type in lesson_grade_types]
-    avg_grade = (sum(g.value for g in grades_for_avg) / len(grades_for_avg)) if grades_for_avg else None
-
-    group_stats.append(
-      TeacherGroupStatisticsRead(
-        group_id=gr.id,
-        group_name=gr.name or "",
-        total_students=group_students_count,
-        average_attendance_rate=round(avg_attendance, 2),
-        average_grade=round(avg_grade, 2) if avg_grade is not None else None,
-        total_lessons=total_lessons,
-      )
-    )
+  def compute():
+    rows = _teacher_group_rows(db, teacher_id)
+    group_stats = [_group_statistics_read(row) for row in rows]
+    return _teacher_statistics_read(teacher_id, group_stats), _group_scopes(rows)
 
-  return TeacherStatisticsRead(
-    teacher_id=teacher_id,
-    total_groups=total_groups,
-    total_students=total_students,
-    groups=group_stats,
-  )
+  return stats_cache.cache.get_or_compute(("teacher", teacher_id), compute)
+
+
+@router.get("/teachers", response_model=list[TeacherStatisticsRead])
+def list_teachers_statistics(
+  db: Session = Depends(get_db),
+  current=Depends(require_teacher),
+):
+  """Статистика всех преподавателей сразу (администратор и модератор)."""
+  if current["teacher_id"] is not None:
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступно только администратору и модератору")
+
+  def compute():
+    rows = _teacher_group_rows(db)
+    groups_by_teacher: dict[int, list[TeacherGroupStatisticsRead]] = {}
+    for row in rows:
+      groups_by_teacher.setdefault(row.teacher_id, []).append(_group_statistics_read(row))
+    teacher_ids = db.execute(select(Teacher.id).order_by(Teacher.id)).scalars().all()
+    result = [_teacher_statistics_read(tid, groups_by_teacher.get(tid, [])) for tid in teacher_ids]
+    return result, _group_scopes(rows)
+
+  return stats_cache.cache.get_or_compute(("teachers",), compute)
+
+
+@router.get("/cache")
+def get_statistics_cache_stats(current=Depends(require_teacher)):
+  """Размер и попадания кэша статистики — для мониторинга (администратор и модератор)."""
+  if current["teacher_id"] is not None:
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступно только администратору и модератору")
+  return stats_cache.cache.stats()
 
 
 @router.get("/groups/{group_id}/overview")
 def get_group_overview(
   group_id: int,
+  date_from: date | None = Query(None, alias="from"),
+  date_to: date | None = Query(None, alias="to"),
   db: Session = Depends(get_db),
   _user=Depends(require_teacher),
 ):
+  """Сводка по ученикам группы; from/to (включительно) ограничивают период по дате занятия."""
+  return stats_cache.cache.get_or_compute(
+    ("group_overview", group_id, date_from, date_to),
+    lambda: _group_overview(db, group_id, date_from, date_to),
+  )
+
+
+def _group_overview(db: Session, group_id: int, date_from: date | None, date_to: date | None):
   group = db.query(Group).get(group_id)
   if not group:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Группа не найдена")
 
-  students = db.query(Student).filter(Student.group_id == group_id).all()
-  
-  # Статистика по посещаемости
-  attendance_records = db.query(Attendance).filter(Attendance.group_id == group_id).all()
-  total_lessons = len(set(a.lesson_date for a in attendance_records))
-  
+  attendance_filters = [Attendance.group_id == group_id]
+  grade_filters = [Grade.group_id == group_id]
+  if date_from is not None:
+    attendance_filters.append(Attendance.lesson_date >= date_from)
+    grade_filters.append(Grade.lesson_date >= date_from)
+  if date_to is not None:
+    attendance_filters.append(Attendance.lesson_date <= date_to)
+    grade_filters.append(Grade.lesson_date <= date_to)
+
+  total_lessons = db.execute(
+    select(func.count(distinct(Attendance.lesson_date))).where(*attendance_filters)
+  ).scalar_one()
+
+  attendance = (
+    select(
+      Attendance.student_id,
+      func.count().label("total"),
+      func.count().filter(Attendance.present.is_(True)).label("attended"),
+    )
+    .where(*attendance_filters)
+    .group_by(Attendance.student_id)
+    .subquery()
+  )
+  grades = (
+    select(
+      Grade.student_id,
+      func.count().label("total_grades"),
+      func.avg(Grade.value).filter(Grade.type.in_(LESSON_GRADE_TYPES)).label("average_grade"),
+    )
+    .where(*grade_filters)
+    .group_by(Grade.student_id)
+    .subquery()
+  )
+  rows = db.execute(
+    select(
+      Student.id,
+      Student.full_name,
+      attendance.c.total,
+      attendance.c.attended,
+      grades.c.total_grades,
+      grades.c.average_grade,
+    )
+    .outerjoin(attendance, attendance.c.student_id == Student.id)
+    .outerjoin(grades, grades.c.student_id == Student.id)
+    .where(Student.group_id == group_id)
+    .order_by(Student.id)
+  ).all()
+
   student_stats = []
-  for student in students:
-    student_attendance = [a for a in attendance_records if a.student_id == student.id]
-    attended = sum(1 for a in student_attendance if a.present)
-    attendance_rate = (attended / len(student_attendance) * 100) if student_attendance else 0.0
-    
-    student_grades = db.query(Grade).filter(Grade.student_id == student.id).all()
-    lesson_grade_types = ("oral_hw", "written_hw", "dictation", "classwork")
-    grades_for_avg = [g for g in student_grades if g.type in lesson_grade_types]
-    avg_grade = sum(g.value for g in grades_for_avg) / len(grades_for_avg) if grades_for_avg else None
-    
+  for row in rows:
+    attendance_rate = (row.attended / row.total * 100) if row.total else 0.0
+    avg_grade = float(row.average_grade) if row.average_grade is not None else None
     student_stats.append({
-      "student_id": student.id,
-      "full_name": student.full_name,
+      "student_id": row.id,
+      "full_name": row.full_name,
       "attendance_rate": round(attendance_rate, 2),
       "average_grade": round(avg_grade, 2) if avg_grade else None,
-      "total_grades": len(student_grades),
+      "total_grades": row.total_grades or 0,
     })
 
-  return {
+  result = {
     "group_id": group_id,
     "group_name": group.name,
-    "total_students": len(students),
+    "total_students": len(rows),
     "total_lessons": total_lessons,
     "students": student_stats,
   }
+  return result, (stats_cache.group_scope(group_id),)
+
+
+TREND_BUCKET_PATTERN = "^(week|month)$"
+
+
+def _trends_query(bucket: str, attendance_filters: list, grade_filters: list):
+  """
+  Посещаемость и оценки за занятия по периодам date_trunc(bucket, lesson_date).
+  Периоды посещаемости и оценок объединяются FULL JOIN; нарастающие итоги — оконные SUM по периоду.
+  """
+  attendance_bucket = cast(func.date_trunc(bucket, Attendance.lesson_date), Date)
+  attendance = (
+    select(
+      attendance_bucket.label("bucket"),
+      func.count().label("total"),
+      func.count().filter(Attendance.present.is_(True)).label("attended"),
+    )
+    .where(*attendance_filters)
+    .group_by(attendance_bucket)
+    .subquery()
+  )
+  grade_bucket = cast(func.date_trunc(bucket, Grade.lesson_date), Date)
+  grades = (
+    select(
+      grade_bucket.label("bucket"),
+      func.sum(Grade.value).label("grade_sum"),
+      func.count().label("grade_count"),
+    )
+    .where(Grade.type.in_(LESSON_GRADE_TYPES), Grade.lesson_date.isnot(None), *grade_filters)
+    .group_by(grade_bucket)
+    .subquery()
+  )
+  bucket_column = func.coalesce(attendance.c.bucket, grades.c.bucket)
+  total = func.coalesce(attendance.c.total, 0)
+  attended = func.coalesce(attendance.c.attended, 0)
+  grade_sum = func.coalesce(grades.c.grade_sum, 0)
+  grade_count = func.coalesce(grades.c.grade_count, 0)
+  return (
+    select(
+      bucket_column.label("bucket"),
+      total.label("total"),
+      attended.label("attended"),
+      grade_sum.label("grade_sum"),
+      grade_count.label("grade_count"),
+      func.sum(total).over(order_by=bucket_column).label("total_cumulative"),
+      func.sum(attended).over(order_by=bucket_column).label("attended_cumulative"),
+      func.sum(grade_sum).over(order_by=bucket_column).label("grade_sum_cumulative"),
+      func.sum(grade_count).over(order_by=bucket_column).label("grade_count_cumulative"),
+    )
+    .select_from(attendance)
+    .join(grades, grades.c.bucket == attendance.c.bucket, full=True)
+    .order_by(bucket_column)
+  )
+
+
+def _ratio(numerator, denominator, scale: int = 1) -> float | None:
+  return round(float(numerator) / float(denominator) * scale, 2) if denominator else None
+
+
+def _trends(db: Session, bucket: str, attendance_filters: list, grade_filters: list) -> StatisticsTrendsRead:
+  rows = db.execute(_trends_query(bucket, attendance_filters, grade_filters)).all()
+  return StatisticsTrendsRead(
+    bucket=bucket,
+    dates=[row.bucket for row in rows],
+    attendance_marks=[row.total for row in rows],
+    attendance=[_ratio(row.attended, row.total, 100) for row in rows],
+    avg_grade=[_ratio(row.grade_sum, row.grade_count) for row in rows],
+    attendance_cumulative=[_ratio(row.attended_cumulative, row.total_cumulative, 100) for row in rows],
+    avg_grade_cumulative=[_ratio(row.grade_sum_cumulative, row.grade_count_cumulative) for row in rows],
+  )
+
+
+def _period_filters(column, date_from: date | None, date_to: date | None) -> list:
+  filters = []
+  if date_from is not None:
+    filters.append(column >= date_from)
+  if date_to is not None:
+    filters.append(column <= date_to)
+  return filters
+
+
+@router.get("/students/{student_id}/trends", response_model=StatisticsTrendsRead)
+def get_student_trends(
+  student_id: int,
+  bucket: str = Query("week", pattern=TREND_BUCKET_PATTERN),
+  date_from: date | None = Query(None, alias="from"),
+  date_to: date | None = Query(None, alias="to"),
+  db: Session = Depends(get_db),
+  current=Depends(get_current_kids_role),
+):
+  """Посещаемость (%) и средняя оценка ученика по неделям или месяцам — для графиков в Mini App."""
+  if current["role"] == "student" and current["student_id"] != student_id:
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ только к своей статистике")
+
+  def compute():
+    if db.query(Student).get(student_id) is None:
+      raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ученик не найден")
+    result = _trends(
+      db,
+      bucket,
+      [Attendance.student_id == student_id, *_period_filters(Attendance.lesson_date, date_from, date_to)],
+      [Grade.student_id == student_id, *_period_filters(Grade.lesson_date, date_from, date_to)],
+    )
+    return result, (stats_cache.student_scope(student_id),)
+
+  return stats_cache.cache.get_or_compute(("student_trends", student_id, bucket, date_from, date_to), compute)
+
+
+@router.get("/groups/{group_id}/trends", response_model=StatisticsTrendsRead)
+def get_group_trends(
+  group_id: int,
+  bucket: str = Query("week", pattern=TREND_BUCKET_PATTERN),
+  date_from: date | None = Query(None, alias="from"),
+  date_to: date | None = Query(None, alias="to"),
+  db: Session = Depends(get_db),
+  _user=Depends(require_teacher),
+):
+  """Посещаемость (%) и средняя оценка группы по неделям или месяцам."""
+  def compute():
+    if db.query(Group).get(group_id) is None:
+      raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Группа не найдена")
+    result = _trends(
+      db,
+      bucket,
+      [Attendance.group_id == group_id, *_period_filters(Attendance.lesson_date, date_from, date_to)],
+      [Grade.group_id == group_id, *_period_filters(Grade.lesson_date, date_from, date_to)],
+    )
+    return result, (stats_cache.group_scope(group_id),)
+
+  return stats_cache.cache.get_or_compute(("group_trends", group_id, bucket, date_from, date_to), compute)
+
+
+EXPORT_COLUMNS = (
+  "student_id",
+  "full_name",
+  "group_id",
+  "group_name",
+  "teacher_id",
+  "total_lessons",
+  "attended_lessons",
+  "attendance_rate",
+  "average_grade",
+  "total_grades",
+  "completed_homeworks",
+  "total_homeworks",
+  "completed_tests",
+  "total_tests",
+  "average_test_score",
+)
+EXPORT_BATCH_SIZE = 500
+
+
+def _export_query(group_id: int | None, teacher_id: int | None, date_from: date | None, date_to: date | None):
+  """
+  Одна строка на ученика. Без периода посещаемость и оценки берутся из агрегатов;
+  с from/to — считаются по attendance и grades за период одним GROUP BY.
+  ДЗ и тесты — всегда за всё время (у ответов нет даты).
+  """
+  rollup_grade_sum = reduce(operator.add, (getattr(StudentStatsRollup, f"{t}_sum") for t in LESSON_GRADE_TYPES))
+  rollup_grade_count = reduce(operator.add, (getattr(StudentStatsRollup, f"{t}_count") for t in LESSON_GRADE_TYPES))
+  filters = []
+  if group_id is not None:
+    filters.append(Student.group_id == group_id)
+  if teacher_id is not None:
+    filters.append(Student.group_id.in_(select(Group.id).where(Group.teacher_id == teacher_id)))
+
+  query = (
+    select(
+      Student.id.label("student_id"),
+      Student.full_name,
+      Student.group_id,
+      Group.name.label("group_name"),
+      Group.teacher_id,
+      func.coalesce(StudentStatsRollup.completed_homeworks + StudentStatsRollup.lesson_hw_completed, 0).label("completed_homeworks"),
+      func.coalesce(GroupStatsRollup.total_homeworks, 0).label("program_total_hw"),
+      func.coalesce(StudentStatsRollup.lesson_hw_total, 0).label("lesson_hw_total"),
+      func.coalesce(StudentStatsRollup.completed_tests, 0).label("completed_tests"),
+      func.coalesce(GroupStatsRollup.total_tests, 0).label("total_tests"),
+      func.coalesce(StudentStatsRollup.best_score_sum, 0).label("best_score_sum"),
+      func.coalesce(StudentStatsRollup.best_max_score_sum, 0).label("best_max_score_sum"),
+    )
+    .outerjoin(Group, Group.id == Student.group_id)
+    .outerjoin(StudentStatsRollup, StudentStatsRollup.student_id == Student.id)
+    .outerjoin(GroupStatsRollup, GroupStatsRollup.group_id == Student.group_id)
+  )
+
+  if date_from is None and date_to is None:
+    query = query.add_columns(
+      func.coalesce(StudentStatsRollup.total_lessons, 0).label("total_lessons"),
+      func.coalesce(StudentStatsRollup.attended_lessons, 0).label("attended_lessons"),
+      func.coalesce(rollup_grade_sum, 0).label("grade_sum"),
+      func.coalesce(rollup_grade_count, 0).label("grade_count"),
+    )
+  else:
+    scoped_students = select(Student.id).where(*filters)
+    attendance_filters = [Attendance.student_id.in_(scoped_students)]
+    grade_filters = [Grade.student_id.in_(scoped_students), Grade.type.in_(LESSON_GRADE_TYPES)]
+    if date_from is not None:
+      attendance_filters.append(Attendance.lesson_date >= date_from)
+      grade_filters.append(Grade.lesson_date >= date_from)
+    if date_to is not None:
+      attendance_filters.append(Attendance.lesson_date <= date_to)
+      grade_filters.append(Grade.lesson_date <= date_to)
+    attendance = (
+      select(
+        Attendance.student_id,
+        func.count().label("total"),
+        func.count().filter(Attendance.present.is_(True)).label("attended"),
+      )
+      .where(*attendance_filters)
+      .group_by(Attendance.student_id)
+      .subquery()
+    )
+    grades = (
+      select(Grade.student_id, func.sum(Grade.value).label("grade_sum"), func.count().label("grade_count"))
+      .where(*grade_filters)
+      .group_by(Grade.student_id)
+      .subquery()
+    )
+    query = (
+      query.add_columns(
+        func.coalesce(attendance.c.total, 0).label("total_lessons"),
+        func.coalesce(attendance.c.attended, 0).label("attended_lessons"),
+        func.coalesce(grades.c.grade_sum, 0).label("grade_sum"),
+        func.coalesce(grades.c.grade_count, 0).label("grade_count"),
+      )
+      .outerjoin(attendance, attendance.c.student_id == Student.id)
+      .outerjoin(grades, grades.c.student_id == Student.id)
+    )
+
+  return query.where(*filters).order_by(Student.id)
+
+
+def _export_row(row) -> dict:
+  attendance_rate = (row.attended_lessons / row.total_lessons * 100) if row.total_lessons > 0 else 0.0
+  average_grade = row.grade_sum / row.grade_count if row.grade_count > 0 else None
+  average_test_score = (
+    row.best_score_sum / row.best_max_score_sum * 100
+    if row.completed_tests and row.best_max_score_sum > 0 else None
+  )
+  return {
+    "student_id": row.student_id,
+    "full_name": row.full_name,
+    "group_id": row.group_id,
+    "group_name": row.group_name,
+    "teacher_id": row.teacher_id,
+    "total_lessons": row.total_lessons,
+    "attended_lessons": row.attended_lessons,
+    "attendance_rate": round(attendance_rate, 2),
+    "average_grade": round(average_grade, 2) if average_grade else None,
+    "total_grades": row.grade_count,
+    "completed_homeworks": row.completed_homeworks,
+    "total_homeworks": row.program_total_hw + row.lesson_hw_total,
+    "completed_tests": row.completed_tests,
+    "total_tests": row.total_tests,
+    "average_test_score": round(average_test_score, 2) if average_test_score else None,
+  }
+
+
+def _stream_export(query, export_format: str):
+  # Собственная сессия: зависимость get_db закрывается до отправки тела StreamingResponse
+  with SessionLocal() as db:
+    result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    if export_format == "csv":
+      buffer = io.StringIO()
+      writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+      writer.writeheader()
+      for rows in result.partitions():
+        writer.writerows(_export_row(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+      if buffer.tell():
+        yield buffer.getvalue()
+    else:
+      for rows in result.partitions():
+        yield "".join(json.dumps(_export_row(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+@router.get("/export")
+def export_statistics(
+  export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+  group_id: int | None = None,
+  teacher_id: int | None = None,
+  date_from: date | None = Query(None, alias="from"),
+  date_to: date | None = Query(None, alias="to"),
+  current=Depends(require_teacher),
+):
+  """
+  Статистика всех учеников потоком (NDJSON или CSV), по строке на ученика.
+  Фильтры: group_id, teacher_id, from/to (период для посещаемости и оценок).
+  Преподаватель выгружает только свои группы.
+  """
+  if current["teacher_id"] is not None:
+    if teacher_id is not None and teacher_id != current["teacher_id"]:
+      raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ только к своим группам")
+    teacher_id = current["teacher_id"]
+
+  query = _export_query(group_id, teacher_id, date_from, date_to)
+  if export_format == "csv":
+    media_type, filename = "text/csv; charset=utf-8", "statistics.csv"
+  else:
+    media_type, filename = "application/x-ndjson", "statistics.ndjson"
+  return StreamingResponse(
+    _stream_export(query, export_format),
+    media_type=media_type,
+    headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+  )
@@ -5,6 +5,7 @@ from app.config.database import get_db
 from app.models.student import Student
 from app.schemas.student import StudentCreate, StudentRead, StudentUpdate
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_cache, stats_rollup
 from app.services.focus_client import focus_user_exists_sync
 
 router = APIRouter(prefix="/students", tags=["students"])
@@ -47,6 +48,7 @@ def create_student(
     group_id=payload.group_id,
   )
   db.add(student)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   db.refresh(student)
   return student
@@ -76,8 +78,10 @@ def update_student(
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ученик не найден")
   if payload.full_name is not None:
     student.full_name = payload.full_name
-  if payload.group_id is not None:
+  if payload.group_id is not None and payload.group_id != student.group_id:
     student.group_id = payload.group_id
+    stats_rollup.record_student_group_change(db, student.id)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   db.refresh(student)
   return student
@@ -93,6 +97,7 @@ def delete_student(
   if not student:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ученик не найден")
   db.delete(student)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   return None
 
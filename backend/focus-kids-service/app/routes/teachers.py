@@ -5,6 +5,7 @@ from app.config.database import get_db
 from app.models.teacher import Teacher
 from app.schemas.teacher import TeacherCreate, TeacherRead, TeacherUpdate
 from app.dependencies.roles import get_current_kids_role, require_teacher
+from app.services import stats_cache
 from app.services.focus_client import focus_user_exists_sync
 
 router = APIRouter(prefix="/teachers", tags=["teachers"])
@@ -40,6 +41,7 @@ def create_teacher(
     )
   teacher = Teacher(full_name=payload.full_name, focus_user_id=payload.focus_user_id)
   db.add(teacher)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   db.refresh(teacher)
   return teacher
@@ -86,6 +88,7 @@ def delete_teacher(
   if not teacher:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Преподаватель не найден")
   db.delete(teacher)
+  stats_cache.mark_structure_changed(db)
   db.commit()
   return None
 
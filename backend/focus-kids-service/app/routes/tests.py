@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-import json
+import asyncio
+import time
 
-from app.config.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
+
+from app.config.database import SessionLocal, get_db
+from app.config.settings import settings
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
 from app.models.test import (
   Test,
   TestQuestion,
@@ -12,13 +18,33 @@ from app.models.test import (
 )
 from app.models.program import Program
 from app.models.student import Student
+from app.services import (
+  attempt_ledger,
+  grading,
+  item_analysis,
+  regrade,
+  stats_rollup,
+  submission_queue,
+  test_submissions,
+  test_views,
+)
 from app.services.telegram_notify import notify_students
+from app.schemas.pagination import Page
 from app.schemas.test import (
+  RegradeJobRead,
+  TestAnalysisRead,
+  TestAnswerRead,
+  TestAnswerUpdate,
   TestCreate,
+  TestQuestionCreate,
   TestRead,
+  TestStudentRead,
+  TestSummaryRead,
   TestUpdate,
   TestSubmissionCreate,
   TestSubmissionRead,
+  TestSubmissionResultRead,
+  TestSubmissionTicketRead,
   TestSubmissionUpdate,
 )
 from app.dependencies.roles import get_current_kids_role, require_teacher, require_student
@@ -26,40 +52,111 @@ from app.dependencies.roles import get_current_kids_role, require_teacher, requi
 router = APIRouter(prefix="/tests", tags=["tests"])
 
 
-@router.get("/", response_model=list[TestRead])
-@router.get("", response_model=list[TestRead])
+RESULT_POLL_SECONDS = 0.5
+
+
+def _load_submission_result(submission_id: int) -> dict | None:
+  with SessionLocal() as db:
+    return submission_queue.get_result(db, submission_id)
+
+
+def _with_questions():
+  # selectinload: вопросы и варианты — отдельными запросами по id, строк tests + questions + answers, а не их произведение
+  return selectinload(Test.questions).selectinload(TestQuestion.answers)
+
+
+@router.get("/", response_model=Page[TestSummaryRead] | Page[TestRead])
+@router.get("", response_model=Page[TestSummaryRead] | Page[TestRead])
 def list_tests(
+  program_id: int | None = None,
+  summary: bool = False,
+  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  cursor: str | None = None,
   db: Session = Depends(get_db),
-  _user=Depends(get_current_kids_role),
+  current=Depends(get_current_kids_role),
 ):
-  tests = (
-    db.query(Test)
-    .options(
-      joinedload(Test.questions).joinedload(TestQuestion.answers),
+  """
+  Тесты постранично по id (keyset: ?cursor= из next_cursor прошлой страницы).
+  summary=true — только поля теста и число вопросов, без вопросов и вариантов (доступно ученикам).
+  Полные тесты с is_correct — только преподавателям; ученик открывает тест через /{test_id}/student.
+  """
+  if not summary and current["role"] != "teacher":
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Требуется роль преподавателя")
+  query = select(Test).order_by(Test.id).limit(limit + 1)
+  if program_id is not None:
+    query = query.where(Test.program_id == program_id)
+  if cursor is not None:
+    (after_id,) = decode_cursor(cursor, int)
+    query = query.where(Test.id > after_id)
+
+  if summary:
+    questions_count = (
+      select(func.count())
+      .where(TestQuestion.test_id == Test.id)
+      .correlate(Test)
+      .scalar_subquery()
     )
-    .all()
-  )
-  return tests
+    rows = db.execute(query.add_columns(questions_count.label("questions_count"))).all()
+    items = [
+      TestSummaryRead.model_validate(test).model_copy(update={"questions_count": count})
+      for test, count in rows[:limit]
+    ]
+    page_cls = Page[TestSummaryRead]
+  else:
+    rows = db.execute(query.options(_with_questions())).scalars().all()
+    items = [TestRead.model_validate(test) for test in rows[:limit]]
+    page_cls = Page[TestRead]
+  next_cursor = encode_cursor(items[-1].id) if len(rows) > limit else None
+  return page_cls(items=items, next_cursor=next_cursor)
 
 
 @router.get("/by-program/{program_id}", response_model=list[TestRead])
 def list_tests_by_program(
   program_id: int,
   db: Session = Depends(get_db),
-  _user=Depends(get_current_kids_role),
+  _user=Depends(require_teacher),
 ):
   tests = (
     db.query(Test)
     .filter(Test.program_id == program_id)
-    .options(
-      joinedload(Test.questions).joinedload(TestQuestion.answers),
-    )
+    .options(_with_questions())
     .order_by(Test.order)
     .all()
   )
   return tests
 
 
+def _insert_questions(db: Session, test_id: int, questions: list[TestQuestionCreate]) -> None:
+  """Вопросы одним INSERT ... RETURNING id, затем все варианты ответов одним INSERT."""
+  if not questions:
+    return
+  question_ids = db.execute(
+    insert(TestQuestion).returning(TestQuestion.id, sort_by_parameter_order=True),
+    [
+      {"test_id": test_id, "question_text": q.question_text, "question_type": q.question_type, "order": q.order}
+      for q in questions
+    ],
+  ).scalars().all()
+  answers = [
+    {"question_id": question_id, "answer_text": a.answer_text, "is_correct": a.is_correct, "order": a.order}
+    for question_id, q in zip(question_ids, questions)
+    for a in q.answers
+  ]
+  if answers:
+    db.execute(insert(TestAnswer), answers)
+
+
+def _lock_test(db: Session, test_id: int, *, read: bool) -> Test | None:
+  """
+  Тест с блокировкой строки до конца транзакции: замена вопросов берёт FOR UPDATE, попытки — FOR SHARE.
+  Так попытка не проверяется по вопросам, которые параллельно удаляются, а замена видит все
+  попытки, поставленные в очередь до неё.
+  """
+  return db.execute(
+    select(Test).where(Test.id == test_id).with_for_update(read=read)
+  ).scalar_one_or_none()
+
+
 @router.post("/", response_model=TestRead, status_code=status.HTTP_201_CREATED)
 @router.post("", response_model=TestRead, status_code=status.HTTP_201_CREATED)  # без слэша
 def create_test(
@@ -76,25 +173,8 @@ def create_test(
   )
   db.add(test)
   db.flush()
-
-  for q_data in payload.questions:
-    question = TestQuestion(
-      test_id=test.id,
-      question_text=q_data.question_text,
-      question_type=q_data.question_type,
-      order=q_data.order,
-    )
-    db.add(question)
-    db.flush()
-
-    for a_data in q_data.answers:
-      answer = TestAnswer(
-        question_id=question.id,
-        answer_text=a_data.answer_text,
-        is_correct=a_data.is_correct,
-        order=a_data.order,
-      )
-      db.add(answer)
+  _insert_questions(db, test.id, payload.questions)
+  stats_rollup.record_test(db, test)
 
   db.commit()
   db.refresh(test)
@@ -114,13 +194,12 @@ def create_test(
 def get_test(
   test_id: int,
   db: Session = Depends(get_db),
-  _user=Depends(get_current_kids_role),
+  _user=Depends(require_teacher),
 ):
+  """Тест с правильными ответами — для преподавателя (ученикам — /{test_id}/student)."""
   test = (
     db.query(Test)
-    .options(
-      joinedload(Test.questions).joinedload(TestQuestion.answers),
-    )
+    .options(_with_questions())
     .get(test_id)
   )
   if not test:
@@ -128,6 +207,45 @@ def get_test(
   return test
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+  if not if_none_match:
+    return False
+  tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+  return "*" in tags or etag in tags
+
+
+@router.get("/{test_id}/student", response_model=TestStudentRead)
+def get_test_for_student(
+  test_id: int,
+  if_none_match: str | None = Header(default=None),
+  db: Session = Depends(get_db),
+  _user=Depends(get_current_kids_role),
+):
+  """
+  Тест для прохождения: без is_correct, тело из кэша test_views с сильным ETag.
+  Тест при попадании в кэш из БД не читается, повтор с If-None-Match — 304.
+  """
+  view = test_views.get(db, test_id)
+  if view is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+  headers = {"ETag": view.etag, "Cache-Control": "private, no-cache"}
+  if _etag_matches(if_none_match, view.etag):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+  return Response(content=view.body, media_type="application/json", headers=headers)
+
+
+@router.get("/{test_id}/analysis", response_model=TestAnalysisRead)
+def get_test_analysis(
+  test_id: int,
+  db: Session = Depends(get_db),
+  _user=Depends(require_teacher),
+):
+  """Сложность вопросов и частота выбора вариантов — из счётчиков item_analysis, без обхода попыток."""
+  if not db.query(Test).get(test_id):
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+  return {"test_id": test_id, "questions": item_analysis.analyze(db, test_id)}
+
+
 @router.patch("/{test_id}", response_model=TestRead)
 def update_test(
   test_id: int,
@@ -148,11 +266,52 @@ def update_test(
   if payload.max_attempts is not None:
     test.max_attempts = payload.max_attempts
 
+  test_views.invalidate(db, test_id)
   db.commit()
   db.refresh(test)
   return test
 
 
+@router.put("/{test_id}/questions", response_model=TestRead)
+def replace_test_questions(
+  test_id: int,
+  payload: list[TestQuestionCreate],
+  db: Session = Depends(get_db),
+  _user=Depends(require_teacher),
+):
+  """Заменяет все вопросы и варианты ответов теста одним запросом (сохранение из редактора)."""
+  test = _lock_test(db, test_id, read=False)
+  if not test:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+  question_ids = select(TestQuestion.id).where(TestQuestion.test_id == test_id)
+  # Ответы учеников ссылаются на вопросы: после первой попытки вопросы заменить нельзя
+  if db.query(exists().where(TestSubmissionAnswer.question_id.in_(question_ids))).scalar():
+    raise HTTPException(
+      status_code=status.HTTP_409_CONFLICT,
+      detail="Тест уже проходили: вопросы нельзя заменить. Создайте новый тест.",
+    )
+  # Попытки в очереди ссылаются на текущие вопросы. Проверяемые сейчас держат FOR SHARE на тесте —
+  # блокировка выше дождалась их commit; новые не встанут в очередь до конца этой транзакции
+  if submission_queue.has_pending(db, test_id):
+    raise HTTPException(
+      status_code=status.HTTP_409_CONFLICT,
+      detail="Попытки этого теста ещё проверяются: повторите позже.",
+    )
+
+  db.execute(delete(TestAnswer).where(TestAnswer.question_id.in_(question_ids)))
+  db.execute(delete(TestQuestion).where(TestQuestion.test_id == test_id))
+  _insert_questions(db, test_id, payload)
+  grading.invalidate(db, test_id)
+  test_views.invalidate(db, test_id)
+  db.commit()
+
+  return (
+    db.query(Test)
+    .options(_with_questions())
+    .get(test_id)
+  )
+
+
 @router.delete("/{test_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_test(
   test_id: int,
@@ -163,98 +322,141 @@ def delete_test(
   if not test:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
   db.delete(test)
+  stats_rollup.record_test(db, test, -1)
+  grading.invalidate(db, test_id)
+  test_views.invalidate(db, test_id)
   db.commit()
   return None
 
 
+@router.patch("/answers/{answer_id}", response_model=TestAnswerRead)
+def update_test_answer(
+  answer_id: int,
+  payload: TestAnswerUpdate,
+  db: Session = Depends(get_db),
+  _user=Depends(require_teacher),
+):
+  """Правка варианта ответа. Изменение is_correct запускает фоновую перепроверку попыток теста."""
+  answer = db.query(TestAnswer).get(answer_id)
+  if not answer:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Вариант ответа не найден")
+
+  if payload.answer_text is not None:
+    answer.answer_text = payload.answer_text
+  if payload.order is not None:
+    answer.order = payload.order
+  test_views.invalidate(db, answer.question.test_id)
+  key_changed = payload.is_correct is not None and payload.is_correct != answer.is_correct
+  if key_changed:
+    answer.is_correct = payload.is_correct
+    test_id = answer.question.test_id
+    grading.invalidate(db, test_id)
+
+  db.commit()
+  if key_changed:
+    regrade.start(test_id)
+  db.refresh(answer)
+  return answer
+
+
+@router.post("/{test_id}/regrade", response_model=RegradeJobRead, status_code=status.HTTP_202_ACCEPTED)
+def start_test_regrade(
+  test_id: int,
+  db: Session = Depends(get_db),
+  _user=Depends(require_teacher),
+):
+  """Перепроверить все попытки теста по текущему ключу ответов (в фоне)."""
+  if not db.query(Test).get(test_id):
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+  return regrade.start(test_id)
+
+
+@router.get("/{test_id}/regrade", response_model=RegradeJobRead)
+def get_latest_test_regrade(
+  test_id: int,
+  _user=Depends(require_teacher),
+):
+  """Последняя перепроверка теста в этом процессе."""
+  job = regrade.latest_for_test(test_id)
+  if not job:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Перепроверка теста не запускалась")
+  return job
+
+
+@router.get("/regrade-jobs/{job_id}", response_model=RegradeJobRead)
+def get_regrade_job(
+  job_id: str,
+  _user=Depends(require_teacher),
+):
+  job = regrade.get(job_id)
+  if not job:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача перепроверки не найдена")
+  return job
+
+
 # Submissions
-@router.post("/submissions", response_model=TestSubmissionRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+  "/submissions",
+  response_model=TestSubmissionRead | TestSubmissionTicketRead,
+  status_code=status.HTTP_201_CREATED,
+)
 def create_submission(
   payload: TestSubmissionCreate,
+  response: Response,
   db: Session = Depends(get_db),
-  _user=Depends(require_student),
+  current=Depends(require_student),
 ):
-  # Получаем тест с вопросами и правильными ответами
-  test = (
-    db.query(Test)
-    .options(
-      joinedload(Test.questions).joinedload(TestQuestion.answers),
-    )
-    .get(payload.test_id)
-  )
+  if payload.student_id != current["student_id"]:
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Можно отправить только свою попытку")
+  test = _lock_test(db, payload.test_id, read=True)
   if not test:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
 
-  # Ограничение попыток: если у теста задано max_attempts, проверяем количество уже сданных.
-  # Разрешённые учителем пересдачи (is_approved_for_retake) дают ученику дополнительную попытку.
-  if test.max_attempts is not None:
-    used_attempts = db.query(TestSubmission).filter(
-      TestSubmission.test_id == payload.test_id,
-      TestSubmission.student_id == payload.student_id,
-    ).count()
-    approved_retakes = db.query(TestSubmission).filter(
-      TestSubmission.test_id == payload.test_id,
-      TestSubmission.student_id == payload.student_id,
-      TestSubmission.is_approved_for_retake == True,
-    ).count()
-    allowed_attempts = test.max_attempts + approved_retakes
-    if used_attempts >= allowed_attempts:
-      raise HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail=f"Превышено число попыток ({test.max_attempts} + {approved_retakes} пересдач). Дополнительную попытку может разрешить учитель.",
-      )
-
-  # Создаём submission
-  submission = TestSubmission(
-    test_id=payload.test_id,
-    student_id=payload.student_id,
-  )
-  db.add(submission)
-  db.flush()
-
-  # Подсчитываем баллы
-  score = 0
-  max_score = len(test.questions)
-
-  for answer_data in payload.answers:
-    question = db.query(TestQuestion).get(answer_data.question_id)
-    if not question:
-      continue
-
-    # Создаём ответ ученика
-    submission_answer = TestSubmissionAnswer(
-      submission_id=submission.id,
-      question_id=answer_data.question_id,
-      answer_text=answer_data.answer_text,
-      selected_answer_ids=answer_data.selected_answer_ids,
-    )
-    db.add(submission_answer)
-
-    # Проверяем правильность ответа
-    if question.question_type == "single_choice":
-      correct_answer = next((a for a in question.answers if a.is_correct), None)
-      if correct_answer and answer_data.selected_answer_ids:
-        selected_ids = json.loads(answer_data.selected_answer_ids)
-        if str(correct_answer.id) in selected_ids or correct_answer.id in selected_ids:
-          score += 1
-    elif question.question_type == "multiple_choice":
-      correct_answers = [a.id for a in question.answers if a.is_correct]
-      if answer_data.selected_answer_ids:
-        selected_ids = json.loads(answer_data.selected_answer_ids)
-        if set(correct_answers) == set(selected_ids):
-          score += 1
-    elif question.question_type == "text":
-      # Для текстовых вопросов нужна ручная проверка учителем
-      pass
-
-  submission.score = score
-  submission.max_score = max_score
+  if settings.TEST_SUBMISSION_QUEUE:
+    # Режим очереди: попытку проверит обработчик, ученик опрашивает /submissions/{id}/result.
+    # Лимит попыток проверяется и до постановки в очередь, чтобы не отвечать 202 на заведомый отказ
+    try:
+      submission_queue.check_attempts(db, test, payload.student_id)
+    except test_submissions.AttemptsExceeded as e:
+      raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.detail)
+    submission_id = submission_queue.enqueue(db, payload)
+    db.commit()
+    submission_queue.wake()
+    response.status_code = status.HTTP_202_ACCEPTED
+    return TestSubmissionTicketRead(submission_id=submission_id)
+
+  try:
+    submission = test_submissions.submit(db, test, payload.student_id, payload.answers)
+  except test_submissions.AttemptsExceeded as e:
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.detail)
 
   db.commit()
   db.refresh(submission)
   return submission
 
 
+@router.get("/submissions/{submission_id}/result", response_model=TestSubmissionResultRead)
+async def get_submission_result(
+  submission_id: int,
+  wait: int = Query(0, ge=0, le=25, description="Ждать обработки до N секунд (long-poll)"),
+  current=Depends(get_current_kids_role),
+):
+  """
+  Результат попытки из очереди. Каждая проверка — короткая сессия, между проверками соединение не занято.
+  Ученик видит только свои попытки (чужие — 404).
+  """
+  deadline = time.monotonic() + wait
+  while True:
+    result = await run_in_threadpool(_load_submission_result, submission_id)
+    if result is not None and current["role"] == "student" and result["student_id"] != current["student_id"]:
+      result = None
+    if result is None:
+      raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Попытка не найдена")
+    if result["status"] != "queued" or time.monotonic() >= deadline:
+      return result
+    await asyncio.sleep(RESULT_POLL_SECONDS)
+
+
 @router.get("/submissions/by-test/{test_id}", response_model=list[TestSubmissionRead])
 def list_submissions_by_test(
   test_id: int,
@@ -288,26 +490,30 @@ def list_submissions_by_student(
 @router.get("/submissions/best-by-student/{student_id}", response_model=list[TestSubmissionRead])
 def list_best_submissions_by_student(
   student_id: int,
+  include_answers: bool = True,
   db: Session = Depends(get_db),
   current=Depends(get_current_kids_role),
 ):
-  """Одна лучшая попытка по каждому тесту. Для статистики и отображения ученику."""
+  """
+  Одна лучшая попытка по каждому тесту (максимальный балл, при равенстве — более ранняя).
+  Для статистики и отображения ученику; include_answers=false — без ответов, для списков.
+  """
   if current["role"] == "student" and current["student_id"] != student_id:
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ только к своим результатам")
+  best = (
+    select(TestSubmission.id)
+    .distinct(TestSubmission.test_id)
+    .where(TestSubmission.student_id == student_id)
+    .order_by(TestSubmission.test_id, TestSubmission.score.desc().nulls_last(), TestSubmission.id)
+  )
   submissions = (
     db.query(TestSubmission)
-    .filter(TestSubmission.student_id == student_id)
-    .options(joinedload(TestSubmission.answers))
+    .filter(TestSubmission.id.in_(best))
+    .options(selectinload(TestSubmission.answers) if include_answers else noload(TestSubmission.answers))
+    .order_by(TestSubmission.test_id)
     .all()
   )
-  best_by_test: dict[int, TestSubmission] = {}
-  for s in submissions:
-    prev = best_by_test.get(s.test_id)
-    s_score = s.score if s.score is not None else -1
-    prev_score = prev.score if prev and prev.score is not None else -1
-    if prev is None or s_score > prev_score:
-      best_by_test[s.test_id] = s
-  return list(best_by_test.values())
+  return submissions
 
 
 @router.patch("/submissions/{submission_id}", response_model=TestSubmissionRead)
@@ -322,7 +528,9 @@ def update_submission(
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Попытка прохождения не найдена")
 
   if payload.is_approved_for_retake is not None:
+    was_approved = submission.is_approved_for_retake
     submission.is_approved_for_retake = payload.is_approved_for_retake
+    attempt_ledger.record_retake_change(db, submission, was_approved)
 
   db.commit()
   db.refresh(submission)
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
+
+from app.core.security import sign_file_url
 
 
 class HomeworkFileBase(BaseModel):
@@ -13,6 +15,12 @@ class HomeworkFileCreate(HomeworkFileBase):
 class HomeworkFileRead(HomeworkFileBase):
   id: int
 
+  @computed_field
+  @property
+  def download_url(self) -> str:
+    """file_url для ссылки: файлы из хранилища (/files/...) — с подписью и сроком действия."""
+    return sign_file_url(self.file_url)
+
   class Config:
     from_attributes = True
 
@@ -43,6 +51,17 @@ class HomeworkRead(HomeworkBase):
     from_attributes = True
 
 
+class HomeworkBriefRead(BaseModel):
+  """Домашнее задание без описания и файлов (?fields=brief)."""
+  id: int
+  program_id: int
+  title: str
+  order: int = 0
+
+  class Config:
+    from_attributes = True
+
+
 class HomeworkSubmissionFileBase(BaseModel):
   file_url: str
   file_name: str
@@ -55,6 +74,12 @@ class HomeworkSubmissionFileCreate(HomeworkSubmissionFileBase):
 class HomeworkSubmissionFileRead(HomeworkSubmissionFileBase):
   id: int
 
+  @computed_field
+  @property
+  def download_url(self) -> str:
+    """file_url для ссылки: файлы из хранилища (/files/...) — с подписью и сроком действия."""
+    return sign_file_url(self.file_url)
+
   class Config:
     from_attributes = True
 
@@ -92,6 +117,20 @@ class HomeworkSubmissionUpdate(BaseModel):
   teacher_comment: str | None = None
 
 
+class HomeworkSubmissionBulkItem(BaseModel):
+  """Строка PATCH /homeworks/submissions/bulk; None — поле не меняется (как в HomeworkSubmissionUpdate)."""
+  id: int
+  grade: int | None = None
+  teacher_comment: str | None = None
+
+
+class HomeworkSubmissionBulkResult(BaseModel):
+  id: int
+  updated: bool  # False — ответа с таким id нет
+  grade: int | None = None
+  teacher_comment: str | None = None
+
+
 class HomeworkSubmissionRead(HomeworkSubmissionBase):
   id: int
   homework_id: int
@@ -103,3 +142,29 @@ class HomeworkSubmissionRead(HomeworkSubmissionBase):
 
   class Config:
     from_attributes = True
+
+
+class HomeworkSubmissionBriefRead(BaseModel):
+  """Ответ на ДЗ без текста, файлов и комментариев (?fields=brief)."""
+  id: int
+  homework_id: int
+  student_id: int
+  grade: int | None = None
+
+  class Config:
+    from_attributes = True
+
+
+class HomeworkReviewItemRead(BaseModel):
+  """Непроверенный ответ в очереди учителя (GET /homeworks/review-queue)."""
+  id: int
+  homework_id: int
+  homework_title: str
+  program_id: int
+  group_id: int
+  student_id: int
+  student_name: str
+  answer_text: str | None = None
+
+  class Config:
+    from_attributes = True
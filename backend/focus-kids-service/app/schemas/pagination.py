@@ -0,0 +1,11 @@
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+  """Страница keyset-пагинации; next_cursor = None — страниц больше нет."""
+  items: list[T] = []
+  next_cursor: str | None = None
@@ -2,7 +2,7 @@ from pydantic import BaseModel
 
 from .homework import HomeworkRead
 from .lecture import LectureRead
-from .test import TestRead
+from .test import TestRead, TestStudentRead
 
 
 class ProgramBase(BaseModel):
@@ -44,3 +44,8 @@ class ProgramRead(ProgramBase):
 
   class Config:
     from_attributes = True
+
+
+class ProgramStudentRead(ProgramRead):
+  """Программа для ученика: тесты без is_correct."""
+  tests: list[TestStudentRead] = []
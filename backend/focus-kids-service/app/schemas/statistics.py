@@ -45,3 +45,16 @@ class TeacherStatisticsBase(BaseModel):
 class TeacherStatisticsRead(TeacherStatisticsBase):
   class Config:
     from_attributes = True
+
+
+class StatisticsTrendsRead(BaseModel):
+  """Динамика по периодам в колоночном виде: i-й элемент каждого массива относится к dates[i]."""
+  bucket: str
+  dates: list[date] = []
+  # Число отметок посещаемости в периоде (у группы — по всем ученикам)
+  attendance_marks: list[int] = []
+  attendance: list[float | None] = []
+  avg_grade: list[float | None] = []
+  # Нарастающим итогом с начала выборки
+  attendance_cumulative: list[float | None] = []
+  avg_grade_cumulative: list[float | None] = []
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class StoredFileRead(BaseModel):
+  sha256: str
+  size: int
+  content_type: str
+  # Путь относительно API (/files/<sha256>) — сохраняется в file_url файлов ДЗ и ответов
+  file_url: str
+  # Подписанная ссылка на скачивание с ограниченным сроком действия
+  download_url: str
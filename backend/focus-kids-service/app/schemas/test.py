@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+import json
+from datetime import datetime
+
+from pydantic import BaseModel, field_validator
 
 
 class TestAnswerBase(BaseModel):
@@ -11,6 +14,12 @@ class TestAnswerCreate(TestAnswerBase):
   pass
 
 
+class TestAnswerUpdate(BaseModel):
+  answer_text: str | None = None
+  is_correct: bool | None = None
+  order: int | None = None
+
+
 class TestAnswerRead(TestAnswerBase):
   id: int
   question_id: int
@@ -57,6 +66,16 @@ class TestUpdate(BaseModel):
   max_attempts: int | None = None
 
 
+class TestSummaryRead(TestBase):
+  """Тест без вопросов — для списков."""
+  id: int
+  program_id: int
+  questions_count: int = 0
+
+  class Config:
+    from_attributes = True
+
+
 class TestRead(TestBase):
   id: int
   program_id: int
@@ -67,9 +86,47 @@ class TestRead(TestBase):
     from_attributes = True
 
 
+class TestAnswerStudentRead(BaseModel):
+  """Вариант ответа без is_correct — то, что видит ученик."""
+  id: int
+  question_id: int
+  answer_text: str
+  order: int = 0
+
+  class Config:
+    from_attributes = True
+
+
+class TestQuestionStudentRead(TestQuestionBase):
+  id: int
+  test_id: int
+  answers: list[TestAnswerStudentRead] = []
+
+  class Config:
+    from_attributes = True
+
+
+class TestStudentRead(TestBase):
+  """Тест для прохождения учеником (GET /tests/{id}/student)."""
+  id: int
+  program_id: int
+  questions: list[TestQuestionStudentRead] = []
+
+  class Config:
+    from_attributes = True
+
+
 class TestSubmissionAnswerBase(BaseModel):
   answer_text: str | None = None
-  selected_answer_ids: str | None = None
+  selected_answer_ids: list[int] | None = None
+
+  @field_validator("selected_answer_ids", mode="before")
+  @classmethod
+  def parse_legacy_json(cls, value):
+    # Старые клиенты присылают JSON-строку вида "[1, 2]"
+    if isinstance(value, str):
+      return json.loads(value) if value.strip() else None
+    return value
 
 
 class TestSubmissionAnswerCreate(TestSubmissionAnswerBase):
@@ -95,6 +152,20 @@ class TestSubmissionCreate(TestSubmissionBase):
   answers: list[TestSubmissionAnswerCreate] = []
 
 
+class TestSubmissionTicketRead(BaseModel):
+  """Попытка принята в очередь (202): результат — GET /tests/submissions/{submission_id}/result."""
+  submission_id: int
+  status: str = "queued"
+
+
+class TestSubmissionResultRead(BaseModel):
+  submission_id: int
+  status: str  # queued, done, rejected, failed
+  score: int | None = None
+  max_score: int | None = None
+  detail: str | None = None  # причина для rejected / failed
+
+
 class TestSubmissionUpdate(BaseModel):
   is_approved_for_retake: bool | None = None
 
@@ -110,3 +181,44 @@ class TestSubmissionRead(TestSubmissionBase):
 
   class Config:
     from_attributes = True
+
+
+class RegradeJobRead(BaseModel):
+  id: str
+  test_id: int
+  status: str  # queued, running, done, failed
+  total: int = 0
+  processed: int = 0
+  changed: int = 0
+  error: str | None = None
+  created_at: datetime
+  finished_at: datetime | None = None
+
+  class Config:
+    from_attributes = True
+
+
+class TestAnalysisOptionRead(BaseModel):
+  answer_id: int
+  answer_text: str
+  is_correct: bool
+  order: int
+  picks: int
+  pick_rate: float | None = None  # доля ответов на вопрос, в которых выбран вариант
+
+
+class TestAnalysisQuestionRead(BaseModel):
+  question_id: int
+  question_text: str
+  question_type: str
+  order: int
+  responses: int
+  correct: int | None = None  # None для текстовых вопросов
+  correct_rate: float | None = None  # сложность: доля верных ответов
+  options: list[TestAnalysisOptionRead] = []
+
+
+class TestAnalysisRead(BaseModel):
+  """Анализ вопросов теста (GET /tests/{id}/analysis)."""
+  test_id: int
+  questions: list[TestAnalysisQuestionRead] = []
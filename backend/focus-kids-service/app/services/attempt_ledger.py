@@ -0,0 +1,177 @@
+"""
+Журнал попыток тестов: одна строка test_attempt_ledger на (тест, ученик).
+Проверка лимита попыток — атомарный UPDATE ... RETURNING по этой строке: блокировка строки
+сериализует одновременные сдачи (двойное нажатие в Mini App), счётчики не пересчитываются по истории.
+Лучшая попытка (best_score, best_submission_id) обновляется при каждой сдаче.
+Строки для старых данных создаются из test_submissions при старте (rebuild_if_empty) или при первой сдаче.
+"""
+from dataclasses import dataclass
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.test import Test, TestAttemptLedger, TestSubmission
+
+
+@dataclass(frozen=True)
+class AttemptClaim:
+  allowed: bool
+  used: int
+  approved_retakes: int
+
+
+def _best_select(test_id: int | None = None, student_id: int | None = None):
+  """Лучшая попытка — максимальный балл, при равенстве — более ранняя (как в /submissions/best-by-student)."""
+  best = (
+    select(TestSubmission.test_id, TestSubmission.student_id, TestSubmission.score, TestSubmission.id)
+    .distinct(TestSubmission.test_id, TestSubmission.student_id)
+    .where(TestSubmission.score.isnot(None))
+    .order_by(TestSubmission.test_id, TestSubmission.student_id, TestSubmission.score.desc(), TestSubmission.id)
+  )
+  if test_id is not None:
+    best = best.where(TestSubmission.test_id == test_id)
+  if student_id is not None:
+    best = best.where(TestSubmission.student_id == student_id)
+  return best
+
+
+def _history_select(test_id: int | None = None, student_id: int | None = None):
+  """Строки журнала из истории попыток: (test_id, student_id, used, approved_retakes, best_score, best_submission_id)."""
+  best = _best_select(test_id, student_id).subquery()
+  counts = select(
+    TestSubmission.test_id,
+    TestSubmission.student_id,
+    func.count().label("used"),
+    func.count().filter(TestSubmission.is_approved_for_retake.is_(True)).label("approved_retakes"),
+  )
+  if test_id is not None:
+    counts = counts.where(TestSubmission.test_id == test_id)
+  if student_id is not None:
+    counts = counts.where(TestSubmission.student_id == student_id)
+  counts = counts.group_by(TestSubmission.test_id, TestSubmission.student_id).subquery()
+  return select(
+    counts.c.test_id,
+    counts.c.student_id,
+    counts.c.used,
+    counts.c.approved_retakes,
+    best.c.score,
+    best.c.id,
+  ).outerjoin(best, and_(best.c.test_id == counts.c.test_id, best.c.student_id == counts.c.student_id))
+
+
+def _insert_from_history(db: Session, test_id: int | None = None, student_id: int | None = None) -> None:
+  columns = ["test_id", "student_id", "used", "approved_retakes", "best_score", "best_submission_id"]
+  db.execute(
+    pg_insert(TestAttemptLedger)
+    .from_select(columns, _history_select(test_id, student_id))
+    .on_conflict_do_nothing(index_elements=["test_id", "student_id"])
+  )
+
+
+def rebuild(db: Session) -> None:
+  """Полный пересчёт журнала из test_submissions. Вызывающий делает commit."""
+  db.execute(delete(TestAttemptLedger))
+  _insert_from_history(db)
+
+
+def rebuild_if_empty(db: Session) -> None:
+  """Первичное заполнение после создания таблицы (есть попытки, но журнал пуст)."""
+  has_ledger = db.execute(select(TestAttemptLedger.test_id).limit(1)).first() is not None
+  has_submissions = db.execute(select(TestSubmission.id).limit(1)).first() is not None
+  if has_submissions and not has_ledger:
+    rebuild(db)
+    db.commit()
+
+
+def claim_attempt(db: Session, test: Test, student_id: int) -> AttemptClaim:
+  """
+  Занимает попытку: used + 1, если лимит теста (max_attempts + одобренные пересдачи) не исчерпан.
+  Строка журнала остаётся заблокированной до конца транзакции — параллельная сдача ждёт и видит новый used.
+  """
+  key = and_(TestAttemptLedger.test_id == test.id, TestAttemptLedger.student_id == student_id)
+  claim = (
+    update(TestAttemptLedger)
+    .where(key)
+    .values(used=TestAttemptLedger.used + 1)
+    .returning(TestAttemptLedger.used, TestAttemptLedger.approved_retakes)
+  )
+  if test.max_attempts is not None:
+    claim = claim.where(TestAttemptLedger.used < test.max_attempts + TestAttemptLedger.approved_retakes)
+
+  row = db.execute(claim).first()
+  if row is None:
+    # Строки ещё нет (первая попытка или данные до журнала) — создаём из истории и пробуем снова
+    _insert_from_history(db, test.id, student_id)
+    db.execute(
+      pg_insert(TestAttemptLedger)
+      .values(test_id=test.id, student_id=student_id)
+      .on_conflict_do_nothing(index_elements=["test_id", "student_id"])
+    )
+    row = db.execute(claim).first()
+  if row is not None:
+    return AttemptClaim(allowed=True, used=row.used, approved_retakes=row.approved_retakes)
+
+  used, approved_retakes = db.execute(
+    select(TestAttemptLedger.used, TestAttemptLedger.approved_retakes).where(key)
+  ).one()
+  return AttemptClaim(allowed=False, used=used, approved_retakes=approved_retakes)
+
+
+def peek_attempts(db: Session, test: Test, student_id: int, pending: int = 0) -> AttemptClaim:
+  """
+  Проверка лимита без занятия попытки (строка не блокируется); pending — ещё не учтённые попытки
+  (строки очереди). Окончательно лимит проверяет claim_attempt.
+  """
+  row = db.execute(
+    select(TestAttemptLedger.used, TestAttemptLedger.approved_retakes)
+    .where(TestAttemptLedger.test_id == test.id, TestAttemptLedger.student_id == student_id)
+  ).first()
+  if row is None:
+    history = _history_select(test.id, student_id).subquery()
+    row = db.execute(select(history.c.used, history.c.approved_retakes)).first()
+  used, approved_retakes = row if row is not None else (0, 0)
+  used += pending
+  allowed = test.max_attempts is None or used < test.max_attempts + approved_retakes
+  return AttemptClaim(allowed=allowed, used=used, approved_retakes=approved_retakes)
+
+
+def record_result(db: Session, submission: TestSubmission) -> None:
+  """После подсчёта баллов: попытка становится лучшей, если её балл строго выше прежнего."""
+  if submission.score is None:
+    return
+  db.execute(
+    update(TestAttemptLedger)
+    .where(
+      TestAttemptLedger.test_id == submission.test_id,
+      TestAttemptLedger.student_id == submission.student_id,
+      or_(TestAttemptLedger.best_score.is_(None), TestAttemptLedger.best_score < submission.score),
+    )
+    .values(best_score=submission.score, best_submission_id=submission.id)
+  )
+
+
+def record_retake_change(db: Session, submission: TestSubmission, was_approved: bool) -> None:
+  """Учитель разрешил или отменил пересдачу по попытке."""
+  delta = int(bool(submission.is_approved_for_retake)) - int(bool(was_approved))
+  if delta == 0:
+    return
+  db.execute(
+    update(TestAttemptLedger)
+    .where(
+      TestAttemptLedger.test_id == submission.test_id,
+      TestAttemptLedger.student_id == submission.student_id,
+    )
+    .values(approved_retakes=TestAttemptLedger.approved_retakes + delta)
+  )
+
+
+
+def refresh_best(db: Session, test_id: int) -> None:
+  """Пересчитывает лучшие попытки всех учеников по тесту (после перепроверки баллов)."""
+  best = _best_select(test_id).subquery()
+  db.execute(
+    update(TestAttemptLedger)
+    .where(TestAttemptLedger.test_id == best.c.test_id, TestAttemptLedger.student_id == best.c.student_id)
+    .values(best_score=best.c.score, best_submission_id=best.c.id)
+  )
@@ -0,0 +1,119 @@
+"""
+Хранилище файлов ДЗ с адресацией по содержимому: ключ файла — hex SHA-256 его байтов,
+поэтому повторная загрузка того же файла не занимает места. Тело загрузки читается потоком
+кусками и хэшируется на лету; лимит размера проверяется после каждого куска, так что файл
+никогда не лежит в памяти целиком. Бэкенд выбирается настройкой STORAGE_BACKEND: сейчас local
+(каталог STORAGE_DIR); S3-совместимый подключается ещё одной реализацией StorageBackend в get_storage().
+"""
+import hashlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterable, BinaryIO, Iterator
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class FileTooLarge(Exception):
+  def __init__(self, max_bytes: int):
+    self.max_bytes = max_bytes
+    super().__init__(f"File exceeds {max_bytes} bytes")
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+  sha256: str
+  size: int
+
+
+class StorageBackend(ABC):
+  """Объекты хранилища по ключу sha256; метаданные (размер, тип) — в таблице stored_files."""
+
+  @abstractmethod
+  async def put(self, chunks: AsyncIterable[bytes], max_bytes: int) -> StoredBlob:
+    """Сохраняет поток; при превышении max_bytes прерывает запись и бросает FileTooLarge."""
+
+  @abstractmethod
+  def exists(self, sha256: str) -> bool:
+    ...
+
+  @abstractmethod
+  def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+    """Байты с start по end включительно, кусками READ_CHUNK_SIZE."""
+
+
+class LocalStorage(StorageBackend):
+  """Каталог на диске: <root>/ab/cd/<sha256>; недописанные загрузки — в <root>/tmp."""
+
+  def __init__(self, root: str | Path):
+    self.root = Path(root).resolve()
+    self._tmp = self.root / "tmp"
+
+  def _path(self, sha256: str) -> Path:
+    return self.root / sha256[:2] / sha256[2:4] / sha256
+
+  def _open_tmp(self) -> tuple[Path, BinaryIO]:
+    self._tmp.mkdir(parents=True, exist_ok=True)
+    tmp_path = self._tmp / uuid.uuid4().hex
+    return tmp_path, open(tmp_path, "wb")
+
+  def _finalize(self, tmp_path: Path, sha256: str) -> None:
+    """Переносит дописанный файл на место по ключу; если такой файл уже есть — просто удаляет временный."""
+    try:
+      path = self._path(sha256)
+      if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Переименование атомарно: читатели не увидят недописанный файл
+        os.replace(tmp_path, path)
+    finally:
+      tmp_path.unlink(missing_ok=True)
+
+  async def put(self, chunks: AsyncIterable[bytes], max_bytes: int) -> StoredBlob:
+    # Все обращения к диску — в пуле потоков, цикл событий не ждёт файловую систему
+    tmp_path, f = await run_in_threadpool(self._open_tmp)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+      try:
+        async for chunk in chunks:
+          size += len(chunk)
+          if size > max_bytes:
+            raise FileTooLarge(max_bytes)
+          digest.update(chunk)
+          await run_in_threadpool(f.write, chunk)
+      finally:
+        await run_in_threadpool(f.close)
+    except BaseException:
+      await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+      raise
+    sha256 = digest.hexdigest()
+    await run_in_threadpool(self._finalize, tmp_path, sha256)
+    return StoredBlob(sha256=sha256, size=size)
+
+  def exists(self, sha256: str) -> bool:
+    return self._path(sha256).is_file()
+
+  def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+    with open(self._path(sha256), "rb") as f:
+      f.seek(start)
+      remaining = end - start + 1
+      while remaining > 0:
+        chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+          break
+        remaining -= len(chunk)
+        yield chunk
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+  if settings.STORAGE_BACKEND == "local":
+    return LocalStorage(settings.STORAGE_DIR)
+  raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
@@ -0,0 +1,100 @@
+"""
+Проверка попыток тестов по скомпилированному ключу ответов.
+Тест компилируется в неизменяемый ключ: question_id -> (тип вопроса, frozenset правильных answer_id).
+Ключ кэшируется в памяти процесса по test_id и сбрасывается после commit сессии, изменившей
+вопросы или ответы теста (invalidate). Проверка попытки — один проход по ответам без запросов к БД.
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.cache import GenerationLRUCache, invalidate_on_commit
+from app.models.test import TestAnswer, TestQuestion
+
+
+@dataclass(frozen=True)
+class QuestionKey:
+  question_type: str  # single_choice, multiple_choice, text
+  correct_ids: frozenset[int]
+  option_ids: frozenset[int] = frozenset()  # все варианты вопроса
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+  test_id: int
+  questions: Mapping[int, QuestionKey]
+
+  @property
+  def max_score(self) -> int:
+    return len(self.questions)
+
+
+def is_correct(question: QuestionKey, selected_ids: frozenset[int]) -> bool:
+  if question.question_type == "single_choice":
+    return bool(question.correct_ids & selected_ids)
+  if question.question_type == "multiple_choice":
+    return question.correct_ids == selected_ids
+  # Текстовые вопросы проверяет учитель
+  return False
+
+
+def grade(key: AnswerKey, answers: Iterable) -> tuple[int, list]:
+  """
+  Возвращает (баллы, принятые ответы). Ответы на вопросы не из этого теста отбрасываются.
+  answers — объекты с question_id и selected_answer_ids (список id вариантов).
+  """
+  score = 0
+  accepted = []
+  for answer in answers:
+    question = key.questions.get(answer.question_id)
+    if question is None:
+      continue
+    accepted.append(answer)
+    if answer.selected_answer_ids and is_correct(question, frozenset(answer.selected_answer_ids)):
+      score += 1
+  return score, accepted
+
+
+def compile_answer_key(test_id: int, rows: Iterable) -> AnswerKey:
+  """rows: (question_id, question_type, answer_id | None, is_correct | None) — вопросы с вариантами через LEFT JOIN."""
+  types: dict[int, str] = {}
+  correct: dict[int, set[int]] = {}
+  options: dict[int, set[int]] = {}
+  for question_id, question_type, answer_id, answer_is_correct in rows:
+    types[question_id] = question_type
+    ids = correct.setdefault(question_id, set())
+    option_ids = options.setdefault(question_id, set())
+    if answer_id is not None:
+      option_ids.add(answer_id)
+      if answer_is_correct:
+        ids.add(answer_id)
+  questions = {
+    qid: QuestionKey(types[qid], frozenset(correct[qid]), frozenset(options[qid]))
+    for qid in types
+  }
+  return AnswerKey(test_id=test_id, questions=MappingProxyType(questions))
+
+
+def _load_answer_key(db: Session, test_id: int) -> AnswerKey:
+  rows = db.execute(
+    select(TestQuestion.id, TestQuestion.question_type, TestAnswer.id, TestAnswer.is_correct)
+    .outerjoin(TestAnswer, TestAnswer.question_id == TestQuestion.id)
+    .where(TestQuestion.test_id == test_id)
+  ).all()
+  return compile_answer_key(test_id, rows)
+
+
+cache: GenerationLRUCache[int, AnswerKey] = GenerationLRUCache(settings.ANSWER_KEY_CACHE_SIZE)
+
+
+def get_answer_key(db: Session, test_id: int) -> AnswerKey:
+  return cache.get(test_id, lambda: _load_answer_key(db, test_id))
+
+
+def invalidate(db: Session, test_id: int) -> None:
+  """Вопросы или ответы теста изменились; ключ сбрасывается после commit сессии."""
+  invalidate_on_commit(db, cache, test_id)
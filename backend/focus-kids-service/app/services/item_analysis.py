@@ -0,0 +1,204 @@
+"""
+Анализ вопросов тестов: счётчики test_question_stats (ответов / верных) и test_answer_stats (выборов варианта).
+Счётчики увеличиваются при сдаче попытки по тому же ключу ответов, что и баллы (record_submission),
+поэтому GET /tests/{id}/analysis читает только строки вопросов теста, не сканируя test_submission_answers.
+После смены ключа ответов или для истории счётчики пересчитываются из попыток (rebuild).
+"""
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import Integer, and_, case, cast, delete, distinct, func, select, true
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.test import (
+  TestAnswer,
+  TestAnswerStats,
+  TestQuestion,
+  TestQuestionStats,
+  TestSubmission,
+  TestSubmissionAnswer,
+)
+from app.services import grading
+
+
+def record_submission(db: Session, key: grading.AnswerKey, answers: Iterable) -> None:
+  """Учитывает принятые ответы попытки (результат grading.grade). Вызывающий делает commit."""
+  responses: Counter[int] = Counter()
+  correct: Counter[int] = Counter()
+  picks: Counter[int] = Counter()
+  for answer in answers:
+    question = key.questions.get(answer.question_id)
+    if question is None:
+      continue
+    selected = frozenset(answer.selected_answer_ids or ())
+    responses[answer.question_id] += 1
+    if selected and grading.is_correct(question, selected):
+      correct[answer.question_id] += 1
+    # Чужие id (не варианты этого вопроса) не считаются
+    picks.update(selected & question.option_ids)
+  if not responses:
+    return
+
+  # Строки по возрастанию ключа: параллельные сдачи блокируют их в одном порядке и не взаимоблокируются
+  stmt = pg_insert(TestQuestionStats).values([
+    {"question_id": qid, "test_id": key.test_id, "responses": responses[qid], "correct": correct[qid]}
+    for qid in sorted(responses)
+  ])
+  db.execute(stmt.on_conflict_do_update(
+    index_elements=["question_id"],
+    set_={
+      "responses": TestQuestionStats.responses + stmt.excluded.responses,
+      "correct": TestQuestionStats.correct + stmt.excluded.correct,
+    },
+  ))
+  if picks:
+    stmt = pg_insert(TestAnswerStats).values([
+      {"answer_id": aid, "test_id": key.test_id, "picks": picks[aid]}
+      for aid in sorted(picks)
+    ])
+    db.execute(stmt.on_conflict_do_update(
+      index_elements=["answer_id"],
+      set_={"picks": TestAnswerStats.picks + stmt.excluded.picks},
+    ))
+
+
+def _question_stats_select(test_id: int | None = None):
+  """(question_id, test_id, responses, correct) из истории; верность — как grading.is_correct, но в SQL."""
+  correct_ids = (
+    select(
+      TestAnswer.question_id,
+      func.array_agg(TestAnswer.id).filter(TestAnswer.is_correct.is_(True)).label("ids"),
+    )
+    .group_by(TestAnswer.question_id)
+    .subquery()
+  )
+  selected = TestSubmissionAnswer.selected_answer_ids
+  key = func.coalesce(correct_ids.c.ids, cast(array([], type_=Integer), ARRAY(Integer)))
+  is_correct = case(
+    (TestQuestion.question_type == "single_choice", selected.overlap(key)),
+    (TestQuestion.question_type == "multiple_choice", and_(selected.contains(key), selected.contained_by(key))),
+    else_=False,
+  )
+  query = (
+    select(
+      TestSubmissionAnswer.question_id,
+      TestQuestion.test_id,
+      func.count(),
+      func.count().filter(and_(func.cardinality(selected) > 0, is_correct)),
+    )
+    .join(TestQuestion, TestQuestion.id == TestSubmissionAnswer.question_id)
+    .outerjoin(correct_ids, correct_ids.c.question_id == TestSubmissionAnswer.question_id)
+    .group_by(TestSubmissionAnswer.question_id, TestQuestion.test_id)
+  )
+  if test_id is not None:
+    query = query.where(TestQuestion.test_id == test_id)
+  return query
+
+
+def _answer_stats_select(test_id: int | None = None):
+  """(answer_id, test_id, picks) из истории: выбранные id разворачиваются unnest, повторы в одном ответе считаются раз."""
+  picked = func.unnest(TestSubmissionAnswer.selected_answer_ids).table_valued("answer_id").render_derived(name="picked")
+  query = (
+    select(TestAnswer.id, TestQuestion.test_id, func.count(distinct(TestSubmissionAnswer.id)))
+    .select_from(TestSubmissionAnswer)
+    .join(picked, true())
+    .join(
+      TestAnswer,
+      and_(TestAnswer.id == picked.c.answer_id, TestAnswer.question_id == TestSubmissionAnswer.question_id),
+    )
+    .join(TestQuestion, TestQuestion.id == TestAnswer.question_id)
+    .group_by(TestAnswer.id, TestQuestion.test_id)
+  )
+  if test_id is not None:
+    query = query.where(TestQuestion.test_id == test_id)
+  return query
+
+
+def rebuild(db: Session, test_id: int | None = None) -> None:
+  """Пересчёт счётчиков из test_submission_answers (все тесты или один). Вызывающий делает commit."""
+  question_stats = delete(TestQuestionStats)
+  answer_stats = delete(TestAnswerStats)
+  if test_id is not None:
+    question_stats = question_stats.where(TestQuestionStats.test_id == test_id)
+    answer_stats = answer_stats.where(TestAnswerStats.test_id == test_id)
+  db.execute(question_stats)
+  db.execute(answer_stats)
+  db.execute(
+    pg_insert(TestQuestionStats)
+    .from_select(["question_id", "test_id", "responses", "correct"], _question_stats_select(test_id))
+  )
+  db.execute(
+    pg_insert(TestAnswerStats)
+    .from_select(["answer_id", "test_id", "picks"], _answer_stats_select(test_id))
+  )
+
+
+def rebuild_if_empty(db: Session) -> None:
+  """Первичное заполнение после создания таблиц (есть попытки, но счётчиков нет)."""
+  has_stats = db.execute(select(TestQuestionStats.question_id).limit(1)).first() is not None
+  has_submissions = db.execute(select(TestSubmission.id).limit(1)).first() is not None
+  if has_submissions and not has_stats:
+    rebuild(db)
+    db.commit()
+
+
+def analyze(db: Session, test_id: int) -> list[dict]:
+  """Вопросы теста со счётчиками и вариантами — два запроса по вопросам одного теста."""
+  questions = db.execute(
+    select(
+      TestQuestion.id,
+      TestQuestion.question_text,
+      TestQuestion.question_type,
+      TestQuestion.order,
+      func.coalesce(TestQuestionStats.responses, 0),
+      func.coalesce(TestQuestionStats.correct, 0),
+    )
+    .outerjoin(TestQuestionStats, TestQuestionStats.question_id == TestQuestion.id)
+    .where(TestQuestion.test_id == test_id)
+    .order_by(TestQuestion.order, TestQuestion.id)
+  ).all()
+  options = db.execute(
+    select(
+      TestAnswer.id,
+      TestAnswer.question_id,
+      TestAnswer.answer_text,
+      TestAnswer.is_correct,
+      TestAnswer.order,
+      func.coalesce(TestAnswerStats.picks, 0),
+    )
+    .join(TestQuestion, TestQuestion.id == TestAnswer.question_id)
+    .outerjoin(TestAnswerStats, TestAnswerStats.answer_id == TestAnswer.id)
+    .where(TestQuestion.test_id == test_id)
+    .order_by(TestAnswer.order, TestAnswer.id)
+  ).all()
+
+  by_question: dict[int, list[dict]] = {}
+  for answer_id, question_id, answer_text, answer_is_correct, order, picks in options:
+    by_question.setdefault(question_id, []).append({
+      "answer_id": answer_id,
+      "answer_text": answer_text,
+      "is_correct": answer_is_correct,
+      "order": order,
+      "picks": picks,
+    })
+
+  result = []
+  for question_id, question_text, question_type, order, responses, correct in questions:
+    graded = question_type != "text"
+    result.append({
+      "question_id": question_id,
+      "question_text": question_text,
+      "question_type": question_type,
+      "order": order,
+      "responses": responses,
+      "correct": correct if graded else None,
+      # Доля верных ответов; текстовые вопросы проверяет учитель — доли нет
+      "correct_rate": round(correct / responses, 4) if graded and responses else None,
+      "options": [
+        {**option, "pick_rate": round(option["picks"] / responses, 4) if responses else None}
+        for option in by_question.get(question_id, [])
+      ],
+    })
+  return result
@@ -0,0 +1,158 @@
+"""
+Фоновая перепроверка попыток теста после изменения ключа ответов (например, исправлен is_correct).
+Задача выполняется в отдельном потоке (не занимает воркеры запросов): попытки читаются пачками
+по id (keyset), проверяются по новому ключу (app.services.grading) и обновляются одним
+UPDATE ... FROM (VALUES ...) на пачку; каждая пачка — своя короткая транзакция.
+В конце пересчитываются лучшие попытки (test_attempt_ledger) и агрегаты статистики учеников.
+Состояние задач хранится в памяти процесса (один воркер uvicorn) и доступно через GET /tests/regrade-jobs/{id}.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import Integer, column, func, select, update, values
+
+from app.config.database import SessionLocal
+from app.models.test import TestSubmission, TestSubmissionAnswer
+from app.services import attempt_ledger, grading, item_analysis, stats_rollup
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+MAX_JOBS = 100
+
+
+@dataclass
+class RegradeJob:
+  test_id: int
+  id: str = field(default_factory=lambda: uuid.uuid4().hex)
+  status: str = "queued"  # queued, running, done, failed
+  total: int = 0
+  processed: int = 0
+  changed: int = 0
+  error: str | None = None
+  created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+  finished_at: datetime | None = None
+
+
+_jobs: OrderedDict[str, RegradeJob] = OrderedDict()
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="regrade")
+
+
+def start(test_id: int) -> RegradeJob:
+  """
+  Ставит перепроверку теста в очередь. Если для теста уже есть задача в очереди — возвращает её:
+  она ещё не начата и прочитает актуальный ключ.
+  """
+  with _lock:
+    for job in _jobs.values():
+      if job.test_id == test_id and job.status == "queued":
+        return job
+    job = RegradeJob(test_id=test_id)
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_JOBS:
+      oldest = next(iter(_jobs.values()))
+      if oldest.status in ("queued", "running"):
+        break
+      _jobs.popitem(last=False)
+  _executor.submit(_run, job)
+  return job
+
+
+def get(job_id: str) -> RegradeJob | None:
+  with _lock:
+    return _jobs.get(job_id)
+
+
+def latest_for_test(test_id: int) -> RegradeJob | None:
+  with _lock:
+    return next((job for job in reversed(_jobs.values()) if job.test_id == test_id), None)
+
+
+def _update_scores(db, rows: list[tuple[int, int, int]]) -> None:
+  """rows: (submission_id, score, max_score) — один UPDATE ... FROM (VALUES ...)."""
+  new_scores = values(
+    column("id", Integer), column("score", Integer), column("max_score", Integer), name="new_scores",
+  ).data(rows)
+  db.execute(
+    update(TestSubmission)
+    .where(TestSubmission.id == new_scores.c.id)
+    .values(score=new_scores.c.score, max_score=new_scores.c.max_score)
+  )
+
+
+def _regrade_batch(db, key: grading.AnswerKey, after_id: int) -> tuple[list, int, set[int]]:
+  """Перепроверяет следующую пачку попыток; возвращает (попытки пачки, изменено, ученики с изменениями)."""
+  submissions = db.execute(
+    select(TestSubmission.id, TestSubmission.student_id, TestSubmission.score, TestSubmission.max_score)
+    .where(TestSubmission.test_id == key.test_id, TestSubmission.id > after_id)
+    .order_by(TestSubmission.id)
+    .limit(BATCH_SIZE)
+  ).all()
+  if not submissions:
+    return [], 0, set()
+
+  answers_by_submission: dict[int, list] = {s.id: [] for s in submissions}
+  for answer in db.execute(
+    select(TestSubmissionAnswer.submission_id, TestSubmissionAnswer.question_id, TestSubmissionAnswer.selected_answer_ids)
+    .where(TestSubmissionAnswer.submission_id.in_(list(answers_by_submission)))
+  ):
+    answers_by_submission[answer.submission_id].append(answer)
+
+  changed_rows = []
+  students = set()
+  for submission in submissions:
+    score, _ = grading.grade(key, answers_by_submission[submission.id])
+    if (score, key.max_score) != (submission.score, submission.max_score):
+      changed_rows.append((submission.id, score, key.max_score))
+      students.add(submission.student_id)
+  if changed_rows:
+    _update_scores(db, changed_rows)
+  return submissions, len(changed_rows), students
+
+
+def _run(job: RegradeJob) -> None:
+  job.status = "running"
+  try:
+    with SessionLocal() as db:
+      job.total = db.execute(
+        select(func.count()).select_from(TestSubmission).where(TestSubmission.test_id == job.test_id)
+      ).scalar_one()
+      key = grading.get_answer_key(db, job.test_id)
+      db.commit()
+
+    students: set[int] = set()
+    after_id = 0
+    while True:
+      with SessionLocal() as db:
+        batch, changed, batch_students = _regrade_batch(db, key, after_id)
+        db.commit()
+      if not batch:
+        break
+      after_id = batch[-1].id
+      job.processed += len(batch)
+      job.total = max(job.total, job.processed)
+      job.changed += changed
+      students |= batch_students
+
+    if students:
+      with SessionLocal() as db:
+        attempt_ledger.refresh_best(db, job.test_id)
+        stats_rollup.refresh_students(db, sorted(students), ("tests",))
+        db.commit()
+    # Верность ответов по вопросам меняется и тогда, когда итоговые баллы остались прежними
+    with SessionLocal() as db:
+      item_analysis.rebuild(db, job.test_id)
+      db.commit()
+    job.status = "done"
+  except Exception as e:
+    logger.exception("Regrade of test %s failed", job.test_id)
+    job.error = str(e)
+    job.status = "failed"
+  finally:
+    job.finished_at = datetime.now(timezone.utc)
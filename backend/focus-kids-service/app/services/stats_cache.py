@@ -0,0 +1,106 @@
+"""
+Кэш ответов статистики с версиями данных.
+Запись статистики помечает затронутые области (ученик, группа) в сессии; после commit их версии растут,
+и записи кэша, зависящие от этих областей, перестают совпадать. Повторное чтение без изменений
+не обращается к БД. Кэш в памяти процесса (один воркер uvicorn), размер ограничен (LRU).
+"""
+import threading
+from typing import Any, Callable, Hashable, Iterable
+
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.cache import LRU, invalidate_on_commit
+
+# Изменение состава групп (ученики, преподаватели групп) влияет на все записи
+STRUCTURE_SCOPE = ("structure",)
+
+
+class VersionedLRUCache:
+  def __init__(self, max_entries: int):
+    self._entries: LRU[Hashable, tuple[tuple, Any]] = LRU(max_entries)
+    self._versions: dict[tuple, int] = {}
+    self._seq = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  @property
+  def max_entries(self) -> int:
+    return self._entries.max_entries
+
+  @max_entries.setter
+  def max_entries(self, value: int) -> None:
+    self._entries.max_entries = value
+
+  def _snapshot(self, scopes: tuple[tuple, ...]) -> tuple:
+    return tuple((scope, self._versions.get(scope, 0)) for scope in (STRUCTURE_SCOPE, *scopes))
+
+  def discard(self, scopes: Iterable[tuple]) -> None:
+    """Новые версии областей: зависящие от них записи больше не совпадают."""
+    with self._lock:
+      for scope in scopes:
+        self._seq += 1
+        self._versions[scope] = self._seq
+
+  def get_or_compute(self, key: Hashable, compute: Callable[[], tuple[Any, tuple[tuple, ...]]]) -> Any:
+    """compute() возвращает (значение, области, от которых оно зависит)."""
+    if self.max_entries <= 0:
+      return compute()[0]
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None:
+        deps, value = entry
+        if deps == self._snapshot(tuple(scope for scope, _ in deps[1:])):
+          self.hits += 1
+          return value
+        self._entries.pop(key)
+      self.misses += 1
+      started_seq = self._seq
+
+    value, scopes = compute()
+
+    with self._lock:
+      deps = self._snapshot(scopes)
+      # Данные менялись во время вычисления — не кэшируем, чтобы не сохранить устаревший ответ
+      if all(version <= started_seq for _, version in deps):
+        self._entries.put(key, (deps, value))
+    return value
+
+  def stats(self) -> dict:
+    with self._lock:
+      total = self.hits + self.misses
+      return {
+        "size": len(self._entries),
+        "max_size": self.max_entries,
+        "hits": self.hits,
+        "misses": self.misses,
+        "hit_ratio": round(self.hits / total, 4) if total else None,
+      }
+
+
+cache = VersionedLRUCache(settings.STATS_CACHE_SIZE)
+
+
+def student_scope(student_id: int) -> tuple:
+  return ("student", student_id)
+
+
+def group_scope(group_id: int) -> tuple:
+  return ("group", group_id)
+
+
+def mark_changed(db: Session, *scopes: tuple) -> None:
+  """Помечает области как изменённые; версии растут только после commit сессии."""
+  invalidate_on_commit(db, cache, *scopes)
+
+
+def mark_student_changed(db: Session, student_id: int, group_id: int | None = None) -> None:
+  scopes = [student_scope(student_id)]
+  if group_id is not None:
+    scopes.append(group_scope(group_id))
+  mark_changed(db, *scopes)
+
+
+def mark_structure_changed(db: Session) -> None:
+  mark_changed(db, STRUCTURE_SCOPE)
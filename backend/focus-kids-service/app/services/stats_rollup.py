@@ -0,0 +1,371 @@
+"""
+Агрегаты статистики: student_stats_rollup и group_stats_rollup.
+Маршруты записи (оценки, посещаемость, ДЗ, тесты) обновляют их в той же транзакции, что и исходные данные:
+счётчики посещаемости и оценок — атомарными приращениями (INSERT ... ON CONFLICT DO UPDATE),
+производные величины (ДЗ с уроков, ДЗ и тесты программ) — пересчётом одного ученика.
+Каждое изменение помечает затронутых учеников и группы для кэша статистики (app.services.stats_cache).
+Полный пересчёт: python -m app.commands.rebuild_stats_rollup
+"""
+from collections.abc import Iterable
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.attendance import Attendance
+from app.models.grade import Grade
+from app.models.group import Group
+from app.models.homework import Homework, HomeworkSubmission
+from app.models.program import Program
+from app.models.stats_rollup import GroupStatsRollup, StudentStatsRollup
+from app.models.student import Student
+from app.models.test import Test, TestSubmission
+from app.services import stats_cache
+
+# Оценки за занятия: только типы, которые являются оценками 1–5 (без homework_next, teacher_comment и тестов)
+LESSON_GRADE_TYPES = ("oral_hw", "written_hw", "dictation", "classwork")
+# Оценки, которыми проверяется ДЗ с урока (homework_next)
+HOMEWORK_CHECK_GRADE_TYPES = ("oral_hw", "written_hw")
+# Типы оценок, от которых зависит выполнение ДЗ с уроков
+LESSON_HW_GRADE_TYPES = ("homework_next", *HOMEWORK_CHECK_GRADE_TYPES)
+
+STUDENT_SECTIONS = {
+  "lessons": ("total_lessons", "attended_lessons"),
+  "grades": tuple(f"{t}_{suffix}" for t in LESSON_GRADE_TYPES for suffix in ("sum", "count")),
+  "lesson_hw": ("lesson_hw_total", "lesson_hw_completed"),
+  "homeworks": ("completed_homeworks",),
+  "tests": ("completed_tests", "best_score_sum", "best_max_score_sum"),
+}
+GROUP_SECTIONS = {
+  "lessons": ("total_lessons", "attended_lessons"),
+  "grades": ("grade_sum", "grade_count"),
+  "content": ("total_homeworks", "total_tests"),
+}
+
+
+def _scope(column, ids: Iterable[int] | None) -> list:
+  return [column.in_(list(ids))] if ids is not None else []
+
+
+# --- Наборные запросы по разделам: (ключ, значения...) с группировкой по ученику/группе ---
+
+def _student_lessons(student_ids):
+  return (
+    select(
+      Attendance.student_id,
+      func.count().label("total_lessons"),
+      func.count().filter(Attendance.present.is_(True)).label("attended_lessons"),
+    )
+    .where(*_scope(Attendance.student_id, student_ids))
+    .group_by(Attendance.student_id)
+  )
+
+
+def _student_grades(student_ids):
+  columns = []
+  for grade_type in LESSON_GRADE_TYPES:
+    columns.append(func.coalesce(func.sum(Grade.value).filter(Grade.type == grade_type), 0).label(f"{grade_type}_sum"))
+    columns.append(func.count().filter(Grade.type == grade_type).label(f"{grade_type}_count"))
+  return (
+    select(Grade.student_id, *columns)
+    .where(Grade.type.in_(LESSON_GRADE_TYPES), *_scope(Grade.student_id, student_ids))
+    .group_by(Grade.student_id)
+  )
+
+
+def _student_lesson_hw(student_ids):
+  # ДЗ с урока (homework_next) «выполнено», если на более позднем уроке есть oral_hw или written_hw,
+  # т.е. его дата раньше последней такой оценки ученика
+  last_check = (
+    select(Grade.student_id, func.max(Grade.lesson_date).label("last_check_date"))
+    .where(Grade.type.in_(HOMEWORK_CHECK_GRADE_TYPES), *_scope(Grade.student_id, student_ids))
+    .group_by(Grade.student_id)
+    .subquery()
+  )
+  return (
+    select(
+      Grade.student_id,
+      func.count().label("lesson_hw_total"),
+      func.count().filter(Grade.lesson_date < last_check.c.last_check_date).label("lesson_hw_completed"),
+    )
+    .outerjoin(last_check, last_check.c.student_id == Grade.student_id)
+    .where(Grade.type == "homework_next", Grade.lesson_date.isnot(None), *_scope(Grade.student_id, student_ids))
+    .group_by(Grade.student_id)
+  )
+
+
+def _student_homeworks(student_ids):
+  return (
+    select(HomeworkSubmission.student_id, func.count().label("completed_homeworks"))
+    .join(Homework, Homework.id == HomeworkSubmission.homework_id)
+    .join(Program, Program.id == Homework.program_id)
+    .join(Student, Student.id == HomeworkSubmission.student_id)
+    .where(Program.group_id == Student.group_id, *_scope(HomeworkSubmission.student_id, student_ids))
+    .group_by(HomeworkSubmission.student_id)
+  )
+
+
+def _student_tests(student_ids):
+  # Лучшая попытка по каждому тесту программ группы: DISTINCT ON (student_id, test_id)
+  best_attempts = (
+    select(TestSubmission.student_id, TestSubmission.test_id, TestSubmission.score, TestSubmission.max_score)
+    .join(Test, Test.id == TestSubmission.test_id)
+    .join(Program, Program.id == Test.program_id)
+    .join(Student, Student.id == TestSubmission.student_id)
+    .where(
+      Program.group_id == Student.group_id,
+      TestSubmission.score.isnot(None),
+      *_scope(TestSubmission.student_id, student_ids),
+    )
+    .distinct(TestSubmission.student_id, TestSubmission.test_id)
+    .order_by(TestSubmission.student_id, TestSubmission.test_id, TestSubmission.score.desc(), TestSubmission.id)
+    .subquery()
+  )
+  return (
+    select(
+      best_attempts.c.student_id,
+      func.count().label("completed_tests"),
+      func.sum(best_attempts.c.score).label("best_score_sum"),
+      func.sum(func.coalesce(best_attempts.c.max_score, 0)).label("best_max_score_sum"),
+    )
+    .group_by(best_attempts.c.student_id)
+  )
+
+
+def _group_lessons(group_ids):
+  return (
+    select(
+      Attendance.group_id,
+      func.count().label("total_lessons"),
+      func.count().filter(Attendance.present.is_(True)).label("attended_lessons"),
+    )
+    .where(*_scope(Attendance.group_id, group_ids))
+    .group_by(Attendance.group_id)
+  )
+
+
+def _group_grades(group_ids):
+  return (
+    select(Grade.group_id, func.sum(Grade.value).label("grade_sum"), func.count().label("grade_count"))
+    .where(Grade.type.in_(LESSON_GRADE_TYPES), *_scope(Grade.group_id, group_ids))
+    .group_by(Grade.group_id)
+  )
+
+
+def _group_content(group_ids):
+  homeworks = select(func.count()).select_from(Homework).join(Program, Program.id == Homework.program_id)
+  tests = select(func.count()).select_from(Test).join(Program, Program.id == Test.program_id)
+  return select(
+    Group.id.label("group_id"),
+    homeworks.where(Program.group_id == Group.id).scalar_subquery().label("total_homeworks"),
+    tests.where(Program.group_id == Group.id).scalar_subquery().label("total_tests"),
+  ).where(*_scope(Group.id, group_ids))
+
+
+_STUDENT_SECTION_QUERIES = {
+  "lessons": _student_lessons,
+  "grades": _student_grades,
+  "lesson_hw": _student_lesson_hw,
+  "homeworks": _student_homeworks,
+  "tests": _student_tests,
+}
+_GROUP_SECTION_QUERIES = {
+  "lessons": _group_lessons,
+  "grades": _group_grades,
+  "content": _group_content,
+}
+
+
+def _rollup_select(key_column, key_name, section_columns, section_queries, ids):
+  """SELECT ключ + значения разделов (0 при отсутствии данных) для всех или указанных сущностей."""
+  columns = [key_column.label(key_name)]
+  source = key_column.table
+  for name in section_columns:
+    sub = section_queries[name](ids).subquery()
+    source = source.outerjoin(sub, sub.c[key_name] == key_column)
+    columns.extend(func.coalesce(sub.c[c], 0).label(c) for c in section_columns[name])
+  return select(*columns).select_from(source).where(*_scope(key_column, ids))
+
+
+def _upsert_sections(db: Session, model, key_name: str, section_columns: dict, query) -> None:
+  columns = [c for names in section_columns.values() for c in names]
+  stmt = pg_insert(model.__table__).from_select([key_name, *columns], query, include_defaults=False)
+  stmt = stmt.on_conflict_do_update(
+    index_elements=[key_name],
+    set_={c: stmt.excluded[c] for c in columns},
+  )
+  db.execute(stmt)
+
+
+def refresh_students(db: Session, student_ids: Iterable[int], sections: Iterable[str] = tuple(STUDENT_SECTIONS)) -> None:
+  """Пересчитывает разделы агрегатов указанных учеников из исходных таблиц."""
+  student_ids = list(student_ids)
+  if not student_ids:
+    return
+  section_columns = {name: STUDENT_SECTIONS[name] for name in sections}
+  query = _rollup_select(Student.id, "student_id", section_columns, _STUDENT_SECTION_QUERIES, student_ids)
+  _upsert_sections(db, StudentStatsRollup, "student_id", section_columns, query)
+  stats_cache.mark_changed(db, *(stats_cache.student_scope(sid) for sid in student_ids))
+
+
+def refresh_groups(db: Session, group_ids: Iterable[int], sections: Iterable[str] = tuple(GROUP_SECTIONS)) -> None:
+  """Пересчитывает разделы агрегатов указанных групп из исходных таблиц."""
+  group_ids = list(group_ids)
+  if not group_ids:
+    return
+  section_columns = {name: GROUP_SECTIONS[name] for name in sections}
+  query = _rollup_select(Group.id, "group_id", section_columns, _GROUP_SECTION_QUERIES, group_ids)
+  _upsert_sections(db, GroupStatsRollup, "group_id", section_columns, query)
+  stats_cache.mark_changed(db, *(stats_cache.group_scope(gid) for gid in group_ids))
+
+
+def rebuild(db: Session) -> None:
+  """Полный пересчёт обеих таблиц агрегатов (в транзакции вызывающего кода)."""
+  db.execute(delete(StudentStatsRollup))
+  db.execute(delete(GroupStatsRollup))
+  query = _rollup_select(Student.id, "student_id", STUDENT_SECTIONS, _STUDENT_SECTION_QUERIES, None)
+  _upsert_sections(db, StudentStatsRollup, "student_id", STUDENT_SECTIONS, query)
+  query = _rollup_select(Group.id, "group_id", GROUP_SECTIONS, _GROUP_SECTION_QUERIES, None)
+  _upsert_sections(db, GroupStatsRollup, "group_id", GROUP_SECTIONS, query)
+  stats_cache.mark_structure_changed(db)
+
+
+def rebuild_if_empty(db: Session) -> bool:
+  """Заполняет агрегаты при первом запуске (таблицы только что созданы, а ученики уже есть)."""
+  if db.execute(select(exists().select_from(StudentStatsRollup))).scalar():
+    return False
+  if not db.execute(select(exists().select_from(Student))).scalar():
+    return False
+  rebuild(db)
+  db.commit()
+  return True
+
+
+# --- Приращения из маршрутов записи (вызывать до db.commit()) ---
+
+def _bump(db: Session, model, key_name: str, key_value: int, deltas: dict[str, int]) -> None:
+  table = model.__table__
+  stmt = pg_insert(table).values({key_name: key_value, **deltas})
+  stmt = stmt.on_conflict_do_update(
+    index_elements=[key_name],
+    set_={c: table.c[c] + stmt.excluded[c] for c in deltas},
+  )
+  db.execute(stmt)
+  scope = stats_cache.student_scope if model is StudentStatsRollup else stats_cache.group_scope
+  stats_cache.mark_changed(db, scope(key_value))
+
+
+def _program_group_id(db: Session, program_id: int) -> int | None:
+  return db.execute(select(Program.group_id).where(Program.id == program_id)).scalar()
+
+
+def record_attendance(db: Session, record: Attendance, sign: int = 1) -> None:
+  """Учитывает запись посещаемости (sign=-1 — снимает, после db.delete)."""
+  deltas = {"total_lessons": sign, "attended_lessons": sign if record.present else 0}
+  _bump(db, StudentStatsRollup, "student_id", record.student_id, deltas)
+  _bump(db, GroupStatsRollup, "group_id", record.group_id, deltas)
+
+
+def record_attendance_change(db: Session, record: Attendance, was_present: bool) -> None:
+  if record.present == was_present:
+    return
+  deltas = {"attended_lessons": 1 if record.present else -1}
+  _bump(db, StudentStatsRollup, "student_id", record.student_id, deltas)
+  _bump(db, GroupStatsRollup, "group_id", record.group_id, deltas)
+
+
+def _record_grade_value(db: Session, grade: Grade, grade_type: str, value: int, sign: int) -> None:
+  if grade_type not in LESSON_GRADE_TYPES:
+    return
+  _bump(db, StudentStatsRollup, "student_id", grade.student_id, {
+    f"{grade_type}_sum": sign * value,
+    f"{grade_type}_count": sign,
+  })
+  _bump(db, GroupStatsRollup, "group_id", grade.group_id, {"grade_sum": sign * value, "grade_count": sign})
+
+
+def _refresh_lesson_hw(db: Session, student_id: int) -> None:
+  db.flush()
+  refresh_students(db, [student_id], ("lesson_hw",))
+
+
+def record_grade(db: Session, grade: Grade, sign: int = 1) -> None:
+  """Учитывает оценку (sign=-1 — снимает, после db.delete)."""
+  _record_grade_value(db, grade, grade.type, grade.value, sign)
+  if grade.type in LESSON_HW_GRADE_TYPES:
+    _refresh_lesson_hw(db, grade.student_id)
+
+
+def record_grade_change(db: Session, grade: Grade, old_type: str, old_value: int) -> None:
+  """Изменение типа/значения/даты оценки (вызывать после применения изменений)."""
+  _record_grade_value(db, grade, old_type, old_value, -1)
+  _record_grade_value(db, grade, grade.type, grade.value, 1)
+  if old_type in LESSON_HW_GRADE_TYPES or grade.type in LESSON_HW_GRADE_TYPES:
+    _refresh_lesson_hw(db, grade.student_id)
+
+
+def record_homework(db: Session, homework: Homework, sign: int = 1) -> None:
+  """Создание (sign=1) или удаление (sign=-1, после db.delete) ДЗ программы."""
+  group_id = _program_group_id(db, homework.program_id)
+  if group_id is not None:
+    _bump(db, GroupStatsRollup, "group_id", group_id, {"total_homeworks": sign})
+  if sign < 0:
+    student_ids = db.execute(
+      select(HomeworkSubmission.student_id).where(HomeworkSubmission.homework_id == homework.id).distinct()
+    ).scalars().all()
+    db.flush()
+    refresh_students(db, student_ids, ("homeworks",))
+
+
+def record_homework_submission(db: Session, submission: HomeworkSubmission) -> None:
+  db.flush()
+  refresh_students(db, [submission.student_id], ("homeworks",))
+
+
+def record_test(db: Session, test: Test, sign: int = 1) -> None:
+  """Создание (sign=1) или удаление (sign=-1, после db.delete) теста программы."""
+  group_id = _program_group_id(db, test.program_id)
+  if group_id is not None:
+    _bump(db, GroupStatsRollup, "group_id", group_id, {"total_tests": sign})
+  if sign < 0:
+    student_ids = db.execute(
+      select(TestSubmission.student_id).where(TestSubmission.test_id == test.id).distinct()
+    ).scalars().all()
+    db.flush()
+    refresh_students(db, student_ids, ("tests",))
+
+
+def record_test_submission(db: Session, submission: TestSubmission) -> None:
+  db.flush()
+  refresh_students(db, [submission.student_id], ("tests",))
+
+
+def record_student_group_change(db: Session, student_id: int) -> None:
+  """ДЗ и тесты считаются по программам текущей группы ученика."""
+  stats_cache.mark_structure_changed(db)
+  db.flush()
+  refresh_students(db, [student_id], ("homeworks", "tests"))
+
+
+def record_program_deleted(db: Session, program: Program) -> None:
+  """После db.delete(program): каскадно удалены ДЗ и тесты программы."""
+  db.flush()
+  refresh_groups(db, [program.group_id], ("content",))
+  student_ids = db.execute(select(Student.id).where(Student.group_id == program.group_id)).scalars().all()
+  refresh_students(db, student_ids, ("homeworks", "tests"))
+
+
+# --- Чтение ---
+
+def get_student_rollup(db: Session, student_id: int) -> StudentStatsRollup:
+  rollup = db.get(StudentStatsRollup, student_id)
+  if rollup is None:
+    rollup = StudentStatsRollup(student_id=student_id, **{c: 0 for names in STUDENT_SECTIONS.values() for c in names})
+  return rollup
+
+
+def get_group_rollup(db: Session, group_id: int | None) -> GroupStatsRollup:
+  rollup = db.get(GroupStatsRollup, group_id) if group_id is not None else None
+  if rollup is None:
+    rollup = GroupStatsRollup(group_id=group_id, **{c: 0 for names in GROUP_SECTIONS.values() for c in names})
+  return rollup
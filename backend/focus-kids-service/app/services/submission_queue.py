@@ -0,0 +1,222 @@
+"""
+Приём попыток тестов через очередь в Postgres (режим TEST_SUBMISSION_QUEUE) — для пиков, когда тест пишет вся школа.
+POST /tests/submissions только проверяет запрос и вставляет строку test_submission_queue (один INSERT и commit),
+отвечая 202 с заранее выданным submission_id. Пул обработчиков (потоки процесса) забирает строки по одной
+через SELECT ... FOR UPDATE SKIP LOCKED и записывает попытки тем же кодом, что и синхронный режим
+(app.services.test_submissions); каждая попытка — отдельная транзакция. Взаимоблокировки и сбои
+сериализации не отклоняют попытку: строка остаётся в очереди до повторной обработки.
+Очередь переживает перезапуск: необработанные строки заберут обработчики после старта.
+Результат отдаёт GET /tests/submissions/{id}/result (с ожиданием ?wait=).
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.models.test import Test, TestSubmission, TestSubmissionQueueItem
+from app.schemas.test import TestSubmissionAnswerCreate, TestSubmissionCreate
+from app.services import attempt_ledger, test_submissions
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 1.0
+PURGE_INTERVAL_SECONDS = 600
+# Обработанные строки нужны только для опроса результата
+RETENTION = "1 day"
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_threads: list[threading.Thread] = []
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def check_attempts(db: Session, test: Test, student_id: int) -> None:
+  """
+  Предварительная проверка лимита до ответа 202 (AttemptsExceeded): учитывает и попытки, ещё стоящие в очереди.
+  Параллельные отправки могут пройти обе — тогда лишнюю отклонит обработчик.
+  """
+  pending = db.execute(
+    select(func.count())
+    .select_from(TestSubmissionQueueItem)
+    .where(
+      TestSubmissionQueueItem.test_id == test.id,
+      TestSubmissionQueueItem.student_id == student_id,
+      TestSubmissionQueueItem.status == "queued",
+    )
+  ).scalar_one()
+  claim = attempt_ledger.peek_attempts(db, test, student_id, pending)
+  if not claim.allowed:
+    raise test_submissions.AttemptsExceeded(test, claim)
+
+
+def enqueue(db: Session, payload: TestSubmissionCreate) -> int:
+  """Ставит попытку в очередь и возвращает её будущий id. Вызывающий делает commit, затем wake()."""
+  return db.execute(
+    insert(TestSubmissionQueueItem)
+    .values(
+      submission_id=func.nextval(func.pg_get_serial_sequence("test_submissions", "id")),
+      test_id=payload.test_id,
+      student_id=payload.student_id,
+      answers=[answer.model_dump() for answer in payload.answers],
+    )
+    .returning(TestSubmissionQueueItem.submission_id)
+  ).scalar_one()
+
+
+def has_pending(db: Session, test_id: int | None = None) -> bool:
+  """Есть ли необработанные попытки (всех тестов или одного)."""
+  query = select(TestSubmissionQueueItem.submission_id).where(TestSubmissionQueueItem.status == "queued")
+  if test_id is not None:
+    query = query.where(TestSubmissionQueueItem.test_id == test_id)
+  return db.execute(query.limit(1)).first() is not None
+
+
+def wake() -> None:
+  _wakeup.set()
+
+
+def _claim_next(db: Session) -> TestSubmissionQueueItem | None:
+  """Следующая свободная строка очереди; блокировка держится до commit/rollback её обработки."""
+  return db.execute(
+    select(TestSubmissionQueueItem)
+    .where(TestSubmissionQueueItem.status == "queued")
+    .order_by(TestSubmissionQueueItem.submission_id)
+    .limit(1)
+    .with_for_update(skip_locked=True)
+  ).scalar_one_or_none()
+
+
+def _process_item(db: Session, item: TestSubmissionQueueItem) -> None:
+  """
+  Записывает попытку и помечает строку; OperationalError (взаимоблокировка, сбой сериализации,
+  потеря соединения) пробрасывается — строка остаётся queued и будет обработана повторно.
+  """
+  item.processed_at = func.now()
+  # FOR SHARE, как в POST /tests/submissions: замена вопросов ждёт конца проверки
+  test = db.execute(select(Test).where(Test.id == item.test_id).with_for_update(read=True)).scalar_one_or_none()
+  if test is None:
+    item.status = "rejected"
+    item.error = "Тест удалён"
+    return
+  answers = [TestSubmissionAnswerCreate.model_validate(answer) for answer in item.answers]
+  savepoint = db.begin_nested()
+  try:
+    test_submissions.submit(db, test, item.student_id, answers, submission_id=item.submission_id)
+    savepoint.commit()
+    item.status = "done"
+  except OperationalError:
+    raise
+  except test_submissions.AttemptsExceeded as e:
+    savepoint.rollback()
+    item.status = "rejected"
+    item.error = e.detail
+  except Exception as e:
+    savepoint.rollback()
+    logger.exception("Queued submission %s failed", item.submission_id)
+    item.status = "failed"
+    item.error = str(e)
+
+
+def process_batch(db: Session) -> int:
+  """
+  Обрабатывает до TEST_SUBMISSION_QUEUE_BATCH строк очереди, каждую в своей транзакции: блокировки журнала
+  попыток и счётчиков теста держатся только на время одной попытки, и обработчики не ждут друг друга
+  на общем тесте. Возвращает число обработанных строк.
+  """
+  processed = 0
+  while processed < settings.TEST_SUBMISSION_QUEUE_BATCH:
+    item = _claim_next(db)
+    if item is None:
+      break
+    submission_id = item.submission_id
+    try:
+      _process_item(db, item)
+      db.commit()
+    except OperationalError:
+      db.rollback()
+      logger.warning("Queued submission %s will be retried", submission_id, exc_info=True)
+      raise
+    processed += 1
+  return processed
+
+
+def _purge_if_due() -> None:
+  global _last_purge
+  with _purge_lock:
+    if time.monotonic() - _last_purge < PURGE_INTERVAL_SECONDS:
+      return
+    _last_purge = time.monotonic()
+  with SessionLocal() as db:
+    db.execute(
+      delete(TestSubmissionQueueItem)
+      .where(
+        TestSubmissionQueueItem.status != "queued",
+        TestSubmissionQueueItem.processed_at < func.now() - text(f"interval '{RETENTION}'"),
+      )
+    )
+    db.commit()
+
+
+def _grader_loop() -> None:
+  while not _stop.is_set():
+    processed = 0
+    try:
+      with SessionLocal() as db:
+        processed = process_batch(db)
+      if not processed:
+        _purge_if_due()
+    except Exception:
+      logger.exception("Submission queue grader iteration failed")
+    if not processed:
+      _wakeup.wait(POLL_INTERVAL_SECONDS)
+      _wakeup.clear()
+
+
+def start_graders() -> None:
+  """Запускает TEST_SUBMISSION_GRADERS потоков-обработчиков (один раз на процесс)."""
+  if _threads:
+    return
+  _stop.clear()
+  for i in range(settings.TEST_SUBMISSION_GRADERS):
+    thread = threading.Thread(target=_grader_loop, name=f"submission-grader-{i}", daemon=True)
+    thread.start()
+    _threads.append(thread)
+
+
+def stop_graders(timeout: float = 10.0) -> None:
+  """Останавливает обработчики после текущей пачки; необработанные строки остаются в очереди."""
+  _stop.set()
+  _wakeup.set()
+  for thread in _threads:
+    thread.join(timeout)
+  _threads.clear()
+
+
+def get_result(db: Session, submission_id: int) -> dict | None:
+  """Состояние попытки (queued / done / rejected / failed) и её ученик; None — такой попытки нет."""
+  item = db.execute(
+    select(TestSubmissionQueueItem.student_id, TestSubmissionQueueItem.status, TestSubmissionQueueItem.error)
+    .where(TestSubmissionQueueItem.submission_id == submission_id)
+  ).first()
+  if item is not None and item.status != "done":
+    return {"submission_id": submission_id, "student_id": item.student_id, "status": item.status, "detail": item.error}
+  # Обработанная попытка или принятая синхронно (строки очереди нет)
+  submission = db.execute(
+    select(TestSubmission.student_id, TestSubmission.score, TestSubmission.max_score)
+    .where(TestSubmission.id == submission_id)
+  ).first()
+  if submission is None:
+    return None
+  return {
+    "submission_id": submission_id,
+    "student_id": submission.student_id,
+    "status": "done",
+    "score": submission.score,
+    "max_score": submission.max_score,
+  }
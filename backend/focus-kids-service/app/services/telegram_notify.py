@@ -1,47 +1,153 @@
 """
 Отправка уведомлений в Telegram через бота (POST /notify).
 Вызывается после создания ДЗ, оценки, теста, видео.
+Отправляет один диспетчер на процесс (запускается в lifespan приложения): ограниченная очередь,
+постоянный пул потоков и общий httpx.Client с keep-alive соединениями к боту. Если очередь полна,
+событие отбрасывается (ответ API не ждёт бота); счётчики — metrics() и GET /internal/notify-metrics.
+При остановке диспетчер дообрабатывает очередь (с ограничением по времени).
 """
+import logging
+import queue
 import threading
+import time
+from dataclasses import dataclass
+
 import httpx
 from app.config.settings import settings
 
-NOTIFY_TYPES = ("new_homework", "new_grade", "lesson_grades", "new_test", "new_video")
+logger = logging.getLogger(__name__)
 
+NOTIFY_TYPES = ("new_homework", "homework_graded", "new_grade", "lesson_grades", "new_test", "new_video")
 
-def _send_notify_sync(
-  focus_user_ids: list[str],
-  notify_type: str,
-  payload: dict,
-) -> None:
+
+@dataclass(frozen=True)
+class _Notification:
+  focus_user_ids: list[str]
+  notify_type: str
+  payload: dict
+
+
+class NotificationDispatcher:
+  def __init__(self, queue_size: int, workers: int):
+    self.workers = workers
+    self._queue: queue.Queue[_Notification | None] = queue.Queue(maxsize=queue_size)
+    self._threads: list[threading.Thread] = []
+    self._client: httpx.Client | None = None
+    self._accepting = False
+    self._lock = threading.Lock()
+    self._enqueued = 0
+    self._dropped = 0
+    self._sent = 0
+    self._failed = 0
+    self._send_seconds_total = 0.0
+    self._send_seconds_max = 0.0
+
+  def start(self) -> None:
+    """Запускает пул потоков (один раз на процесс)."""
+    with self._lock:
+      if self._threads:
+        return
+      self._client = httpx.Client(
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+      )
+      for i in range(self.workers):
+        thread = threading.Thread(target=self._worker_loop, name=f"notify-worker-{i}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+      self._accepting = True
+
+  def stop(self, timeout: float = 10.0) -> None:
+    """Перестаёт принимать события, дообрабатывает очередь не дольше timeout секунд и закрывает клиент."""
+    with self._lock:
+      if not self._threads:
+        return
+      self._accepting = False
+      threads, self._threads = self._threads, []
+    deadline = time.monotonic() + timeout
+    try:
+      # Маркеры остановки встают после уже поставленных событий — потоки выходят, разобрав очередь
+      for _ in threads:
+        self._queue.put(None, timeout=max(deadline - time.monotonic(), 0))
+    except queue.Full:
+      pass
+    for thread in threads:
+      thread.join(max(deadline - time.monotonic(), 0))
+    if any(thread.is_alive() for thread in threads):
+      logger.warning("Очередь уведомлений не разобрана за %s с, осталось %s", timeout, self._queue.qsize())
+    else:
+      self._client.close()
+
+  def submit(self, focus_user_ids: list[str], notify_type: str, payload: dict) -> bool:
+    """Ставит событие в очередь без ожидания; False — отброшено (очередь полна или диспетчер остановлен)."""
+    try:
+      if not self._accepting:
+        raise queue.Full
+      self._queue.put_nowait(_Notification(focus_user_ids, notify_type, payload))
+    except queue.Full:
+      with self._lock:
+        self._dropped += 1
+      logger.warning("Уведомление %s отброшено: очередь заполнена или диспетчер не запущен", notify_type)
+      return False
+    with self._lock:
+      self._enqueued += 1
+    return True
+
+  def metrics(self) -> dict:
+    with self._lock:
+      sends = self._sent + self._failed
+      return {
+        "queue_depth": self._queue.qsize(),
+        "queue_size": self._queue.maxsize,
+        "workers": self.workers,
+        "enqueued": self._enqueued,
+        "dropped": self._dropped,
+        "sent": self._sent,
+        "failed": self._failed,
+        "send_seconds_avg": round(self._send_seconds_total / sends, 4) if sends else None,
+        "send_seconds_max": round(self._send_seconds_max, 4),
+      }
+
+  def _worker_loop(self) -> None:
+    while True:
+      notification = self._queue.get()
+      if notification is None:
+        return
+      started = time.monotonic()
+      ok = _send_notify(self._client, notification)
+      elapsed = time.monotonic() - started
+      with self._lock:
+        if ok:
+          self._sent += 1
+        else:
+          self._failed += 1
+        self._send_seconds_total += elapsed
+        self._send_seconds_max = max(self._send_seconds_max, elapsed)
+
+
+def _send_notify(client: httpx.Client, notification: _Notification) -> bool:
   url = (settings.TELEGRAM_BOT_NOTIFY_URL or "").strip().rstrip("/")
   secret = (settings.TELEGRAM_BOT_NOTIFY_SECRET or "").strip()
-  if not url or not secret or not focus_user_ids:
-    if focus_user_ids and (not url or not secret):
-      import logging
-      logging.getLogger(__name__).warning(
-        "Уведомления в бот отключены: задайте TELEGRAM_BOT_NOTIFY_URL и TELEGRAM_BOT_NOTIFY_SECRET"
-      )
-    return
-  if notify_type not in NOTIFY_TYPES:
-    return
   try:
-    with httpx.Client(timeout=10.0) as client:
-      r = client.post(
-        f"{url}/notify",
-        json={
-          "focus_user_ids": focus_user_ids,
-          "type": notify_type,
-          "payload": payload,
-        },
-        headers={"X-Notify-Secret": secret},
-      )
-      if r.status_code != 200:
-        import logging
-        logging.getLogger(__name__).warning("Бот уведомлений вернул %s: %s", r.status_code, r.text[:200])
+    r = client.post(
+      f"{url}/notify",
+      json={
+        "focus_user_ids": notification.focus_user_ids,
+        "type": notification.notify_type,
+        "payload": notification.payload,
+      },
+      headers={"X-Notify-Secret": secret},
+    )
+    if r.status_code != 200:
+      logger.warning("Бот уведомлений вернул %s: %s", r.status_code, r.text[:200])
+      return False
+    return True
   except Exception as e:
-    import logging
-    logging.getLogger(__name__).warning("Ошибка отправки уведомления в бот: %s", e)
+    logger.warning("Ошибка отправки уведомления в бот: %s", e)
+    return False
+
+
+dispatcher = NotificationDispatcher(settings.NOTIFY_QUEUE_SIZE, settings.NOTIFY_WORKERS)
 
 
 def notify_students(
@@ -49,11 +155,10 @@ def notify_students(
   notify_type: str,
   payload: dict,
 ) -> None:
-  """Запускает отправку уведомлений в фоне (не блокирует ответ API)."""
-  if not focus_user_ids:
+  """Ставит уведомление в очередь диспетчера (не блокирует ответ API)."""
+  if not focus_user_ids or notify_type not in NOTIFY_TYPES:
+    return
+  if not (settings.TELEGRAM_BOT_NOTIFY_URL or "").strip() or not (settings.TELEGRAM_BOT_NOTIFY_SECRET or "").strip():
+    logger.warning("Уведомления в бот отключены: задайте TELEGRAM_BOT_NOTIFY_URL и TELEGRAM_BOT_NOTIFY_SECRET")
     return
-  threading.Thread(
-    target=_send_notify_sync,
-    args=(focus_user_ids, notify_type, payload),
-    daemon=True,
-  ).start()
+  dispatcher.submit(focus_user_ids, notify_type, payload)
@@ -0,0 +1,71 @@
+"""
+Приём попытки теста: занять попытку в журнале, проверить по ключу ответов, записать попытку с ответами
+и обновить журнал, агрегаты статистики и анализ вопросов. Общий код для синхронного POST /tests/submissions
+и обработчиков очереди (app.services.submission_queue). Вызывающий делает commit.
+"""
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.test import Test, TestSubmission, TestSubmissionAnswer
+from app.services import attempt_ledger, grading, item_analysis, stats_rollup
+
+
+class AttemptsExceeded(Exception):
+  """Лимит попыток исчерпан; detail — текст для ученика."""
+
+  def __init__(self, test: Test, claim: attempt_ledger.AttemptClaim):
+    self.detail = (
+      f"Превышено число попыток ({test.max_attempts} + {claim.approved_retakes} пересдач). "
+      "Дополнительную попытку может разрешить учитель."
+    )
+    super().__init__(self.detail)
+
+
+def submit(
+  db: Session,
+  test: Test,
+  student_id: int,
+  answers: Iterable,
+  submission_id: int | None = None,
+) -> TestSubmission:
+  """
+  answers — объекты с question_id, answer_text и selected_answer_ids.
+  submission_id — id, заранее выданный очередью (иначе берётся из последовательности при INSERT).
+  """
+  # Ограничение попыток: если у теста задано max_attempts, лимит — max_attempts + разрешённые учителем пересдачи.
+  # Попытка занимается атомарно в журнале (test_attempt_ledger), поэтому двойная отправка не превысит лимит.
+  claim = attempt_ledger.claim_attempt(db, test, student_id)
+  if not claim.allowed:
+    raise AttemptsExceeded(test, claim)
+
+  # Подсчитываем баллы по скомпилированному ключу ответов (без запросов к вопросам)
+  answer_key = grading.get_answer_key(db, test.id)
+  score, accepted_answers = grading.grade(answer_key, answers)
+
+  # Создаём submission и все ответы ученика одним INSERT
+  submission = TestSubmission(
+    id=submission_id,
+    test_id=test.id,
+    student_id=student_id,
+    score=score,
+    max_score=answer_key.max_score,
+  )
+  db.add(submission)
+  db.flush()
+  if accepted_answers:
+    db.execute(insert(TestSubmissionAnswer), [
+      {
+        "submission_id": submission.id,
+        "question_id": answer_data.question_id,
+        "answer_text": answer_data.answer_text,
+        "selected_answer_ids": answer_data.selected_answer_ids,
+      }
+      for answer_data in accepted_answers
+    ])
+
+  attempt_ledger.record_result(db, submission)
+  stats_rollup.record_test_submission(db, submission)
+  item_analysis.record_submission(db, answer_key, accepted_answers)
+  return submission
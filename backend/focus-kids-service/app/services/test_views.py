@@ -0,0 +1,46 @@
+"""
+Представление теста для ученика: без is_correct, заранее сериализованное в JSON (bytes).
+Кэш в памяти процесса по test_id хранит тело и сильный ETag (sha256 тела), поэтому повторное
+открытие теста с If-None-Match отвечает 304 без обращения к БД. Изменения теста сбрасывают
+запись после commit сессии (invalidate), как ключи ответов в app.services.grading.
+"""
+import hashlib
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.config.settings import settings
+from app.core.cache import GenerationLRUCache, invalidate_on_commit
+from app.models.test import Test, TestQuestion
+from app.schemas.test import TestStudentRead
+
+
+@dataclass(frozen=True)
+class StudentTestView:
+  body: bytes
+  etag: str
+
+
+def _render(db: Session, test_id: int) -> StudentTestView | None:
+  test = db.execute(
+    select(Test)
+    .where(Test.id == test_id)
+    .options(selectinload(Test.questions).selectinload(TestQuestion.answers))
+  ).scalar_one_or_none()
+  if test is None:
+    return None
+  body = TestStudentRead.model_validate(test).model_dump_json().encode()
+  return StudentTestView(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+cache: GenerationLRUCache[int, StudentTestView] = GenerationLRUCache(settings.TEST_VIEW_CACHE_SIZE)
+
+
+def get(db: Session, test_id: int) -> StudentTestView | None:
+  return cache.get(test_id, lambda: _render(db, test_id))
+
+
+def invalidate(db: Session, test_id: int) -> None:
+  """Тест, его вопросы или варианты изменились; представление сбрасывается после commit сессии."""
+  invalidate_on_commit(db, cache, test_id)
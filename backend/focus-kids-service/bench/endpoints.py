@@ -0,0 +1,292 @@
+"""
+Нагрузочный замер горячих эндпоинтов Focus Kids на данных bench.seed.
+Запросы выполняются в процессе через TestClient (без сети и uvicorn), поэтому время — это обработка
+запроса приложением и БД. По каждому эндпоинту считаются p50/p95/p99 латентности и число SQL-запросов
+на запрос (счётчик before_cursor_execute на engine). Результат пишется в JSON для сравнения прогонов.
+У сценариев с max_queries число запросов не зависит от объёма данных (нет N+1 и дозагрузок): превышение
+бюджета печатается и завершает прогон с кодом 1 — это регрессионная проверка загрузчиков.
+
+Запуск из backend/focus-kids-service (нужны APP_DATABASE_URL и APP_JWT_SECRET, данные из bench.seed):
+  python -m bench.endpoints [--requests 200] [--only statistics,groups] [--no-cache] [--baseline bench/results/old.json]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import jwt
+from fastapi.testclient import TestClient
+from sqlalchemy import event, exists, select
+
+from app.config.database import SessionLocal, engine
+from app.config.settings import settings
+from app.models.group import Group
+from app.models.homework import HomeworkSubmission
+from app.models.program import Program
+from app.models.student import Student
+from app.models.teacher import Teacher
+from app.models.test import Test, TestSubmission
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class QueryCounter:
+  """Число SQL-запросов, отправленных через engine (включая запросы зависимостей авторизации)."""
+
+  def __init__(self):
+    self.count = 0
+    self._lock = threading.Lock()
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    with self._lock:
+      self.count += 1
+
+
+@dataclass
+class Sample:
+  teacher_ids: list[int]
+  teacher_user_ids: dict[int, str]
+  group_ids: list[int]
+  student_ids: list[int]
+  student_user_ids: list[str]
+  test_ids: list[int]
+  homework_ids: list[int]
+
+
+@dataclass
+class Scenario:
+  name: str
+  group: str
+  role: str  # admin, teacher, student, internal
+  path: Callable[[Sample, random.Random], str]
+  max_queries: int | None = None  # SQL-запросов на запрос, не больше (для admin авторизация без запросов)
+
+
+SCENARIOS = [
+  Scenario("statistics.student", "statistics", "admin", lambda s, r: f"/api/statistics/students/{r.choice(s.student_ids)}"),
+  Scenario("statistics.student_trends", "statistics", "admin", lambda s, r: f"/api/statistics/students/{r.choice(s.student_ids)}/trends?bucket=week"),
+  Scenario("statistics.teacher", "statistics", "teacher", lambda s, r: f"/api/statistics/teachers/{r.choice(s.teacher_ids)}"),
+  Scenario("statistics.teachers", "statistics", "admin", lambda s, r: "/api/statistics/teachers"),
+  Scenario("statistics.group_overview", "statistics", "admin", lambda s, r: f"/api/statistics/groups/{r.choice(s.group_ids)}/overview"),
+  Scenario("statistics.group_trends", "statistics", "admin", lambda s, r: f"/api/statistics/groups/{r.choice(s.group_ids)}/trends?bucket=month"),
+  Scenario("programs.with_counts", "programs", "admin", lambda s, r: "/api/programs/with-counts"),
+  Scenario("tests.submissions_by_test", "tests", "admin", lambda s, r: f"/api/tests/submissions/by-test/{r.choice(s.test_ids)}"),
+  Scenario("tests.submissions_by_student", "tests", "admin", lambda s, r: f"/api/tests/submissions/by-student/{r.choice(s.student_ids)}"),
+  Scenario("tests.best_by_student", "tests", "admin", lambda s, r: f"/api/tests/submissions/best-by-student/{r.choice(s.student_ids)}"),
+  # Ответы на ДЗ: страница + по одному SELECT ... IN на каждую включённую связь (?with=)
+  Scenario("homeworks.submissions_by_homework", "homeworks", "admin", lambda s, r: f"/api/homeworks/submissions/by-homework/{r.choice(s.homework_ids)}", max_queries=3),
+  Scenario("homeworks.submissions_by_student", "homeworks", "admin", lambda s, r: f"/api/homeworks/submissions/by-student/{r.choice(s.student_ids)}", max_queries=3),
+  Scenario("homeworks.submissions_by_student_files", "homeworks", "admin", lambda s, r: f"/api/homeworks/submissions/by-student/{r.choice(s.student_ids)}?with=files", max_queries=2),
+  Scenario("homeworks.submissions_by_student_bare", "homeworks", "admin", lambda s, r: f"/api/homeworks/submissions/by-student/{r.choice(s.student_ids)}?with=", max_queries=1),
+  Scenario("homeworks.submissions_by_student_brief", "homeworks", "admin", lambda s, r: f"/api/homeworks/submissions/by-student/{r.choice(s.student_ids)}?fields=brief", max_queries=1),
+  Scenario("homeworks.review_queue", "homeworks", "admin", lambda s, r: f"/api/homeworks/review-queue?group_id={r.choice(s.group_ids)}", max_queries=1),
+  Scenario("groups.list", "groups", "admin", lambda s, r: "/api/groups"),
+  Scenario("groups.get", "groups", "admin", lambda s, r: f"/api/groups/{r.choice(s.group_ids)}"),
+  Scenario("internal.student_status", "internal", "internal", lambda s, r: f"/api/internal/student-status?focus_user_id={r.choice(s.student_user_ids)}"),
+]
+
+
+def _load_sample(prefix: str) -> Sample:
+  with SessionLocal() as db:
+    teachers = db.execute(
+      select(Teacher.id, Teacher.focus_user_id).where(Teacher.focus_user_id.startswith(prefix)).order_by(Teacher.id)
+    ).all()
+    students = db.execute(
+      select(Student.id, Student.focus_user_id).where(Student.focus_user_id.startswith(prefix)).order_by(Student.id)
+    ).all()
+    group_ids = db.execute(
+      select(Group.id).where(Group.teacher_id.in_([t.id for t in teachers])).order_by(Group.id)
+    ).scalars().all()
+    test_ids = db.execute(
+      select(Test.id)
+      .where(
+        Test.program_id.in_(select(Program.id).where(Program.group_id.in_(group_ids))),
+        exists().where(TestSubmission.test_id == Test.id),
+      )
+      .order_by(Test.id)
+      .limit(1000)
+    ).scalars().all()
+    homework_ids = db.execute(
+      select(HomeworkSubmission.homework_id)
+      .distinct()
+      .where(HomeworkSubmission.student_id.in_([s.id for s in students]))
+      .order_by(HomeworkSubmission.homework_id)
+      .limit(1000)
+    ).scalars().all()
+  if not teachers or not students or not group_ids or not test_ids or not homework_ids:
+    raise SystemExit(f"Нет данных с префиксом {prefix!r}: сначала выполните python -m bench.seed")
+  return Sample(
+    teacher_ids=[t.id for t in teachers],
+    teacher_user_ids={t.id: t.focus_user_id for t in teachers},
+    group_ids=list(group_ids),
+    student_ids=[s.id for s in students],
+    student_user_ids=[s.focus_user_id for s in students],
+    test_ids=list(test_ids),
+    homework_ids=list(homework_ids),
+  )
+
+
+def _token(sub: str, role: str) -> str:
+  return jwt.encode({"sub": sub, "role": role}, settings.APP_JWT_SECRET, algorithm="HS256")
+
+
+def _headers(scenario: Scenario, path: str, sample: Sample) -> dict:
+  if scenario.role == "internal":
+    return {"X-Internal-Secret": settings.INTERNAL_API_SECRET}
+  if scenario.role == "teacher":
+    # Учитель запрашивает свою статистику: токен того преподавателя, чей id в пути
+    teacher_id = int(path.rstrip("/").rsplit("/", 1)[-1])
+    return {"Authorization": f"Bearer {_token(sample.teacher_user_ids[teacher_id], 'user')}"}
+  return {"Authorization": f"Bearer {_token('bench-admin', 'admin')}"}
+
+
+def _percentile(sorted_values: list[float], p: int) -> float:
+  if len(sorted_values) == 1:
+    return sorted_values[0]
+  return statistics.quantiles(sorted_values, n=100, method="inclusive")[p - 1]
+
+
+def _run_scenario(client: TestClient, counter: QueryCounter, scenario: Scenario, sample: Sample, args, rng) -> dict:
+  latencies = []
+  queries = []
+  statuses: dict[str, int] = {}
+  for n in range(args.warmup + args.requests):
+    path = scenario.path(sample, rng)
+    headers = _headers(scenario, path, sample)
+    before = counter.count
+    started = time.perf_counter()
+    response = client.get(path, headers=headers)
+    elapsed = time.perf_counter() - started
+    if n < args.warmup:
+      continue
+    latencies.append(elapsed * 1000)
+    queries.append(counter.count - before)
+    statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+  latencies.sort()
+  return {
+    "name": scenario.name,
+    "group": scenario.group,
+    "max_queries": scenario.max_queries,
+    "requests": len(latencies),
+    "statuses": statuses,
+    "latency_ms": {
+      "p50": round(_percentile(latencies, 50), 3),
+      "p95": round(_percentile(latencies, 95), 3),
+      "p99": round(_percentile(latencies, 99), 3),
+      "mean": round(statistics.fmean(latencies), 3),
+      "max": round(latencies[-1], 3),
+    },
+    "queries_per_request": {
+      "mean": round(statistics.fmean(queries), 2),
+      "max": max(queries),
+    },
+  }
+
+
+def _git_commit() -> str | None:
+  try:
+    return subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def _print_comparison(results: list[dict], baseline_path: Path) -> None:
+  baseline = {r["name"]: r for r in json.loads(baseline_path.read_text(encoding="utf-8"))["endpoints"]}
+  print(f"\nсравнение с {baseline_path}:")
+  for result in results:
+    old = baseline.get(result["name"])
+    if old is None:
+      continue
+    old_p95, new_p95 = old["latency_ms"]["p95"], result["latency_ms"]["p95"]
+    change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+    print(
+      f"{result['name']:<32} p95 {old_p95:9.2f} -> {new_p95:9.2f} ms ({change:+6.1f}%)  "
+      f"запросов {old['queries_per_request']['mean']:6.2f} -> {result['queries_per_request']['mean']:6.2f}"
+    )
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--requests", type=int, default=200, help="замеряемых запросов на эндпоинт")
+  parser.add_argument("--warmup", type=int, default=10, help="незамеряемых запросов перед замером")
+  parser.add_argument("--only", default="", help="группы или имена сценариев через запятую")
+  parser.add_argument("--no-cache", action="store_true", help="выключить кэш ответов статистики")
+  parser.add_argument("--prefix", default="bench-", help="префикс focus_user_id данных bench.seed")
+  parser.add_argument("--output", type=Path, default=None, help="файл результата (по умолчанию bench/results/<время>.json)")
+  parser.add_argument("--baseline", type=Path, default=None, help="JSON прошлого прогона для сравнения")
+  parser.add_argument("--seed", type=int, default=42)
+  args = parser.parse_args()
+
+  only = {name.strip() for name in args.only.split(",") if name.strip()}
+  scenarios = [s for s in SCENARIOS if not only or s.name in only or s.group in only]
+  if not scenarios:
+    raise SystemExit(f"Нет сценариев для --only={args.only}")
+
+  sample = _load_sample(args.prefix)
+  if not settings.INTERNAL_API_SECRET:
+    settings.INTERNAL_API_SECRET = "bench-internal-secret"
+
+  from app.main import app
+  from app.services import stats_cache
+  if args.no_cache:
+    stats_cache.cache.max_entries = 0
+
+  counter = QueryCounter()
+  event.listen(engine, "before_cursor_execute", counter)
+  rng = random.Random(args.seed)
+  results = []
+  over_budget = []
+  with TestClient(app) as client:
+    for scenario in scenarios:
+      result = _run_scenario(client, counter, scenario, sample, args, rng)
+      results.append(result)
+      latency = result["latency_ms"]
+      print(
+        f"{scenario.name:<32} p50 {latency['p50']:8.2f}  p95 {latency['p95']:8.2f}  p99 {latency['p99']:8.2f} ms  "
+        f"запросов {result['queries_per_request']['mean']:6.2f}  {result['statuses']}"
+      )
+      if scenario.max_queries is not None and result["queries_per_request"]["max"] > scenario.max_queries:
+        over_budget.append(scenario.name)
+        print(f"  ! запросов до {result['queries_per_request']['max']}, бюджет {scenario.max_queries}")
+  event.remove(engine, "before_cursor_execute", counter)
+
+  report = {
+    "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    "git_commit": _git_commit(),
+    "python": platform.python_version(),
+    "config": {
+      "requests": args.requests,
+      "warmup": args.warmup,
+      "stats_cache": not args.no_cache,
+      "prefix": args.prefix,
+      "seed": args.seed,
+    },
+    "dataset": {
+      "teachers": len(sample.teacher_ids),
+      "groups": len(sample.group_ids),
+      "students": len(sample.student_ids),
+    },
+    "endpoints": results,
+  }
+  output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+  output.parent.mkdir(parents=True, exist_ok=True)
+  output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+  print(f"\nрезультат: {output}")
+  if args.baseline is not None:
+    _print_comparison(results, args.baseline)
+  if over_budget:
+    raise SystemExit(f"Превышен бюджет SQL-запросов: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,120 @@
+"""
+Микробенчмарк: выполнение ДЗ с уроков (homework_next) в агрегатах статистики.
+Проверяет, что пересчёт раздела lesson_hw растёт линейно от числа оценок ученика (до 10k),
+и сверяет результат SQL с эталоном — сортировкой по lesson_date и одним обратным проходом.
+Данные создаются во временной транзакции и откатываются.
+
+Запуск из backend/focus-kids-service (нужен APP_DATABASE_URL):
+  python -m bench.lesson_homework [--sizes 1000,2500,5000,10000] [--repeat 5]
+"""
+import argparse
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from app.config.database import SessionLocal
+from app.models import teacher, lecture  # noqa: F401  регистрация моделей для relationship()
+from app.models.grade import Grade
+from app.models.group import Group
+from app.models.stats_rollup import StudentStatsRollup
+from app.models.student import Student
+from app.services import stats_rollup
+from app.services.stats_rollup import HOMEWORK_CHECK_GRADE_TYPES
+
+GRADE_TYPES = ("homework_next", "oral_hw", "written_hw", "dictation", "classwork")
+
+
+def count_completed_lesson_homeworks(grades: list[tuple[str, date | None]]) -> tuple[int, int]:
+  """
+  Эталон: (всего ДЗ с уроков, выполнено). Сортировка по дате и обратный проход
+  с датой последней проверочной оценки — O(n log n) вместо перебора пар.
+  """
+  dated = sorted((d, t) for t, d in grades if d is not None)
+  total = completed = 0
+  latest_check: date | None = None
+  i = len(dated) - 1
+  while i >= 0:
+    # Оценки одного дня: проверка в тот же день не считается «более поздней»
+    day = dated[i][0]
+    j = i
+    while j >= 0 and dated[j][0] == day:
+      j -= 1
+    same_day = [t for _, t in dated[j + 1:i + 1]]
+    for t in same_day:
+      if t == "homework_next":
+        total += 1
+        if latest_check is not None:
+          completed += 1
+    if any(t in HOMEWORK_CHECK_GRADE_TYPES for t in same_day):
+      latest_check = day
+    i = j
+  return total, completed
+
+
+def _random_grades(n: int, rng: random.Random) -> list[tuple[str, date | None]]:
+  start = date(2020, 9, 1)
+  return [
+    (rng.choice(GRADE_TYPES), start + timedelta(days=rng.randrange(2000)) if rng.random() > 0.02 else None)
+    for _ in range(n)
+  ]
+
+
+def _measure(size: int, repeat: int, rng: random.Random) -> float:
+  with SessionLocal() as db:
+    try:
+      group = Group(name="bench")
+      db.add(group)
+      db.flush()
+      student = Student(focus_user_id="bench", full_name="bench", group_id=group.id)
+      db.add(student)
+      db.flush()
+      grades = _random_grades(size, rng)
+      db.execute(insert(Grade), [
+        {"student_id": student.id, "group_id": group.id, "type": t, "lesson_date": d, "value": 0}
+        for t, d in grades
+      ])
+
+      timings = []
+      for _ in range(repeat):
+        started = time.perf_counter()
+        stats_rollup.refresh_students(db, [student.id], ("lesson_hw",))
+        timings.append(time.perf_counter() - started)
+
+      rollup = db.get(StudentStatsRollup, student.id)
+      db.refresh(rollup)
+      expected = count_completed_lesson_homeworks(grades)
+      actual = (rollup.lesson_hw_total, rollup.lesson_hw_completed)
+      if actual != expected:
+        raise SystemExit(f"n={size}: SQL вернул {actual}, эталон {expected}")
+      return min(timings)
+    finally:
+      db.rollback()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--sizes", default="1000,2500,5000,10000")
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--seed", type=int, default=42)
+  args = parser.parse_args()
+
+  rng = random.Random(args.seed)
+  sizes = [int(s) for s in args.sizes.split(",")]
+  results = []
+  for size in sizes:
+    elapsed = _measure(size, args.repeat, rng)
+    results.append((size, elapsed))
+    print(f"n={size:>6}  {elapsed * 1000:8.2f} ms  {elapsed / size * 1e6:6.2f} µs/оценку")
+
+  (n0, t0), (n1, t1) = results[0], results[-1]
+  exponent = math.log(t1 / t0) / math.log(n1 / n0)
+  print(f"показатель роста: {exponent:.2f} (1.0 — линейный, 2.0 — квадратичный)")
+  if exponent > 1.5:
+    raise SystemExit("Рост сверхлинейный")
+
+
+if __name__ == "__main__":
+  main()
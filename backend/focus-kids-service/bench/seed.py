@@ -0,0 +1,304 @@
+"""
+Генератор синтетической школы для нагрузочных замеров.
+Создаёт преподавателей, группы, учеников, программы с лекциями, ДЗ и тестами,
+посещаемость и оценки за несколько лет, сдачи ДЗ и попытки тестов; в конце пересчитывает агрегаты статистики.
+Все focus_user_id начинаются с префикса (--prefix), по нему bench.endpoints находит сгенерированные данные.
+Лучше запускать на отдельной БД: данные не удаляются.
+
+Запуск из backend/focus-kids-service (нужен APP_DATABASE_URL):
+  python -m bench.seed [--teachers 10] [--groups-per-teacher 3] [--students-per-group 12] [--years 2]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import Iterable, Iterator
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.grade import Grade
+from app.models.group import Group
+from app.models.homework import Homework, HomeworkComment, HomeworkSubmission, HomeworkSubmissionFile
+from app.models.lecture import Lecture
+from app.models.program import Program
+from app.models.student import Student
+from app.models.teacher import Teacher
+from app.models.test import Test, TestAnswer, TestQuestion, TestSubmission, TestSubmissionAnswer
+from app.services import stats_rollup
+from app.services.stats_rollup import LESSON_GRADE_TYPES
+
+BATCH_SIZE = 5000
+QUESTION_TYPES = ("single_choice", "single_choice", "multiple_choice", "text")
+ANSWERS_PER_QUESTION = 4
+
+
+def _batches(rows: Iterable[dict], size: int = BATCH_SIZE) -> Iterator[list[dict]]:
+  batch = []
+  for row in rows:
+    batch.append(row)
+    if len(batch) >= size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+
+def _insert_ids(db: Session, model, rows: list[dict]) -> list[int]:
+  """Пакетный INSERT ... RETURNING id; id возвращаются в порядке строк."""
+  ids = []
+  for batch in _batches(rows):
+    ids.extend(db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), batch).scalars())
+  return ids
+
+
+def _insert(db: Session, model, rows: Iterable[dict]) -> int:
+  count = 0
+  for batch in _batches(rows):
+    db.execute(insert(model), batch)
+    count += len(batch)
+  return count
+
+
+def _lesson_dates(years: int, lessons_per_week: int, today: date) -> list[date]:
+  start = today - timedelta(days=365 * years)
+  start -= timedelta(days=start.weekday())
+  # Занятия в первые дни недели через день: пн, ср, пт, ...
+  weekdays = [(2 * i) % 7 for i in range(lessons_per_week)]
+  dates = []
+  week = start
+  while week <= today:
+    dates.extend(d for d in (week + timedelta(days=wd) for wd in sorted(weekdays)) if d <= today)
+    week += timedelta(days=7)
+  return dates
+
+
+def seed(db: Session, args: argparse.Namespace) -> dict:
+  rng = random.Random(args.seed)
+  prefix = args.prefix
+  counts: dict[str, int] = {}
+
+  teacher_ids = _insert_ids(db, Teacher, [
+    {"focus_user_id": f"{prefix}teacher-{i}", "full_name": f"Преподаватель {i}"}
+    for i in range(args.teachers)
+  ])
+  group_rows = [
+    {"name": f"Группа {t}-{g}", "level": rng.choice(("A1", "A2", "B1", "B2")), "teacher_id": teacher_id}
+    for t, teacher_id in enumerate(teacher_ids)
+    for g in range(args.groups_per_teacher)
+  ]
+  group_ids = _insert_ids(db, Group, group_rows)
+  student_rows = [
+    {"focus_user_id": f"{prefix}student-{g}-{s}", "full_name": f"Ученик {g}-{s}", "group_id": group_id}
+    for g, group_id in enumerate(group_ids)
+    for s in range(args.students_per_group)
+  ]
+  student_ids = _insert_ids(db, Student, student_rows)
+  students_by_group = {group_id: [] for group_id in group_ids}
+  for student_id, row in zip(student_ids, student_rows):
+    students_by_group[row["group_id"]].append(student_id)
+  counts.update(teachers=len(teacher_ids), groups=len(group_ids), students=len(student_ids))
+
+  program_rows = [
+    {"group_id": group_id, "name": f"Программа {p}", "description": "Синтетическая программа"}
+    for group_id in group_ids
+    for p in range(args.programs_per_group)
+  ]
+  program_ids = _insert_ids(db, Program, program_rows)
+  programs_by_group = {group_id: [] for group_id in group_ids}
+  for program_id, row in zip(program_ids, program_rows):
+    programs_by_group[row["group_id"]].append(program_id)
+  counts["programs"] = len(program_ids)
+
+  counts["lectures"] = _insert(db, Lecture, (
+    {"program_id": program_id, "title": f"Лекция {n}", "video_type": "youtube", "video_id": f"bench{n}", "order": n}
+    for program_id in program_ids
+    for n in range(args.lectures_per_program)
+  ))
+
+  homework_rows = [
+    {"program_id": program_id, "title": f"ДЗ {n}", "description": "Синтетическое ДЗ", "order": n}
+    for program_id in program_ids
+    for n in range(args.homeworks_per_program)
+  ]
+  homework_ids = _insert_ids(db, Homework, homework_rows)
+  counts["homeworks"] = len(homework_ids)
+
+  # Тесты: вопросы разных типов, по ANSWERS_PER_QUESTION вариантов, 1–2 правильных у multiple_choice
+  test_rows = [
+    {"program_id": program_id, "title": f"Тест {n}", "order": n, "max_attempts": rng.choice((None, 2, 3))}
+    for program_id in program_ids
+    for n in range(args.tests_per_program)
+  ]
+  test_ids = _insert_ids(db, Test, test_rows)
+  question_rows = [
+    {"test_id": test_id, "question_text": f"Вопрос {n}", "question_type": rng.choice(QUESTION_TYPES), "order": n}
+    for test_id in test_ids
+    for n in range(args.questions_per_test)
+  ]
+  question_ids = _insert_ids(db, TestQuestion, question_rows)
+  answer_rows = []
+  for question_id, question in zip(question_ids, question_rows):
+    if question["question_type"] == "text":
+      continue
+    correct = set(rng.sample(range(ANSWERS_PER_QUESTION), 1 if question["question_type"] == "single_choice" else 2))
+    answer_rows.extend(
+      {"question_id": question_id, "answer_text": f"Вариант {n}", "is_correct": n in correct, "order": n}
+      for n in range(ANSWERS_PER_QUESTION)
+    )
+  answer_ids = _insert_ids(db, TestAnswer, answer_rows)
+  # Ключ ответов: question_id -> (тип, все варианты, правильные)
+  answer_key: dict[int, tuple[str, list[int], set[int]]] = {
+    question_id: (question["question_type"], [], set())
+    for question_id, question in zip(question_ids, question_rows)
+  }
+  for answer_id, answer in zip(answer_ids, answer_rows):
+    _, options, correct = answer_key[answer["question_id"]]
+    options.append(answer_id)
+    if answer["is_correct"]:
+      correct.add(answer_id)
+  questions_by_test = {test_id: [] for test_id in test_ids}
+  for question_id, question in zip(question_ids, question_rows):
+    questions_by_test[question["test_id"]].append(question_id)
+  counts.update(tests=len(test_ids), test_questions=len(question_ids), test_answers=len(answer_ids))
+
+  # Посещаемость и оценки: каждое занятие группы — отметка каждому ученику и 0–2 оценки
+  lesson_dates = _lesson_dates(args.years, args.lessons_per_week, date.today())
+
+  def attendance_rows():
+    for group_id, group_students in students_by_group.items():
+      group_programs = programs_by_group[group_id]
+      for n, lesson_date in enumerate(lesson_dates):
+        program_id = group_programs[n * len(group_programs) // len(lesson_dates)] if group_programs else None
+        for student_id in group_students:
+          yield {
+            "student_id": student_id,
+            "group_id": group_id,
+            "lesson_date": lesson_date,
+            "present": rng.random() < args.attendance_rate,
+            "program_id": program_id,
+          }
+
+  def grade_rows():
+    for group_id, group_students in students_by_group.items():
+      for lesson_date in lesson_dates:
+        homework_next = rng.random() < 0.5
+        for student_id in group_students:
+          for _ in range(rng.choice((0, 1, 1, 2))):
+            yield {
+              "student_id": student_id,
+              "group_id": group_id,
+              "lesson_date": lesson_date,
+              "value": rng.choice((2, 3, 4, 4, 5, 5)),
+              "type": rng.choice(LESSON_GRADE_TYPES),
+            }
+          if homework_next:
+            yield {"student_id": student_id, "group_id": group_id, "lesson_date": lesson_date, "value": 0, "type": "homework_next"}
+
+  counts["attendance"] = _insert(db, Attendance, attendance_rows())
+  counts["grades"] = _insert(db, Grade, grade_rows())
+
+  homeworks_by_group = {group_id: [] for group_id in group_ids}
+  tests_by_group = {group_id: [] for group_id in group_ids}
+  group_by_program = {program_id: row["group_id"] for program_id, row in zip(program_ids, program_rows)}
+  for homework_id, row in zip(homework_ids, homework_rows):
+    homeworks_by_group[group_by_program[row["program_id"]]].append(homework_id)
+  for test_id, row in zip(test_ids, test_rows):
+    tests_by_group[group_by_program[row["program_id"]]].append((test_id, row["max_attempts"]))
+
+  homework_submission_rows = [
+    {
+      "homework_id": homework_id,
+      "student_id": student_id,
+      "answer_text": "Синтетический ответ",
+      "grade": rng.choice((None, 3, 4, 5)),
+    }
+    for group_id, group_students in students_by_group.items()
+    for homework_id in homeworks_by_group[group_id]
+    for student_id in group_students
+    if rng.random() < args.submission_rate
+  ]
+  homework_submission_ids = _insert_ids(db, HomeworkSubmission, homework_submission_rows)
+  counts["homework_submissions"] = len(homework_submission_ids)
+  # Вложения и переписка с учителем: на списках ответов они дают files × comments строк при JOIN
+  counts["homework_submission_files"] = _insert(db, HomeworkSubmissionFile, (
+    {"submission_id": submission_id, "file_url": f"/uploads/bench/{submission_id}-{n}.jpg", "file_name": f"photo-{n}.jpg"}
+    for submission_id in homework_submission_ids
+    for n in range(rng.randint(0, args.files_per_submission))
+  ))
+  counts["homework_comments"] = _insert(db, HomeworkComment, (
+    {"submission_id": submission_id, "author_id": row["student_id"], "comment_text": f"Комментарий {n + 1}"}
+    for submission_id, row in zip(homework_submission_ids, homework_submission_rows)
+    for n in range(rng.randint(0, args.comments_per_submission))
+  ))
+
+  # Попытки тестов: ответы выбираются случайно, балл считается по ключу так же, как при сдаче через API
+  attempts = []
+  for group_id, group_students in students_by_group.items():
+    for test_id, max_attempts in tests_by_group[group_id]:
+      for student_id in group_students:
+        if rng.random() >= args.submission_rate:
+          continue
+        for _ in range(rng.randint(1, max_attempts or 3)):
+          answers = []
+          score = 0
+          for question_id in questions_by_test[test_id]:
+            question_type, options, correct = answer_key[question_id]
+            if question_type == "text":
+              answers.append({"question_id": question_id, "answer_text": "Текстовый ответ", "selected_answer_ids": None})
+              continue
+            if rng.random() < args.correct_rate:
+              selected = sorted(correct)
+            else:
+              selected = rng.sample(options, len(correct))
+            score += set(selected) == correct
+            answers.append({"question_id": question_id, "answer_text": None, "selected_answer_ids": selected})
+          attempts.append(({"test_id": test_id, "student_id": student_id, "score": score, "max_score": len(questions_by_test[test_id])}, answers))
+  submission_ids = _insert_ids(db, TestSubmission, [submission for submission, _ in attempts])
+  counts["test_submissions"] = len(submission_ids)
+  counts["test_submission_answers"] = _insert(db, TestSubmissionAnswer, (
+    {"submission_id": submission_id, **answer}
+    for submission_id, (_, answers) in zip(submission_ids, attempts)
+    for answer in answers
+  ))
+
+  stats_rollup.rebuild(db)
+  return counts
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--teachers", type=int, default=10)
+  parser.add_argument("--groups-per-teacher", type=int, default=3)
+  parser.add_argument("--students-per-group", type=int, default=12)
+  parser.add_argument("--years", type=int, default=2)
+  parser.add_argument("--lessons-per-week", type=int, default=2)
+  parser.add_argument("--programs-per-group", type=int, default=3)
+  parser.add_argument("--lectures-per-program", type=int, default=8)
+  parser.add_argument("--homeworks-per-program", type=int, default=6)
+  parser.add_argument("--tests-per-program", type=int, default=4)
+  parser.add_argument("--questions-per-test", type=int, default=10)
+  parser.add_argument("--attendance-rate", type=float, default=0.85)
+  parser.add_argument("--files-per-submission", type=int, default=3, help="до N файлов на ответ на ДЗ")
+  parser.add_argument("--comments-per-submission", type=int, default=6, help="до N комментариев на ответ на ДЗ")
+  parser.add_argument("--submission-rate", type=float, default=0.7, help="доля учеников, сдавших ДЗ / прошедших тест")
+  parser.add_argument("--correct-rate", type=float, default=0.6, help="вероятность правильного ответа на вопрос")
+  parser.add_argument("--prefix", default="bench-", help="префикс focus_user_id сгенерированных пользователей")
+  parser.add_argument("--seed", type=int, default=42)
+  args = parser.parse_args()
+
+  Base.metadata.create_all(bind=engine)
+  started = time.perf_counter()
+  with SessionLocal() as db:
+    counts = seed(db, args)
+    db.commit()
+  for name, count in counts.items():
+    print(f"{name:>24}: {count}")
+  print(f"готово за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+  main()
@@ -1,7 +1,7 @@
 /**
  * Форматирование текста уведомлений для Focus Kids.
  */
-export type NotifyType = 'new_homework' | 'new_grade' | 'lesson_grades' | 'new_test' | 'new_video';
+export type NotifyType = 'new_homework' | 'homework_graded' | 'new_grade' | 'lesson_grades' | 'new_test' | 'new_video';
 
 export interface NotifyPayload {
   program_name?: string;
@@ -24,6 +24,10 @@ export function formatNotifyMessage(type: NotifyType, payload: NotifyPayload): s
       const text = desc ? `«${title}». ${desc}` : `«${title}».`;
       return `📝 <b>Новое домашнее задание</b>${program}\n\n${text}${footer}`;
     }
+    case 'homework_graded': {
+      const title = payload.homework_title ? ` «${payload.homework_title}»` : '';
+      return `✅ <b>Домашнее задание проверено</b>${title}\n\nУчитель выставил оценку.${footer}`;
+    }
     case 'lesson_grades':
       return `📊 <b>Оценки за занятие</b>${payload.lesson_date ? ` (${payload.lesson_date})` : ''}\n\nВыставлены оценки.${footer}`;
     case 'new_grade':
@@ -0,0 +1,2 @@
+-- Index for best attempts per student (DISTINCT ON (test_id) over one student's submissions)
+CREATE INDEX IF NOT EXISTS ix_test_submissions_student_test_score ON test_submissions (student_id, test_id, score);
@@ -0,0 +1,18 @@
+-- selected_answer_ids: JSON string (VARCHAR) -> native INTEGER[] with GIN index.
+-- The old column is kept as selected_answer_ids_legacy until the backfill converts it:
+--   docker exec -it focus-kids-service python -m app.commands.backfill_selected_answer_ids --drop-legacy
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'test_submission_answers'
+      AND column_name = 'selected_answer_ids'
+      AND data_type = 'character varying'
+  ) THEN
+    ALTER TABLE test_submission_answers RENAME COLUMN selected_answer_ids TO selected_answer_ids_legacy;
+  END IF;
+END $$;
+
+ALTER TABLE test_submission_answers ADD COLUMN IF NOT EXISTS selected_answer_ids INTEGER[];
+CREATE INDEX IF NOT EXISTS ix_test_submission_answers_selected_ids
+  ON test_submission_answers USING GIN (selected_answer_ids);
@@ -0,0 +1,5 @@
+-- Indexes for keyset pagination of homework listings: homeworks by (order, id) within a program,
+-- submissions by id within a homework and within a student
+CREATE INDEX IF NOT EXISTS ix_homeworks_program_order_id ON homeworks (program_id, "order", id);
+CREATE INDEX IF NOT EXISTS ix_homework_submissions_homework_id_id ON homework_submissions (homework_id, id);
+CREATE INDEX IF NOT EXISTS ix_homework_submissions_student_id_id ON homework_submissions (student_id, id);
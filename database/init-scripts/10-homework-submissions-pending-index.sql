@@ -0,0 +1,2 @@
+-- Partial index for the teacher review queue (GET /homeworks/review-queue): ungraded submissions only
+CREATE INDEX IF NOT EXISTS ix_homework_submissions_pending ON homework_submissions (homework_id, id) WHERE grade IS NULL;
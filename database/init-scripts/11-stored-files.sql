@@ -0,0 +1,7 @@
+-- Content-addressed homework attachments (app.services.file_storage); bytes live in STORAGE_DIR, keyed by SHA-256
+CREATE TABLE IF NOT EXISTS stored_files (
+  sha256 VARCHAR(64) PRIMARY KEY,
+  size BIGINT NOT NULL,
+  content_type VARCHAR(100) NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -40,8 +40,8 @@ export default function HomeworkPage() {
   useEffect(() => {
     if (!studentId || !id) return;
     let cancelled = false;
-    kidsClient.homeworks.submissions.listByStudent(studentId).then((list) => {
-      const sub = list.find((s) => s.homework_id === id);
+    kidsClient.homeworks.submissions.listByStudent(studentId, { homework_id: id }).then((page) => {
+      const sub = page.items[0];
       if (!cancelled) setSubmission(sub ?? null);
     }).catch(() => {});
     return () => { cancelled = true; };
@@ -61,7 +61,7 @@ export default function HomeworkPage() {
           <ul className="mt-4 space-y-1">
             {homework.files.map((f) => (
               <li key={f.id}>
-                <a href={f.file_url} target="_blank" rel="noopener noreferrer" className="text-primary hover:underline">
+                <a href={kidsClient.files.href(f.download_url)} target="_blank" rel="noopener noreferrer" className="text-primary hover:underline">
                   {f.file_name}
                 </a>
               </li>
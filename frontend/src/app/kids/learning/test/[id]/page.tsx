@@ -12,7 +12,7 @@ import { Button } from '@/components/common/Button';
 import { Loader } from '@/components/common/Loader';
 import { ROUTES } from '@/lib/constants';
 import { useKidsStore } from '@/store/kidsStore';
-import type { Test } from '@/types/kids';
+import type { StudentTest, Test } from '@/types/kids';
 
 export default function TestPage() {
   const params = useParams();
@@ -20,7 +20,7 @@ export default function TestPage() {
   const { user } = useAuth();
   const { role, studentId } = useKidsStore();
   const canEdit = role === 'teacher' || user?.roles?.includes('admin') || user?.roles?.includes('moderator');
-  const [test, setTest] = useState<Test | null>(null);
+  const [test, setTest] = useState<Test | StudentTest | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -30,7 +30,9 @@ export default function TestPage() {
       return;
     }
     let cancelled = false;
-    kidsClient.tests.get(id).then((t) => {
+    // Ученику — облегчённое представление без правильных ответов
+    const load = role === 'student' ? kidsClient.tests.getForStudent(id) : kidsClient.tests.get(id);
+    load.then((t) => {
       if (!cancelled) setTest(t);
     }).catch(() => {
       if (!cancelled) setError('Тест не найден');
@@ -38,7 +40,7 @@ export default function TestPage() {
       if (!cancelled) setLoading(false);
     });
     return () => { cancelled = true; };
-  }, [id]);
+  }, [id, role]);
 
   if (loading) return <Loader className="min-h-[40vh]" />;
   if (error || !test) return <p className="text-red-600">{error || 'Тест не найден'}</p>;
@@ -63,7 +65,7 @@ export default function TestPage() {
 
       {role === 'student' && <TestComponent test={test} />}
       {role === 'teacher' && (
-        <TestSubmissionsList test={test} />
+        <TestSubmissionsList test={test as Test} />
       )}
 
       <Link href={ROUTES.kids.learning} className="inline-block text-primary font-medium hover:underline">
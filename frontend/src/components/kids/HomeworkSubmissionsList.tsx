@@ -25,7 +25,7 @@ export function HomeworkSubmissionsList({ homework }: HomeworkSubmissionsListPro
   useEffect(() => {
     let cancelled = false;
     Promise.all([
-      kidsClient.homeworks.submissions.listByHomework(homework.id),
+      kidsClient.homeworks.submissions.listAllByHomework(homework.id),
       kidsClient.students.list(),
     ]).then(([subs, students]) => {
       if (cancelled) return;
@@ -112,7 +112,7 @@ export function HomeworkSubmissionsList({ homework }: HomeworkSubmissionsListPro
               <ul className="mt-2 space-y-1 text-sm">
                 {s.files.map((f) => (
                   <li key={f.id}>
-                    <a href={f.file_url} target="_blank" rel="noopener noreferrer" className="text-primary hover:underline">
+                    <a href={kidsClient.files.href(f.download_url)} target="_blank" rel="noopener noreferrer" className="text-primary hover:underline">
                       {f.file_name}
                     </a>
                   </li>
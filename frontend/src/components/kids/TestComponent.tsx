@@ -6,14 +6,18 @@ import { kidsClient } from '@/lib/api/kids-client';
 import { Card } from '@/components/common/Card';
 import { Button } from '@/components/common/Button';
 import { useToast } from '@/hooks/useToast';
-import type { Test, TestQuestion, TestAnswer, TestSubmission } from '@/types/kids';
+import type { StudentTest, TestSubmission } from '@/types/kids';
 
 interface TestComponentProps {
-  test: Test;
+  test: StudentTest;
 }
 
 type AnswerState = Record<number, string | number[]>;
 
+/** Ожидание проверки попытки из очереди: запросов по RESULT_WAIT_SECONDS (long-poll), всего около двух минут. */
+const RESULT_WAIT_SECONDS = 20;
+const RESULT_MAX_POLLS = 6;
+
 export function TestComponent({ test }: TestComponentProps) {
   const { studentId } = useKidsStore();
   const { show: toast } = useToast();
@@ -79,7 +83,7 @@ export function TestComponent({ test }: TestComponentProps) {
             const ids = Array.isArray(val) ? val : [];
             return {
               question_id: q.id,
-              selected_answer_ids: JSON.stringify(ids),
+              selected_answer_ids: ids,
             };
           }
           return {
@@ -88,7 +92,25 @@ export function TestComponent({ test }: TestComponentProps) {
           };
         }),
       };
-      const result = await kidsClient.tests.submissions.create(payload);
+      const created = await kidsClient.tests.submissions.create(payload);
+      let result: { score: number | null; max_score: number | null } = created;
+      if ('submission_id' in created) {
+        // Сервер принял попытку в очередь — ждём проверки
+        let outcome = await kidsClient.tests.submissions.result(created.submission_id, RESULT_WAIT_SECONDS);
+        for (let polls = 1; outcome.status === 'queued' && polls < RESULT_MAX_POLLS; polls++) {
+          outcome = await kidsClient.tests.submissions.result(created.submission_id, RESULT_WAIT_SECONDS);
+        }
+        if (outcome.status === 'queued') {
+          setAttemptsUsed((n) => n + 1);
+          toast('Тест ещё проверяется. Результат появится в списке попыток позже.');
+          return;
+        }
+        if (outcome.status !== 'done') {
+          toast(outcome.detail ?? 'Ошибка проверки теста');
+          return;
+        }
+        result = outcome;
+      }
       setAttemptsUsed((n) => n + 1);
       const [bestList] = await Promise.all([
         kidsClient.tests.submissions.bestByStudent(studentId!),
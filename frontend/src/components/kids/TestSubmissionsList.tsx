@@ -210,39 +210,27 @@ function SubmissionAnswersDetail({
 
 function checkAnswerCorrect(
   question: { question_type: string; answers: { id: number; is_correct: boolean }[] },
-  answer: { selected_answer_ids: string | null; answer_text: string | null }
+  answer: { selected_answer_ids: number[] | null; answer_text: string | null }
 ): boolean | null {
   if (question.question_type === 'text') return null;
-  const correctIds = new Set(
-    question.answers.filter((a) => a.is_correct).map((a) => String(a.id))
-  );
+  const correctIds = new Set(question.answers.filter((a) => a.is_correct).map((a) => a.id));
   if (!answer.selected_answer_ids) return correctIds.size === 0;
-  try {
-    const selected = JSON.parse(answer.selected_answer_ids) as string[];
-    const selectedSet = new Set(Array.isArray(selected) ? selected.map(String) : []);
-    if (correctIds.size !== selectedSet.size) return false;
-    return Array.from(correctIds).every((id) => selectedSet.has(id));
-  } catch {
-    return false;
-  }
+  const selectedSet = new Set(answer.selected_answer_ids);
+  if (correctIds.size !== selectedSet.size) return false;
+  return Array.from(correctIds).every((id) => selectedSet.has(id));
 }
 
 function formatStudentAnswer(
   question: { question_type: string; answers: { id: number; answer_text: string }[] },
-  answer: { selected_answer_ids: string | null; answer_text: string | null } | undefined
+  answer: { selected_answer_ids: number[] | null; answer_text: string | null } | undefined
 ): string {
   if (!answer) return '—';
   if (answer.answer_text) return answer.answer_text;
-  if (!answer.selected_answer_ids) return '—';
-  try {
-    const ids = JSON.parse(answer.selected_answer_ids) as number[];
-    const idSet = new Set(Array.isArray(ids) ? ids.map(Number) : []);
-    const texts = question.answers
-      .filter((a) => idSet.has(a.id))
-      .map((a) => a.answer_text)
-      .join(', ');
-    return texts || answer.selected_answer_ids;
-  } catch {
-    return answer.selected_answer_ids;
-  }
+  if (!answer.selected_answer_ids || answer.selected_answer_ids.length === 0) return '—';
+  const idSet = new Set(answer.selected_answer_ids);
+  const texts = question.answers
+    .filter((a) => idSet.has(a.id))
+    .map((a) => a.answer_text)
+    .join(', ');
+  return texts || answer.selected_answer_ids.join(', ');
 }
@@ -4,17 +4,37 @@ import type {
   ProgramWithCounts,
   Lecture,
   Homework,
+  HomeworkBrief,
+  HomeworkReviewItem,
+  HomeworkSubmissionBulkResult,
   Test,
+  TestSummary,
+  StudentTest,
+  Page,
   Group,
   Student,
   HomeworkSubmission,
+  HomeworkSubmissionBrief,
   TestSubmission,
+  TestSubmissionTicket,
+  TestSubmissionResult,
   StudentStatistics,
   TeacherStatistics,
   Grade,
+  StoredFile,
 } from '@/types/kids';
 
 export const kidsClient = {
+  files: {
+    /** Загрузка файла телом запроса (не multipart); file_url ответа сохраняется в файлах ДЗ и ответов. */
+    upload: (file: File) =>
+      kidsApi
+        .post<StoredFile>('/files', file, { headers: { 'Content-Type': file.type || 'application/octet-stream' } })
+        .then((r) => r.data),
+    /** Ссылка для <a>/<img> по download_url: файлы из хранилища (/files/...) — через API, внешние URL — как есть. */
+    href: (downloadUrl: string) =>
+      downloadUrl.startsWith('/files/') ? `${kidsApi.defaults.baseURL}${downloadUrl}` : downloadUrl,
+  },
   programs: {
     list: () => kidsApi.get<Program[]>('/programs/').then((r) => r.data),
     /** Список программ с полями lectures_count, homeworks_count, tests_count для страницы «Обучение». */
@@ -46,10 +66,16 @@ export const kidsClient = {
     delete: (id: number) => kidsApi.delete(`/lectures/${id}`).then(() => undefined),
   },
   homeworks: {
-    list: () => kidsApi.get<Homework[]>('/homeworks/').then((r) => r.data),
-    listByProgram: (programId: number) =>
-      kidsApi.get<Homework[]>(`/homeworks/by-program/${programId}`).then((r) => r.data),
+    list: (params?: { program_id?: number; limit?: number; cursor?: string }) =>
+      kidsApi.get<Page<Homework>>('/homeworks/', { params }).then((r) => r.data),
+    listBrief: (params?: { program_id?: number; limit?: number; cursor?: string }) =>
+      kidsApi.get<Page<HomeworkBrief>>('/homeworks/', { params: { ...params, fields: 'brief' } }).then((r) => r.data),
+    listByProgram: (programId: number, params?: { limit?: number; cursor?: string }) =>
+      kidsApi.get<Page<Homework>>(`/homeworks/by-program/${programId}`, { params }).then((r) => r.data),
     get: (id: number) => kidsApi.get<Homework>(`/homeworks/${id}`).then((r) => r.data),
+    /** Непроверенные ответы по группам учителя, старые первыми. */
+    reviewQueue: (params?: { group_id?: number; limit?: number; cursor?: string }) =>
+      kidsApi.get<Page<HomeworkReviewItem>>('/homeworks/review-queue', { params }).then((r) => r.data),
     submissions: {
       create: (data: {
         homework_id: number;
@@ -57,21 +83,47 @@ export const kidsClient = {
         answer_text?: string;
         files?: { file_url: string; file_name: string }[];
       }) => kidsApi.post<HomeworkSubmission>('/homeworks/submissions', data).then((r) => r.data),
-      listByHomework: (homeworkId: number) =>
-        kidsApi.get<HomeworkSubmission[]>(`/homeworks/submissions/by-homework/${homeworkId}`).then((r) => r.data),
-      listByStudent: (studentId: number) =>
-        kidsApi.get<HomeworkSubmission[]>(`/homeworks/submissions/by-student/${studentId}`).then((r) => r.data),
+      listByHomework: (homeworkId: number, params?: { limit?: number; cursor?: string; with?: string }) =>
+        kidsApi.get<Page<HomeworkSubmission>>(`/homeworks/submissions/by-homework/${homeworkId}`, { params }).then((r) => r.data),
+      /** Все ответы на ДЗ — страницы по MAX_PAGE_SIZE до конца. */
+      listAllByHomework: async (homeworkId: number) => {
+        const items: HomeworkSubmission[] = [];
+        let cursor: string | undefined;
+        do {
+          const { data: page } = await kidsApi.get<Page<HomeworkSubmission>>(
+            `/homeworks/submissions/by-homework/${homeworkId}`,
+            { params: { limit: 200, cursor } },
+          );
+          items.push(...page.items);
+          cursor = page.next_cursor ?? undefined;
+        } while (cursor);
+        return items;
+      },
+      /** with — связи через запятую (files,comments — по умолчанию; пустая строка — без них). */
+      listByStudent: (studentId: number, params?: { homework_id?: number; limit?: number; cursor?: string; with?: string }) =>
+        kidsApi.get<Page<HomeworkSubmission>>(`/homeworks/submissions/by-student/${studentId}`, { params }).then((r) => r.data),
+      /** Оценки ученика по ДЗ без текста, файлов и комментариев. */
+      listBriefByStudent: (studentId: number, params?: { limit?: number; cursor?: string }) =>
+        kidsApi.get<Page<HomeworkSubmissionBrief>>(`/homeworks/submissions/by-student/${studentId}`, { params: { ...params, fields: 'brief' } }).then((r) => r.data),
       update: (submissionId: number, data: { answer_text?: string; grade?: number; teacher_comment?: string }) =>
         kidsApi.patch<HomeworkSubmission>(`/homeworks/submissions/${submissionId}`, data).then((r) => r.data),
+      /** Оценки нескольких ответов одним запросом (до 500); updated=false — ответа с таким id нет. */
+      bulkUpdate: (items: { id: number; grade?: number; teacher_comment?: string }[]) =>
+        kidsApi.patch<HomeworkSubmissionBulkResult[]>('/homeworks/submissions/bulk', items).then((r) => r.data),
     },
     createComment: (submissionId: number, data: { author_id: number; comment_text: string }) =>
       kidsApi.post(`/homeworks/submissions/${submissionId}/comments`, data).then((r) => r.data),
   },
   tests: {
-    list: () => kidsApi.get<Test[]>('/tests/').then((r) => r.data),
+    list: (params?: { program_id?: number; limit?: number; cursor?: string }) =>
+      kidsApi.get<Page<Test>>('/tests/', { params }).then((r) => r.data),
+    listSummary: (params?: { program_id?: number; limit?: number; cursor?: string }) =>
+      kidsApi.get<Page<TestSummary>>('/tests/', { params: { ...params, summary: true } }).then((r) => r.data),
     listByProgram: (programId: number) =>
       kidsApi.get<Test[]>(`/tests/by-program/${programId}`).then((r) => r.data),
     get: (id: number) => kidsApi.get<Test>(`/tests/${id}`).then((r) => r.data),
+    /** Без правильных ответов; ответ кэшируется браузером по ETag (повторное открытие — 304). */
+    getForStudent: (id: number) => kidsApi.get<StudentTest>(`/tests/${id}/student`).then((r) => r.data),
     update: (id: number, data: { title?: string; description?: string | null; order?: number; max_attempts?: number | null }) =>
       kidsApi.patch<Test>(`/tests/${id}`, data).then((r) => r.data),
     create: (data: {
@@ -91,8 +143,11 @@ export const kidsClient = {
       create: (data: {
         test_id: number;
         student_id: number;
-        answers: { question_id: number; answer_text?: string; selected_answer_ids?: string }[];
-      }) => kidsApi.post<TestSubmission>('/tests/submissions', data).then((r) => r.data),
+        answers: { question_id: number; answer_text?: string; selected_answer_ids?: number[] }[];
+      }) => kidsApi.post<TestSubmission | TestSubmissionTicket>('/tests/submissions', data).then((r) => r.data),
+      /** Результат попытки из очереди; wait — сколько секунд сервер ждёт проверки. */
+      result: (submissionId: number, wait = 0) =>
+        kidsApi.get<TestSubmissionResult>(`/tests/submissions/${submissionId}/result`, { params: { wait } }).then((r) => r.data),
       listByTest: (testId: number) =>
         kidsApi.get<TestSubmission[]>(`/tests/submissions/by-test/${testId}`).then((r) => r.data),
       listByStudent: (studentId: number) =>
@@ -6,7 +6,8 @@ export interface Program {
   /** Present when loaded via programs.get(id); list endpoint returns programs without these. */
   lectures?: Lecture[];
   homeworks?: Homework[];
-  tests?: Test[];
+  /** Ученик получает тесты без is_correct. */
+  tests?: (Test | StudentTest)[];
 }
 
 /** Программа с количеством элементов (endpoint /programs/with-counts/). */
@@ -32,6 +33,8 @@ export interface Lecture {
 export interface HomeworkFile {
   id: number;
   file_url: string;
+  /** file_url для ссылок; файлы из хранилища — подписанные */
+  download_url: string;
   file_name: string;
 }
 
@@ -44,6 +47,9 @@ export interface Homework {
   files: HomeworkFile[];
 }
 
+/** ДЗ без описания и файлов (?fields=brief). */
+export type HomeworkBrief = Pick<Homework, 'id' | 'program_id' | 'title' | 'order'>;
+
 export interface TestAnswer {
   id: number;
   question_id: number;
@@ -72,6 +78,22 @@ export interface Test {
   questions: TestQuestion[];
 }
 
+/** Тест для прохождения учеником (GET /tests/{id}/student): варианты без is_correct. */
+export interface StudentTest extends Omit<Test, 'questions'> {
+  questions: (Omit<TestQuestion, 'answers'> & { answers: Omit<TestAnswer, 'is_correct'>[] })[];
+}
+
+/** Тест без вопросов (GET /tests?summary=true). */
+export interface TestSummary extends Omit<Test, 'questions'> {
+  questions_count: number;
+}
+
+/** Страница keyset-пагинации: next_cursor передаётся в ?cursor= следующего запроса. */
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
 export interface Group {
   id: number;
   name: string;
@@ -95,10 +117,42 @@ export interface HomeworkSubmission {
   answer_text: string | null;
   grade: number | null;
   teacher_comment: string | null;
-  files: { id: number; file_url: string; file_name: string }[];
+  files: { id: number; file_url: string; download_url: string; file_name: string }[];
   comments: { id: number; comment_text: string; author_id: number }[];
 }
 
+/** Ответ на ДЗ без текста, файлов и комментариев (?fields=brief). */
+export type HomeworkSubmissionBrief = Pick<HomeworkSubmission, 'id' | 'homework_id' | 'student_id' | 'grade'>;
+
+/** Непроверенный ответ в очереди учителя (GET /homeworks/review-queue). */
+export interface HomeworkReviewItem {
+  id: number;
+  homework_id: number;
+  homework_title: string;
+  program_id: number;
+  group_id: number;
+  student_id: number;
+  student_name: string;
+  answer_text: string | null;
+}
+
+export interface StoredFile {
+  sha256: string;
+  size: number;
+  content_type: string;
+  /** Путь относительно API: /files/<sha256> */
+  file_url: string;
+  /** Подписанная ссылка на скачивание (срок действия ограничен) */
+  download_url: string;
+}
+
+export interface HomeworkSubmissionBulkResult {
+  id: number;
+  updated: boolean;
+  grade: number | null;
+  teacher_comment: string | null;
+}
+
 export interface TestSubmission {
   id: number;
   test_id: number;
@@ -106,7 +160,22 @@ export interface TestSubmission {
   score: number | null;
   max_score: number | null;
   is_approved_for_retake: boolean;
-  answers: { id: number; question_id: number; answer_text: string | null; selected_answer_ids: string | null }[];
+  answers: { id: number; question_id: number; answer_text: string | null; selected_answer_ids: number[] | null }[];
+}
+
+/** Попытка принята в очередь (202, режим очереди на сервере). */
+export interface TestSubmissionTicket {
+  submission_id: number;
+  status: 'queued';
+}
+
+/** GET /tests/submissions/{id}/result */
+export interface TestSubmissionResult {
+  submission_id: number;
+  status: 'queued' | 'done' | 'rejected' | 'failed';
+  score: number | null;
+  max_score: number | null;
+  detail: string | null;
 }
 
 export interface StudentStatistics {